@@ -2,8 +2,11 @@ from web3 import Web3
 import os
 from dotenv import load_dotenv
 
+from scripts.monitoring.price_oracle import fetch_eth_price_usd
+
 load_dotenv()
 w3 = Web3(Web3.HTTPProvider(os.getenv('WEB3_PROVIDER')))
+eth_price_usd = fetch_eth_price_usd(w3)  # Live WETH/USDC pool price
 
 # Transaction hashes from the successful arbitrage
 aerodrome_tx = '0x18fd62b1c73fc84f4d7a32b117a11ce1c9473ba813d2144b3e6d72c5358ac94c'
@@ -38,7 +41,7 @@ try:
     gas_price = aerodrome_tx_data['gasPrice']  # Both use same gas price
     total_gas_cost_wei = total_gas_used * gas_price
     total_gas_cost_eth = total_gas_cost_wei / 1e18
-    total_gas_cost_usd = total_gas_cost_eth * 2500  # Rough ETH price
+    total_gas_cost_usd = total_gas_cost_eth * eth_price_usd
     
     print(f'\n💰 Gas Analysis:')
     print(f'   Total Gas Used: {total_gas_used:,}')
@@ -79,7 +82,6 @@ try:
     print(f'   USDC: {usdc_balance_formatted:.2f} USDC')
     
     # Calculate USD values
-    eth_price_usd = 2500  # Rough estimate
     weth_usd_value = weth_balance_formatted * eth_price_usd
     usdc_usd_value = usdc_balance_formatted
     total_portfolio_usd = weth_usd_value + usdc_usd_value
@@ -2,6 +2,8 @@ from web3 import Web3
 import os
 from dotenv import load_dotenv
 
+from scripts.monitoring.price_oracle import fetch_eth_price_usd
+
 load_dotenv()
 w3 = Web3(Web3.HTTPProvider(os.getenv('WEB3_PROVIDER')))
 
@@ -34,7 +36,7 @@ print(f'   WETH: {weth_balance_formatted:.6f} WETH')
 print(f'   USDC: {usdc_balance_formatted:.2f} USDC')
 
 # Calculate USD values
-eth_price_usd = 2500  # Rough estimate
+eth_price_usd = fetch_eth_price_usd(w3)  # Live WETH/USDC pool price
 weth_usd_value = weth_balance_formatted * eth_price_usd
 usdc_usd_value = usdc_balance_formatted
 total_portfolio_usd = weth_usd_value + usdc_usd_value
@@ -51,7 +53,7 @@ print(f'   Sufficient: {"✅ YES" if total_portfolio_usd >= 10 else "❌ NO"}')
 
 # Check what the bot uses for $10 position
 position_size_usd = 10.0
-eth_amount = position_size_usd / 2500  # Convert USD to ETH
+eth_amount = position_size_usd / eth_price_usd  # Convert USD to ETH
 weth_amount = eth_amount * 1e18  # Convert to wei
 
 print(f'\n📊 Bot Requirements for $10 Position:')
@@ -69,7 +71,7 @@ print(f'   You need to have WETH available')
 # Check ETH balance too
 eth_balance = w3.eth.get_balance(Web3.to_checksum_address(account))
 eth_balance_formatted = eth_balance / 1e18
-eth_balance_usd = eth_balance_formatted * 2500
+eth_balance_usd = eth_balance_formatted * eth_price_usd
 
 print(f'\n🔍 ETH Balance:')
 print(f'   ETH: {eth_balance_formatted:.6f} ETH')
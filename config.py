@@ -8,6 +8,7 @@ load_dotenv()
 
 # Network Configuration
 WEB3_PROVIDER = os.getenv("WEB3_PROVIDER", "https://mainnet.base.org")
+CHAIN_ID = int(os.getenv("CHAIN_ID", "8453"))  # Base mainnet
 
 # API Keys and Endpoints
 UNISWAP_API_KEY = os.getenv("UNISWAP_API_KEY", "")
@@ -19,22 +20,68 @@ BALANCER_V2_SUBGRAPH = os.getenv("BALANCER_V2_SUBGRAPH", "https://api.thegraph.c
 ENABLE_UNISWAP_V3 = os.getenv("ENABLE_UNISWAP_V3", "true").lower() == "true"
 ENABLE_SUSHISWAP = os.getenv("ENABLE_SUSHISWAP", "true").lower() == "true"
 ENABLE_AERODROME = os.getenv("ENABLE_AERODROME", "true").lower() == "true"
-ENABLE_BALANCER_V2 = os.getenv("ENABLE_BALANCER_V2", "false").lower() == "true"  # Disabled by default due to slow performance
+ENABLE_BALANCER_V2 = os.getenv("ENABLE_BALANCER_V2", "true").lower() == "true"
 
 # DEX Performance Settings
 UNISWAP_MAX_POOLS = int(os.getenv("UNISWAP_MAX_POOLS", "5000"))  # Limit pools for performance
 SUSHISWAP_MAX_PAIRS = int(os.getenv("SUSHISWAP_MAX_PAIRS", "5000"))  # Limit pairs for performance
 AERODROME_MAX_POOLS = int(os.getenv("AERODROME_MAX_POOLS", "5000"))  # Limit pools for performance
-BALANCER_MAX_POOLS = int(os.getenv("BALANCER_MAX_POOLS", "50"))  # Very limited due to slow performance
+BALANCER_MAX_POOLS = int(os.getenv("BALANCER_MAX_POOLS", "500"))  # Fetched in pages of SUBGRAPH_PAGE_SIZE
+V3_QUOTE_POOLS = int(os.getenv("V3_QUOTE_POOLS", "50"))  # Deepest Uniswap V3 pools quoted exactly from local tick state
+
+# Per-DEX Refresh Cadence (seconds) - each DEX refreshes independently into the shared price store
+UNISWAP_REFRESH_SECONDS = float(os.getenv("UNISWAP_REFRESH_SECONDS", "10"))
+SUSHISWAP_REFRESH_SECONDS = float(os.getenv("SUSHISWAP_REFRESH_SECONDS", "2"))  # Cheap after warm-up (logs only)
+AERODROME_REFRESH_SECONDS = float(os.getenv("AERODROME_REFRESH_SECONDS", "10"))
+BALANCER_REFRESH_SECONDS = float(os.getenv("BALANCER_REFRESH_SECONDS", "30"))
+UNISWAP_TIMEOUT_SECONDS = float(os.getenv("UNISWAP_TIMEOUT_SECONDS", "60"))
+SUSHISWAP_TIMEOUT_SECONDS = float(os.getenv("SUSHISWAP_TIMEOUT_SECONDS", "120"))  # First scan reads every pair
+AERODROME_TIMEOUT_SECONDS = float(os.getenv("AERODROME_TIMEOUT_SECONDS", "60"))
+BALANCER_TIMEOUT_SECONDS = float(os.getenv("BALANCER_TIMEOUT_SECONDS", "60"))
+
+# Subgraph Paging Settings
+SUBGRAPH_PAGE_SIZE = int(os.getenv("SUBGRAPH_PAGE_SIZE", "1000"))  # Max entities per query (The Graph limit)
+SUBGRAPH_CONCURRENCY = int(os.getenv("SUBGRAPH_CONCURRENCY", "4"))  # Pages in flight per subgraph
 
 # Contract Addresses (Base Network)
 SUSHI_FACTORY_ADDRESS = "0x80C7DD17B01855a6D2347444a0FCC36136a314de"
+AERODROME_FACTORY_ADDRESS = "0x420DD381b31aEf6683db6B902084cB0FFECe40Da"  # PoolFactory (getFee per pool)
+BALANCER_VAULT_ADDRESS = "0xBA12222222228d8Ba445958a75a0704d566BF2C8"  # Balancer V2 Vault (getPoolTokens)
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+
+# Multicall Settings
+MULTICALL_CHUNK_SIZE = int(os.getenv("MULTICALL_CHUNK_SIZE", "500"))  # Calls per aggregate3 request
+
+# Async RPC Settings
+RPC_MAX_CONCURRENCY = int(os.getenv("RPC_MAX_CONCURRENCY", "8"))  # Max in-flight JSON-RPC requests
+RPC_TIMEOUT_SECONDS = float(os.getenv("RPC_TIMEOUT_SECONDS", "30"))
+
+# Shared HTTP Transport (subgraphs and RPC)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "16"))
+HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", "300"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "75"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "60"))
+
+# Event-Driven Pool State (Sync/Swap logs)
+LOG_BLOCK_RANGE = int(os.getenv("LOG_BLOCK_RANGE", "100"))  # Max blocks per eth_getLogs request
+MAX_LOG_CATCHUP_BLOCKS = int(os.getenv("MAX_LOG_CATCHUP_BLOCKS", "1800"))  # Rescan fully if further behind (~1h on Base)
 
 # Token Addresses (Base Network)
 WETH_ADDRESS = "0x4200000000000000000000000000000000000006"
 USDC_ADDRESS = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
 ZORA_ADDRESS = "0x4200000000000000000000000000000000000006"  # Using WETH as proxy
 
+# USD Pricing - token prices are derived from the pools themselves, anchored on USDC
+ETH_USD_FALLBACK_POOL = os.getenv("ETH_USD_FALLBACK_POOL", "0xd0b53D9277642d899DF5C87A3966A349A798F224")  # Uniswap V3 WETH/USDC 0.05%
+DEFAULT_ETH_PRICE_USD = float(os.getenv("DEFAULT_ETH_PRICE_USD", "2500"))  # Only used until a live price has been read
+
+# Multi-hop Cycle Detection (reported only, never executed)
+ENABLE_CYCLE_DETECTION = os.getenv("ENABLE_CYCLE_DETECTION", "true").lower() == "true"
+CYCLE_MAX_HOPS = int(os.getenv("CYCLE_MAX_HOPS", "4"))
+CYCLE_MIN_PROFIT_PCT = float(os.getenv("CYCLE_MIN_PROFIT_PCT", "0.1"))  # After pool fees, before gas
+CYCLE_BASE_TOKENS = [address.strip() for address in os.getenv("CYCLE_BASE_TOKENS", f"{WETH_ADDRESS},{USDC_ADDRESS}").split(",") if address.strip()]
+
 # Execution Settings
 EXECUTION_MODE = os.getenv("EXECUTION_MODE", "True").lower() == "true"
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "False").lower() == "true"
@@ -54,7 +101,13 @@ DEFAULT_GAS_ETH = float(os.getenv("DEFAULT_GAS_ETH", "0.001"))
 
 # Gas Settings (Base Network)
 BASE_GAS_PRICE_GWEI = float(os.getenv("BASE_GAS_PRICE_GWEI", "0.001"))  # Very low gas price for Base network
-# Gas limits are now calculated dynamically based on position size in estimate_profit()
+# Used (with the position-size gas limits in scripts/monitoring/profit.py) only until the gas oracle has fee history
+
+# Live Gas Pricing (eth_feeHistory and the L1 fee parameters of the GasPriceOracle predeploy)
+GAS_PRICE_ORACLE_ADDRESS = os.getenv("GAS_PRICE_ORACLE_ADDRESS", "0x420000000000000000000000000000000000000F")
+FEE_HISTORY_BLOCKS = int(os.getenv("FEE_HISTORY_BLOCKS", "20"))  # Rolling window of blocks for priority fees
+PRIORITY_FEE_PERCENTILE = float(os.getenv("PRIORITY_FEE_PERCENTILE", "50"))  # Reward percentile bid as priority fee
+GAS_MODEL_ALPHA = float(os.getenv("GAS_MODEL_ALPHA", "0.2"))  # Weight of each new receipt in the learned gas
 
 # Fee Settings
 DEFAULT_SLIPPAGE_PCT = float(os.getenv("DEFAULT_SLIPPAGE_PCT", "0.01"))
@@ -140,6 +193,12 @@ LOG_FILE = os.path.join(PROJECT_ROOT, "logs", "arbitrage_bot.log")
 # Create logs directory if it doesn't exist
 os.makedirs(os.path.join(PROJECT_ROOT, "logs"), exist_ok=True)
 
+# Persistent pool/token metadata index (warm starts)
+PAIR_INDEX_PATH = os.getenv("PAIR_INDEX_PATH", os.path.join(PROJECT_ROOT, "logs", "pair_index.db"))
+
+# Learned gas usage per route template
+GAS_MODEL_PATH = os.getenv("GAS_MODEL_PATH", os.path.join(PROJECT_ROOT, "logs", "gas_model.json"))
+
 # Flash loan contract addresses (Aave V3 on Base)
 AAVE_LENDING_POOL = "0xA238Dd80C259a72e81d7e4664a9801593F98d1c5"
 AAVE_LENDING_POOL_ABI = [
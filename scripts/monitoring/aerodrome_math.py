@@ -0,0 +1,151 @@
+"""
+Integer port of Aerodrome Pool.getAmountOut for volatile (x * y) and stable (x^3 * y + y^3 * x)
+pools, with the reserves, decimals, stable flag and factory fee read in bulk by multicall.
+"""
+from web3 import Web3
+
+from config import AERODROME_FACTORY_ADDRESS
+from scripts.monitoring.multicall import Call, multicall, encode_call, decoder
+
+AERODROME_FACTORY = Web3.to_checksum_address(AERODROME_FACTORY_ADDRESS)
+FEE_DENOMINATOR = 10000  # Factory fees are in basis points
+ONE = 10 ** 18
+
+
+def metadata_call(pool):
+    """(dec0, dec1, r0, r1, st, t0, t1); dec0/dec1 are 10 ** decimals"""
+    return Call(pool, encode_call('metadata()'),
+                decoder('uint256', 'uint256', 'uint256', 'uint256', 'bool', 'address', 'address'))
+
+
+def get_fee_call(pool, stable):
+    return Call(AERODROME_FACTORY, encode_call('getFee(address,bool)', ['address', 'bool'],
+                                               [Web3.to_checksum_address(pool), stable]), decoder('uint256'))
+
+
+def _f(x0, y):
+    return (x0 * y // ONE) * (x0 * x0 // ONE + y * y // ONE) // ONE
+
+
+def _d(x0, y):
+    return 3 * x0 * (y * y // ONE) // ONE + (x0 * x0 // ONE) * x0 // ONE
+
+
+class AerodromePool:
+    """Reserves, decimals (as 10 ** decimals), curve type and fee of one pool; raw integer amounts throughout"""
+
+    def __init__(self, address, decimals0, decimals1, reserve0, reserve1, stable, fee):
+        self.address = address.lower()
+        self.decimals0, self.decimals1 = decimals0, decimals1
+        self.reserve0, self.reserve1 = reserve0, reserve1
+        self.stable = stable
+        self.fee = fee  # basis points
+
+    def _k(self, x, y):
+        if self.stable:
+            _x = x * ONE // self.decimals0
+            _y = y * ONE // self.decimals1
+            return (_x * _y // ONE) * (_x * _x // ONE + _y * _y // ONE) // ONE
+        return x * y
+
+    def _get_y(self, x0, xy, y):
+        """Newton iteration for y with _f(x0, y) == xy, as in Pool._get_y"""
+        for _ in range(255):
+            k = _f(x0, y)
+            if k < xy:
+                dy = (xy - k) * ONE // _d(x0, y)
+                if dy == 0:
+                    if k == xy:
+                        return y
+                    if self._k(x0, y + 1) > xy:
+                        return y + 1
+                    dy = 1
+                y += dy
+            else:
+                dy = (k - xy) * ONE // _d(x0, y)
+                if dy == 0:
+                    if k == xy or _f(x0, y - 1) < xy:
+                        return y
+                    dy = 1
+                y -= dy
+        raise ValueError("!y")
+
+    def get_amount_out(self, amount_in, token0_in):
+        """Pool.getAmountOut for a raw input amount of token0 (token0_in) or token1"""
+        if amount_in <= 0 or not self.reserve0 or not self.reserve1:
+            return 0
+        amount_in -= amount_in * self.fee // FEE_DENOMINATOR
+        reserve0, reserve1 = self.reserve0, self.reserve1
+        if not self.stable:
+            reserve_a, reserve_b = (reserve0, reserve1) if token0_in else (reserve1, reserve0)
+            return amount_in * reserve_b // (reserve_a + amount_in)
+        xy = self._k(reserve0, reserve1)
+        reserve0 = reserve0 * ONE // self.decimals0
+        reserve1 = reserve1 * ONE // self.decimals1
+        reserve_a, reserve_b = (reserve0, reserve1) if token0_in else (reserve1, reserve0)
+        amount_in = amount_in * ONE // (self.decimals0 if token0_in else self.decimals1)
+        y = reserve_b - self._get_y(amount_in + reserve_a, xy, reserve_b)
+        return y * (self.decimals1 if token0_in else self.decimals0) // ONE
+
+    def get_amounts_out(self, amounts_in, token0_in):
+        """Quotes for many input sizes (token units) at once, e.g. for a sizing search; token units out"""
+        scale_in, scale_out = (self.decimals0, self.decimals1) if token0_in else (self.decimals1, self.decimals0)
+        outputs = []
+        for amount in amounts_in:
+            try:
+                outputs.append(self.get_amount_out(int(amount * scale_in), token0_in) / scale_out)
+            except (ValueError, ZeroDivisionError):
+                outputs.append(0.0)
+        return outputs
+
+    def spot_price(self):
+        """Marginal price before fees as token0 per token1 (token units), or None without reserves"""
+        if not self.reserve0 or not self.reserve1:
+            return None
+        x, y = self.reserve0 / self.decimals0, self.reserve1 / self.decimals1
+        if not self.stable:
+            return x / y
+        # dx/dy along x^3 y + y^3 x = k
+        return (x ** 3 + 3 * x * y * y) / (3 * x * x * y + y ** 3)
+
+
+class AerodromeQuoteBook:
+    """Aerodrome pools quoted locally; curve type, decimals and fee are read once per pool, reserves kept current by the caller"""
+
+    def __init__(self):
+        self.pools = {}  # lowercase pool address -> AerodromePool
+
+    def __contains__(self, address):
+        return bool(address) and address.lower() in self.pools
+
+    def get(self, address):
+        return self.pools.get(address.lower()) if address else None
+
+    async def load(self, rpc, addresses, block='latest'):
+        """Read metadata() and the factory fee for pools not loaded yet; returns the newly loaded pools"""
+        addresses = [address.lower() for address in addresses if address.lower() not in self.pools]
+        if not addresses:
+            return []
+        block_identifier = hex(block) if isinstance(block, int) else block
+        metadata = await multicall(rpc, [metadata_call(address) for address in addresses], block_identifier=block_identifier)
+        found = [(address, meta) for address, meta in zip(addresses, metadata) if meta is not None]
+        fees = await multicall(rpc, [get_fee_call(address, meta[4]) for address, meta in found],
+                               block_identifier=block_identifier)
+        loaded = []
+        for (address, meta), fee in zip(found, fees):
+            if fee is None:
+                continue
+            decimals0, decimals1, reserve0, reserve1, stable = meta[:5]
+            self.pools[address] = AerodromePool(address, decimals0, decimals1, reserve0, reserve1, stable, fee)
+            loaded.append(self.pools[address])
+        return loaded
+
+    def update_reserves(self, address, reserve0, reserve1):
+        pool = self.get(address)
+        if pool is not None and reserve0 is not None and reserve1 is not None:
+            pool.reserve0, pool.reserve1 = reserve0, reserve1
+
+    def quote_many(self, address, amounts_in, token0_in):
+        """Token-unit outputs for token-unit input sizes, or None if the pool is not loaded"""
+        pool = self.get(address)
+        return None if pool is None else pool.get_amounts_out(amounts_in, token0_in)
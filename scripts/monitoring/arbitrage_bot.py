@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import threading
 import json
+import numpy as np
 
 # Write to terminal and app
 def setup_dual_logging():
@@ -67,8 +68,28 @@ print = dual_print
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config import PAIR_ABI, SUSHI_FACTORY_ABI, DEFAULT_ETH_AMOUNT, DEFAULT_GAS_ETH, DEFAULT_SLIPPAGE_PCT, USDC_ADDRESS, WETH_ADDRESS, ZORA_ADDRESS, SUSHI_FACTORY_ADDRESS, BASE_GAS_PRICE_GWEI, TRANSACTION_FEE_PCT, SLIPPAGE_PCT, MEV_PROTECTION_COST_USD, MIN_PROFIT_THRESHOLD_USD, SAFE_MODE, POSITION_SIZE_USD, FLASH_LOAN_ENABLED, EXECUTION_MODE, SIMULATION_MODE, MIN_PROFIT_PCT, MAX_PROFIT_PCT, MIN_LIQUIDITY_USD, ENABLE_UNISWAP_V3, ENABLE_SUSHISWAP, ENABLE_AERODROME, ENABLE_BALANCER_V2, UNISWAP_MAX_POOLS, SUSHISWAP_MAX_PAIRS, AERODROME_MAX_POOLS, BALANCER_MAX_POOLS
+from config import PAIR_ABI, SUSHI_FACTORY_ABI, DEFAULT_ETH_AMOUNT, DEFAULT_GAS_ETH, DEFAULT_SLIPPAGE_PCT, USDC_ADDRESS, WETH_ADDRESS, ZORA_ADDRESS, SUSHI_FACTORY_ADDRESS, BASE_GAS_PRICE_GWEI, TRANSACTION_FEE_PCT, SLIPPAGE_PCT, MEV_PROTECTION_COST_USD, MIN_PROFIT_THRESHOLD_USD, SAFE_MODE, POSITION_SIZE_USD, FLASH_LOAN_ENABLED, EXECUTION_MODE, SIMULATION_MODE, MIN_PROFIT_PCT, MAX_PROFIT_PCT, MIN_LIQUIDITY_USD, MULTICALL_CHUNK_SIZE, ENABLE_UNISWAP_V3, ENABLE_SUSHISWAP, ENABLE_AERODROME, ENABLE_BALANCER_V2, UNISWAP_MAX_POOLS, SUSHISWAP_MAX_PAIRS, AERODROME_MAX_POOLS, BALANCER_MAX_POOLS, UNISWAP_REFRESH_SECONDS, SUSHISWAP_REFRESH_SECONDS, AERODROME_REFRESH_SECONDS, BALANCER_REFRESH_SECONDS, UNISWAP_TIMEOUT_SECONDS, SUSHISWAP_TIMEOUT_SECONDS, AERODROME_TIMEOUT_SECONDS, BALANCER_TIMEOUT_SECONDS, ENABLE_CYCLE_DETECTION, CYCLE_MAX_HOPS, CYCLE_MIN_PROFIT_PCT, CYCLE_BASE_TOKENS, V3_QUOTE_POOLS
 from scripts.monitoring.token_addresses import TOKEN_ADDRESSES, WETH_BASE, USDC_BASE, weETH_BASE
+from scripts.monitoring.pair_index import PairIndex
+from scripts.monitoring.rpc_client import AsyncRPCClient
+from scripts.monitoring.transport import Transport, session_scope
+from scripts.monitoring.block_scheduler import NewHeadWatcher
+from scripts.monitoring.price_store import PriceStore
+from scripts.monitoring.columnar import PoolTable, DEX_NAMES, DEX_IDS
+from scripts.monitoring.detection import detect_spreads, IncrementalDetector
+from scripts.monitoring.token_graph import TokenGraph
+from scripts.monitoring.price_oracle import PRICE_ORACLE, eth_price_usd, usd_price
+from scripts.monitoring.gas_oracle import GAS_ORACLE
+from scripts.monitoring.gas_model import GAS_MODEL, route_key
+from scripts.monitoring.profit import (estimate_profit, estimate_profit_batch, sized_profit_batch, cost_terms, profit_analysis_at,
+                                       cost_floor_usd, net_profit_upper_bound)
+from scripts.monitoring.sizing import optimal_two_pool_trade, constant_product_out
+from scripts.monitoring.v3_quotes import V3QuoteBook, MINT_V3_TOPIC, BURN_V3_TOPIC
+from scripts.monitoring.aerodrome_math import AerodromeQuoteBook, AERODROME_FACTORY
+from scripts.monitoring.balancer_math import BalancerQuoteBook
+from scripts.monitoring.pool_state import PoolStateStore
+from scripts.monitoring.subgraph import fetch_paginated
+from scripts.monitoring.multicall import multicall, all_pairs_length_call, all_pairs_call, get_reserves_call, token0_call, token1_call, symbol_call, decimals_call
 
 load_dotenv()
 
@@ -81,12 +102,27 @@ ERROR_RETRY_SECONDS = int(os.getenv("ERROR_RETRY_SECONDS", "10"))
 MAX_LOOPS = int(os.getenv("MAX_LOOPS", "0"))  # 0 = infinite
 DASHBOARD_UPDATE_INTERVAL = int(os.getenv("DASHBOARD_UPDATE_INTERVAL", "5"))  # seconds
 
+# Block-triggered monitoring: start a cycle on every new head instead of sleeping a fixed interval
+BLOCK_TRIGGERED_MONITORING = os.getenv("BLOCK_TRIGGERED_MONITORING", "true").lower() == "true"
+BLOCK_POLL_INTERVAL_SECONDS = float(os.getenv("BLOCK_POLL_INTERVAL_SECONDS", "0.5"))  # Base produces a block every 2s
+
+# Pipelined monitoring: overlap fetching with analysis and execution
+PIPELINED_MONITORING = os.getenv("PIPELINED_MONITORING", "true").lower() == "true"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1"))  # Snapshots buffered between stages
+
+# Per-DEX refreshers writing into a shared price store (used by the pipelined loop)
+PER_DEX_REFRESH = os.getenv("PER_DEX_REFRESH", "true").lower() == "true"
+PRICE_MAX_AGE_SECONDS = float(os.getenv("PRICE_MAX_AGE_SECONDS", "120"))  # Leave out DEXes not refreshed for this long
+MAX_BLOCK_SKEW = int(os.getenv("MAX_BLOCK_SKEW", "10"))  # Never compare quotes further apart than this many blocks
+SUBGRAPH_MAX_LAG_BLOCKS = int(os.getenv("SUBGRAPH_MAX_LAG_BLOCKS", "150"))  # Refuse subgraph data older than this (~5 min on Base)
+
 # Web3 and API configuration
 WEB3_PROVIDER = os.getenv("WEB3_PROVIDER")
 UNISWAP_V3_SUBGRAPH = os.getenv("UNISWAP_V3_SUBGRAPH")
 AERODROME_SUBGRAPH = os.getenv("AERODROME_SUBGRAPH")
 BALANCER_V2_SUBGRAPH = os.getenv("BALANCER_V2_SUBGRAPH")
 UNISWAP_API_KEY = os.getenv("UNISWAP_API_KEY")
+BLOCK_HEADS_PROVIDER = os.getenv("BLOCK_HEADS_PROVIDER", WEB3_PROVIDER)  # Endpoint polled for new heads
 
 w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
 
@@ -105,6 +141,9 @@ FLASH_LOAN_ENABLED = False  # Disable flash loans for now, focus on regular arbi
 FLASH_LOAN_AMOUNT_USD = 1  # Reduced to $1 for testing
 FLASH_LOAN_FEE_PCT = 0.0009  # 0.09% flash loan fee
 FLASH_LOAN_MIN_PROFIT_USD = 0.1  # Reduced minimum profit for testing
+FLASH_LOAN_RECEIVER_DEXES = ('Uniswap', 'SushiSwap')  # DEXes FlashLoanReceiver._executeArbitrage swaps on
+ROUTE_DEXES = ('Uniswap', 'SushiSwap', 'Aerodrome')  # DEXes the regular two-transaction route swaps on
+ROUTE_DEADLINE_SECONDS = 120  # Router deadline of each regular route leg
 
 # Direct flash loan approach (no contract deployment needed)
 DIRECT_FLASH_LOAN = True  # Set to True for simpler approach
@@ -165,6 +204,7 @@ class ArbitrageExecutor:
         
         # Initialize contracts
         self.uniswap_router = w3.eth.contract(address=UNISWAP_V3_ROUTER, abi=UNISWAP_V3_ROUTER_ABI)
+        self.sushiswap_router = w3.eth.contract(address=Web3.to_checksum_address(SUSHISWAP_ROUTER), abi=SUSHISWAP_ROUTER_ABI)
         self.aerodrome_router = w3.eth.contract(address=AERODROME_ROUTER, abi=AERODROME_ROUTER_ABI)
         self.balancer_vault = w3.eth.contract(address=BALANCER_V2_VAULT, abi=BALANCER_V2_VAULT_ABI)
         
@@ -186,14 +226,18 @@ class ArbitrageExecutor:
     def validate_opportunity(self, opportunity):
         """Validate if an opportunity is realistic and executable"""
         profit_pct = opportunity['profit_pct']
+        # Sized opportunities carry the profit-maximising trade; none means fees and price impact eat the spread
+        if 'trade_size' in opportunity and opportunity['trade_size'] <= 0:
+            return False, "No profitable trade size after fees and price impact"
         # Allow any opportunity with profit_pct > 20%
         if profit_pct > 20:
             return True, "Profit percentage above 20%, running regardless of expected net profit."
         # SAFETY CHECKS FOR TESTING
         if SAFE_MODE:
             # Only allow very small amounts for testing
-            if POSITION_SIZE_USD > 10:
-                return False, f"Position size ${POSITION_SIZE_USD} too large for testing mode"
+            position_size_usd = opportunity.get('trade_size_usd', POSITION_SIZE_USD)
+            if position_size_usd > 10:
+                return False, f"Position size ${position_size_usd:,.2f} too large for testing mode"
             # Only allow profit up to MAX_PROFIT_PCT for safety
             if profit_pct > MAX_PROFIT_PCT:
                 return False, f"Profit {profit_pct:.2f}% too high for safe testing (max {MAX_PROFIT_PCT}%)"
@@ -212,28 +256,176 @@ class ArbitrageExecutor:
                 return False, f"Insufficient liquidity: ${tvl:,.0f} < ${MIN_LIQUIDITY_USD:,.0f}"
         return True, "Opportunity validated"
     
+    def spread_prefilter(self, profit_pct):
+        """Vectorized profit checks of validate_opportunity: False where a spread can never be validated"""
+        return (profit_pct > 20) | ((profit_pct >= MIN_PROFIT_PCT) & (profit_pct <= MAX_PROFIT_PCT))
+    
+    def gas_fee_params(self):
+        """EIP-1559 fee fields for the next transaction from the live gas oracle (empty until it has fee history)"""
+        return GAS_ORACLE.fee_params() if GAS_ORACLE.ready else {}
+    
+    def print_gas_plan(self, opportunity):
+        """Print the fee fields and route gas cost a live transaction would use"""
+        fees = self.gas_fee_params()
+        if fees:
+            print(f"   Gas: {fees['maxPriorityFeePerGas'] / 1e9:.6f} gwei priority, {fees['maxFeePerGas'] / 1e9:.6f} gwei max, "
+                  f"route cost ${opportunity['profit_analysis']['gas_cost_usd']:.4f}")
+    
+    def gas_template(self, opportunity, flash_loan=False):
+        """Gas model template of an opportunity's route"""
+        return route_key(opportunity['buy_dex'], opportunity['sell_dex'],
+                         opportunity.get('token0_address'), opportunity.get('token1_address'), flash_loan)
+    
+    def seed_route_gas(self, opportunity, txs, flash_loan=False):
+        """Seed the gas model with eth_estimateGas summed over a route's built transactions the first time its template is seen"""
+        template = self.gas_template(opportunity, flash_loan)
+        if template in GAS_MODEL.entries:
+            return
+        try:
+            GAS_MODEL.seed(template, sum(self.w3.eth.estimate_gas(tx) for tx in txs))
+        except Exception as e:
+            print(f"⚠️  Gas estimate failed for {opportunity['pair']}: {e}")
+    
+    def route_amounts(self, opportunity):
+        """(token0 in on the buy leg, minimum token1 out of it) in raw units"""
+        buy_amount = int(opportunity['trade_size'] * 10 ** opportunity['token0_decimals'])
+        # token1 bought on the first leg (buy_price is token0 per token1), less slippage
+        sell_amount = int(opportunity['trade_size'] / opportunity['buy_price'] * (1 - SLIPPAGE_PCT) * 10 ** opportunity['token1_decimals'])
+        return buy_amount, sell_amount
+    
+    def build_swap_tx(self, opportunity, dex, token_in, token_out, amount_in, amount_out_min, fee_tier):
+        """Exact-input swap transaction on one DEX's router"""
+        recipient = self.account.address
+        deadline = int(time.time()) + ROUTE_DEADLINE_SECONDS
+        if dex == 'Uniswap':
+            router = self.uniswap_router
+            data = router.encodeABI(fn_name='exactInputSingle', args=[
+                (token_in, token_out, int(fee_tier or 0), recipient, amount_in, amount_out_min, 0)])
+        elif dex == 'SushiSwap':
+            router = self.sushiswap_router
+            data = router.encodeABI(fn_name='swapExactTokensForTokens', args=[
+                amount_in, amount_out_min, [token_in, token_out], recipient, deadline])
+        else:
+            router = self.aerodrome_router
+            pool = AERODROME_QUOTES.get(opportunity.get('aerodrome_pool_address') or '')
+            stable = bool(pool is not None and pool.stable)
+            data = router.encodeABI(fn_name='swapExactTokensForTokens', args=[
+                amount_in, amount_out_min, [(token_in, token_out, stable, AERODROME_FACTORY)], recipient, deadline])
+        return {'from': recipient, 'to': router.address, 'data': data}
+    
+    def build_route_txs(self, opportunity):
+        """Buy and sell leg transactions of a sized opportunity, or None if the regular route cannot run it"""
+        if (self.account is None or not opportunity.get('trade_size', 0) > 0
+                or opportunity['buy_dex'] not in ROUTE_DEXES or opportunity['sell_dex'] not in ROUTE_DEXES
+                or opportunity.get('token0_decimals') is None or opportunity.get('token1_decimals') is None):
+            return None
+        token0 = Web3.to_checksum_address(opportunity['token0_address'])
+        token1 = Web3.to_checksum_address(opportunity['token1_address'])
+        buy_amount, sell_amount = self.route_amounts(opportunity)
+        # The sell leg must return at least the token0 spent on the buy leg
+        return [self.build_swap_tx(opportunity, opportunity['buy_dex'], token0, token1, buy_amount, sell_amount,
+                                   opportunity.get('buy_fee_tier')),
+                self.build_swap_tx(opportunity, opportunity['sell_dex'], token1, token0, sell_amount, buy_amount,
+                                   opportunity.get('sell_fee_tier'))]
+    
+    def send_transaction(self, tx):
+        """Sign and send a transaction with the oracle's fee fields and wait for its receipt"""
+        tx = dict(tx, **self.gas_fee_params())
+        tx['nonce'] = self.w3.eth.get_transaction_count(self.account.address)
+        tx['chainId'] = self.w3.eth.chain_id
+        tx['gas'] = self.w3.eth.estimate_gas(tx)
+        signed = self.account.sign_transaction(tx)
+        tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        print(f"📤 Sent {tx_hash.hex()}")
+        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    def ensure_allowance(self, token, spender, amount):
+        """Approve spender for amount of token if the current allowance is lower; returns False if approval fails"""
+        contract = self.w3.eth.contract(address=token, abi=ERC20_ABI)
+        if contract.functions.allowance(self.account.address, spender).call() >= amount:
+            return True
+        tx = {'from': self.account.address, 'to': token,
+              'data': contract.encodeABI(fn_name='approve', args=[spender, amount])}
+        return self.send_transaction(tx)['status'] == 1
+    
+    def build_flash_loan_tx(self, opportunity):
+        """requestFlashLoan transaction for a sized opportunity, or None if the receiver contract cannot run its route"""
+        if (self.flash_loan_receiver is None or self.account is None or not opportunity.get('trade_size', 0) > 0
+                or opportunity['buy_dex'] not in FLASH_LOAN_RECEIVER_DEXES or opportunity['sell_dex'] not in FLASH_LOAN_RECEIVER_DEXES
+                or opportunity.get('token0_decimals') is None or opportunity.get('token1_decimals') is None):
+            return None
+        token0 = Web3.to_checksum_address(opportunity['token0_address'])
+        token1 = Web3.to_checksum_address(opportunity['token1_address'])
+        buy_amount, sell_amount = self.route_amounts(opportunity)
+        data = self.flash_loan_receiver.encodeABI(fn_name='requestFlashLoan', args=[
+            token0, buy_amount, token0, token1, opportunity['buy_dex'], opportunity['sell_dex'], buy_amount, sell_amount,
+            int(opportunity.get('buy_fee_tier') or 0), int(opportunity.get('sell_fee_tier') or 0)])
+        return {'from': self.account.address, 'to': self.flash_loan_receiver.address, 'data': data}
+    
+    def record_receipt(self, opportunity, receipts, flash_loan=False):
+        """Learn the route's gas usage from the receipts of an executed trade"""
+        gas_used = sum(receipt['gasUsed'] for receipt in receipts)
+        gas = GAS_MODEL.record_receipt(self.gas_template(opportunity, flash_loan), gas_used)
+        print(f"⛽ Gas used {gas_used:,} ({opportunity['buy_dex']} → {opportunity['sell_dex']}), learned {gas:,.0f}")
+    
     def execute_arbitrage(self, opportunity):
-        """Execute regular arbitrage (simulation mode)"""
+        """Execute regular arbitrage as a buy and a sell transaction"""
+        txs = self.build_route_txs(opportunity)
+        if txs is not None:
+            self.seed_route_gas(opportunity, txs)
         if SIMULATION_MODE:
             print(f"🎮 SIMULATION: Would execute arbitrage for {opportunity['pair']}")
             print(f"   Buy on {opportunity['buy_dex']} @ {opportunity['buy_price']:.6f}")
             print(f"   Sell on {opportunity['sell_dex']} @ {opportunity['sell_price']:.6f}")
             print(f"   Expected profit: {opportunity['profit_pct']:.2f}%")
+            self.print_gas_plan(opportunity)
             return True
-        else:
-            print(f"❌ Live execution not implemented yet")
+        if txs is None:
+            print(f"❌ Cannot build a {opportunity['buy_dex']} → {opportunity['sell_dex']} route for {opportunity['pair']}")
+            return False
+        try:
+            token0 = Web3.to_checksum_address(opportunity['token0_address'])
+            token1 = Web3.to_checksum_address(opportunity['token1_address'])
+            buy_amount, sell_amount = self.route_amounts(opportunity)
+            receipts = []
+            for tx, token, amount in ((txs[0], token0, buy_amount), (txs[1], token1, sell_amount)):
+                if not self.ensure_allowance(token, tx['to'], amount):
+                    print(f"❌ Approval of {tx['to']} failed")
+                    return False
+                receipts.append(self.send_transaction(tx))
+                if receipts[-1]['status'] != 1:
+                    print(f"❌ Route transaction reverted: {receipts[-1]['transactionHash'].hex()}")
+                    return False
+            self.record_receipt(opportunity, receipts)
+            return True
+        except Exception as e:
+            print(f"❌ Live execution failed for {opportunity['pair']}: {e}")
             return False
     
     def execute_flash_loan_arbitrage(self, opportunity):
-        """Execute flash loan arbitrage (simulation mode)"""
+        """Execute flash loan arbitrage through the receiver contract"""
+        tx = self.build_flash_loan_tx(opportunity)
+        if tx is not None:
+            self.seed_route_gas(opportunity, [tx], flash_loan=True)
         if SIMULATION_MODE:
             print(f"🎮 SIMULATION: Would execute flash loan arbitrage for {opportunity['pair']}")
             print(f"   Buy on {opportunity['buy_dex']} @ {opportunity['buy_price']:.6f}")
             print(f"   Sell on {opportunity['sell_dex']} @ {opportunity['sell_price']:.6f}")
             print(f"   Expected profit: {opportunity['profit_pct']:.2f}%")
+            self.print_gas_plan(opportunity)
             return True
-        else:
-            print(f"❌ Live flash loan execution not implemented yet")
+        if tx is None:
+            print(f"❌ Flash loan receiver cannot run {opportunity['buy_dex']} → {opportunity['sell_dex']} for {opportunity['pair']}")
+            return False
+        try:
+            receipt = self.send_transaction(tx)
+            if receipt['status'] != 1:
+                print(f"❌ Flash loan reverted: {receipt['transactionHash'].hex()}")
+                return False
+            self.record_receipt(opportunity, [receipt], flash_loan=True)
+            return True
+        except Exception as e:
+            print(f"❌ Flash loan execution failed for {opportunity['pair']}: {e}")
             return False
 
 class MonitoringDashboard:
@@ -252,6 +444,9 @@ class MonitoringDashboard:
             'dex_stats': defaultdict(int),
             'pair_stats': defaultdict(int),
             'execution_times': deque(maxlen=100),
+            'stage_times': defaultdict(lambda: deque(maxlen=100)),
+            'snapshots_dropped': 0,
+            'filter_drops': defaultdict(int),
             'recent_opportunities': deque(maxlen=50)
         }
         self.lock = threading.Lock()
@@ -309,6 +504,21 @@ class MonitoringDashboard:
         with self.lock:
             self.stats['execution_times'].append(execution_time)
     
+    def add_stage_time(self, stage, seconds):
+        """Add a pipeline stage latency (fetch, analysis, execution) to tracking"""
+        with self.lock:
+            self.stats['stage_times'][stage].append(seconds)
+    
+    def add_filter_drops(self, drops):
+        """Add candidates dropped per filter stage (spread, liquidity, bound, validation, ...)"""
+        with self.lock:
+            for stage, count in drops.items():
+                self.stats['filter_drops'][stage] += count
+    
+    def get_avg_stage_times(self):
+        """Get average latency per pipeline stage"""
+        return {stage: sum(times) / len(times) for stage, times in self.stats['stage_times'].items() if times}
+    
     def get_uptime(self):
         """Get uptime string"""
         uptime = datetime.now() - self.stats['start_time']
@@ -340,6 +550,12 @@ class MonitoringDashboard:
             print(f"⏱️  Uptime: {self.get_uptime()}")
             print(f"🔄 Loops completed: {self.stats['loop_count']}")
             print(f"⚡ Avg execution time: {self.get_avg_execution_time():.1f}s")
+            stage_times = self.get_avg_stage_times()
+            if stage_times:
+                print("⚙️  Avg stage latency: " + " | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stage_times.items()))
+            print(f"🗑️  Stale snapshots dropped: {self.stats['snapshots_dropped']}")
+            if self.stats['filter_drops']:
+                print("🧹 Candidates filtered: " + " | ".join(f"{stage} {count}" for stage, count in self.stats['filter_drops'].items()))
             print(f"🎯 Opportunities found: {self.stats['total_opportunities_found']}")
             print(f"💰 Opportunities executed: {self.stats['opportunities_executed']}")
             print(f"📈 Opportunities/hour: {self.get_opportunities_per_hour():.1f}")
@@ -425,6 +641,9 @@ class MonitoringDashboard:
                 "uptime": uptime,
                 "loopCount": self.stats['loop_count'],
                 "avgExecutionTime": round(self.get_avg_execution_time(), 1),
+                "avgStageTimes": {stage: round(seconds, 2) for stage, seconds in self.get_avg_stage_times().items()},
+                "snapshotsDropped": self.stats['snapshots_dropped'],
+                "filterDrops": dict(self.stats['filter_drops']),
                 "totalOpportunitiesFound": self.stats['total_opportunities_found'],
                 "opportunitiesExecuted": self.stats['opportunities_executed'],
                 "opportunitiesPerHour": round(self.get_opportunities_per_hour(), 1),
@@ -463,57 +682,379 @@ class MonitoringDashboard:
         """Stop the dashboard"""
         self.running = False
 
-# Cache for token information to avoid repeated lookups
-TOKEN_CACHE = {}
-POOL_CACHE = {}
+# Persistent index of pool -> tokens and token -> (symbol, decimals) to avoid repeated lookups
+PAIR_INDEX = PairIndex()
 
-async def get_all_prices_parallel():
+# Candidates dropped per filter stage since the dashboard last collected them
+FILTER_DROPS = defaultdict(int)
+
+# Reserves / sqrt prices kept current from Sync and Swap logs between full scans
+POOL_STATES = PoolStateStore()
+POOL_STATE_LOCK = asyncio.Lock()
+
+# Tick-level state of the deepest Uniswap V3 pools, updated from the same log sweep
+V3_QUOTES = V3QuoteBook()
+POOL_STATES.extra_topics += [MINT_V3_TOPIC, BURN_V3_TOPIC]
+POOL_STATES.log_listeners.append(V3_QUOTES.apply_log)
+
+# Curve type, fee and decimals of every Aerodrome pool, for exact stable/volatile quotes
+AERODROME_QUOTES = AerodromeQuoteBook()
+
+# Balances, weights/amp, fees and scaling factors of the Balancer V2 pools, re-read every refresh
+BALANCER_QUOTES = BalancerQuoteBook()
+
+# Input sizes tried around the constant-product optimum when a leg is quoted exactly; while the
+# best size is at an edge the grid moves by its full width (x16), at most EXACT_SIZE_MAX_SHIFTS times
+EXACT_SIZE_GRID = np.geomspace(0.25, 4.0, 17)
+EXACT_SIZE_MAX_SHIFTS = 6
+
+# Token graph over every collected pool, for 3+ hop cycles
+TOKEN_GRAPH = TokenGraph(max_hops=CYCLE_MAX_HOPS, min_tvl=MIN_LIQUIDITY_USD)
+
+async def get_all_prices_parallel(transport=None):
     """Get all DEX prices in parallel for better performance"""
     try:
-        # Create list of enabled DEX functions
-        enabled_dex_functions = []
-        enabled_dex_names = []
-        
-        if ENABLE_UNISWAP_V3:
-            enabled_dex_functions.append(get_uniswap_prices())
-            enabled_dex_names.append('Uniswap')
-        
-        if ENABLE_SUSHISWAP:
-            enabled_dex_functions.append(get_sushiswap_prices())
-            enabled_dex_names.append('SushiSwap')
-        
-        if ENABLE_AERODROME:
-            enabled_dex_functions.append(get_aerodrome_prices())
-            enabled_dex_names.append('Aerodrome')
-        
-        if ENABLE_BALANCER_V2:
-            enabled_dex_functions.append(get_balancer_v2_prices())
-            enabled_dex_names.append('Balancer V2')
-        
-        if not enabled_dex_functions:
-            print("❌ No DEXes enabled! Please enable at least one DEX in config.py")
-            return {}
-        
-        # Parallel execution of enabled DEX price fetching
-        dex_results = await asyncio.gather(*enabled_dex_functions, return_exceptions=True)
-        
-        # Handle any exceptions from individual DEX calls
-        prices = {}
-        for i, result in enumerate(dex_results):
-            dex_name = enabled_dex_names[i]
-            if not isinstance(result, Exception):
-                prices[dex_name] = result
-            else:
-                print(f"❌ {dex_name} error: {result}")
-                prices[dex_name] = {}
-        
-        return prices
-        
+        # All subgraph and on-chain reads share one pooled transport; open a temporary one if none is given
+        if transport is not None:
+            return await _gather_dex_prices(transport)
+        async with Transport(WEB3_PROVIDER) as cycle_transport:
+            return await _gather_dex_prices(cycle_transport)
     except Exception as e:
         print(f"❌ Error in parallel price fetching: {e}")
         return {}
 
-async def monitor_once_optimized(executor, dashboard):
+async def _sync_pool_states(rpc):
+    """Apply Sync/Swap logs since the last cycle; returns the head block (None if unavailable)"""
+    # Refreshers may call this concurrently; the lock makes later callers a cheap no-op
+    async with POOL_STATE_LOCK:
+        try:
+            head = await rpc.block_number()
+        except Exception as e:
+            print(f"⚠️  Could not read head block, falling back to full scans: {e}")
+            POOL_STATES.reset()
+            V3_QUOTES.reset()
+            return None
+        if POOL_STATES.last_block == head:
+            return head
+        try:
+            await GAS_ORACLE.refresh(rpc, head)
+        except Exception as e:
+            print(f"⚠️  Could not refresh gas prices: {e}")
+        if not PRICE_ORACLE.anchored:
+            try:
+                await PRICE_ORACLE.refresh_fallback(rpc, head)
+            except Exception as e:
+                print(f"⚠️  Could not read ETH/USD from the fallback pool: {e}")
+        try:
+            touched = await POOL_STATES.sync(rpc, head)
+            if touched is None:
+                V3_QUOTES.reset()
+                print(f"🧾 Pool state store empty or stale, full scan at block {head}")
+            else:
+                print(f"🧾 Applied logs up to block {head}: {len(touched)} pools changed")
+        except Exception as e:
+            print(f"⚠️  Log sync failed, falling back to full scans: {e}")
+            POOL_STATES.reset()
+            V3_QUOTES.reset()
+        return head
+
+def pool_state_read_block(head):
+    """
+    Block to read pools at before watching them: the log sync cursor, so their state continues
+    exactly where the next sync starts. Call with POOL_STATE_LOCK held until the pools are watched.
+    """
+    return POOL_STATES.last_block if POOL_STATES.last_block is not None else head
+
+def subgraph_min_block(head):
+    """Oldest block a subgraph may answer from in a cycle pinned to head (None: any)"""
+    return None if head is None else max(0, head - SUBGRAPH_MAX_LAG_BLOCKS)
+
+async def refresh_uniswap(transport, head=None):
+    """Uniswap refresh step: subgraph pools with on-chain Swap prices overlaid; returns (prices, block)"""
+    if head is None:
+        head = await _sync_pool_states(transport.rpc)
+    prices = await get_uniswap_prices(transport.session, subgraph_min_block(head))
+    POOL_STATES.refresh_prices(prices, 'v3', block=head)
+    if head is not None:
+        POOL_STATES.mark_synced(head)
+        await load_v3_quote_pools(transport, prices, head)
+    return prices, head
+
+async def load_v3_quote_pools(transport, prices, head):
+    """Load tick state for the deepest Uniswap pools not in the quote book yet"""
+    deepest = sorted(prices.values(), key=lambda info: info['tvl'], reverse=True)[:V3_QUOTE_POOLS]
+    missing = [info['pool_id'] for info in deepest if info['pool_id'] not in V3_QUOTES]
+    if not missing:
+        return
+    # No log sync may run between reading the pools and adding them to the quote book
+    async with POOL_STATE_LOCK:
+        try:
+            loaded = await V3_QUOTES.load(transport.rpc, transport.session, UNISWAP_V3_SUBGRAPH, missing,
+                                          pool_state_read_block(head))
+            print(f"📐 Loaded tick state for {loaded}/{len(missing)} Uniswap pools ({len(V3_QUOTES.pools)} quoted exactly)")
+        except Exception as e:
+            print(f"⚠️  Could not load Uniswap tick state: {e}")
+
+async def refresh_sushiswap(transport, head=None):
+    """SushiSwap refresh step: apply logs, then read only new pairs; returns (prices, block)"""
+    if head is None:
+        head = await _sync_pool_states(transport.rpc)
+    prices = await get_sushiswap_prices(transport.rpc, block=head)
+    if head is not None:
+        POOL_STATES.mark_synced(head)
+    return prices, head
+
+async def refresh_aerodrome(transport, head=None):
+    """Aerodrome refresh step: subgraph pools with on-chain Sync prices overlaid; returns (prices, block)"""
+    if head is None:
+        head = await _sync_pool_states(transport.rpc)
+    prices = await get_aerodrome_prices(transport.session, subgraph_min_block(head))
+    await load_aerodrome_pools(transport, prices, head)
+    POOL_STATES.refresh_prices(prices, 'aerodrome', block=head)
+    apply_aerodrome_curves(prices, head)
+    if head is not None:
+        POOL_STATES.mark_synced(head)
+    return prices, head
+
+async def load_aerodrome_pools(transport, prices, head):
+    """Read curve type, fee and reserves for Aerodrome pools seen for the first time"""
+    # No log sync may run between reading the reserves and watching the pools
+    async with POOL_STATE_LOCK:
+        block = pool_state_read_block(head)
+        try:
+            loaded = await AERODROME_QUOTES.load(transport.rpc, [info['pool_id'] for info in prices.values()],
+                                                 block if block is not None else 'latest')
+        except Exception as e:
+            print(f"⚠️  Could not read Aerodrome pool metadata: {e}")
+            return
+        for pool in loaded:
+            state = POOL_STATES.get(pool.address)
+            if block is not None and (state is None or state.get('reserve0') is None):
+                POOL_STATES.watch(pool.address, 'aerodrome', block=block, reserve0=pool.reserve0, reserve1=pool.reserve1)
+    if loaded:
+        stable = sum(1 for pool in loaded if pool.stable)
+        print(f"📐 Loaded {len(loaded)} Aerodrome pools ({stable} stable)")
+
+def apply_aerodrome_curves(prices, block=None):
+    """Set fee and curve type on Aerodrome entries; stable pools are priced on their own curve as of block"""
+    for info in prices.values():
+        pool = AERODROME_QUOTES.get(info['pool_id'])
+        if pool is None:
+            continue
+        state = POOL_STATES.get(pool.address)
+        if state is not None:
+            AERODROME_QUOTES.update_reserves(pool.address, state.get('reserve0'), state.get('reserve1'))
+        info['stable'] = pool.stable
+        info['fee_tier'] = pool.fee * 100  # Basis points to hundredths of a bip, like Uniswap fee tiers
+        info['fee'] = pool.fee / 10000
+        if pool.stable and pool.spot_price():
+            info['price'] = pool.spot_price()
+            info['reserve0'], info['reserve1'] = pool.reserve0 / pool.decimals0, pool.reserve1 / pool.decimals1
+            if block is not None:
+                info['block'] = block
+
+async def refresh_balancer_v2(transport, head=None):
+    """Balancer V2 refresh step: subgraph pools repriced from on-chain pool state; returns (prices, block)"""
+    try:
+        if head is None:
+            head = await transport.rpc.block_number()
+    except Exception as e:
+        print(f"⚠️  Could not read head block for Balancer V2: {e}")
+    prices = await get_balancer_v2_prices(transport.session, subgraph_min_block(head))
+    if head is None:
+        return prices, None
+    try:
+        loaded = await BALANCER_QUOTES.load(transport.rpc, [(info['pool_id'], info['pool_address']) for info in prices.values()], head)
+        print(f"📐 Read on-chain state for {loaded}/{len(prices)} Balancer V2 pools")
+    except Exception as e:
+        print(f"⚠️  Could not read Balancer V2 pool state, using subgraph prices: {e}")
+        BALANCER_QUOTES.pools = {}
+        return prices, None
+    apply_balancer_math(prices, head)
+    return prices, head
+
+def apply_balancer_math(prices, block=None):
+    """Price Balancer entries with their pool's weighted/stable math as of block and set fee and (virtual) reserves"""
+    for info in prices.values():
+        pool = BALANCER_QUOTES.get(info['pool_id'])
+        if pool is None or info['token0'].lower() not in pool.tokens or info['token1'].lower() not in pool.tokens:
+            continue
+        i, j = pool.index(info['token0']), pool.index(info['token1'])
+        decimals0, decimals1 = info['decimals0'], info['decimals1']
+        price = pool.spot_price(i, j, decimals0, decimals1)
+        if not price:
+            continue
+        info['price'] = price
+        info['block'] = block
+        info['fee'] = pool.swap_fee / 1e18
+        info['stable'] = pool.stable
+        balance0, balance1 = pool.balances[i] / 10 ** decimals0, pool.balances[j] / 10 ** decimals1
+        if pool.stable:
+            info['reserve0'], info['reserve1'] = balance0, balance1
+        else:
+            # Constant-product reserves with the same spot price; exact for 50/50 pools
+            info['reserve0'] = balance0 / (2 * pool.weights[i] / 1e18)
+            info['reserve1'] = balance1 / (2 * pool.weights[j] / 1e18)
+
+def get_enabled_dexes():
+    """(name, refresh step, refresh interval, timeout) for every enabled DEX"""
+    dexes = []
+    if ENABLE_UNISWAP_V3:
+        dexes.append(('Uniswap', refresh_uniswap, UNISWAP_REFRESH_SECONDS, UNISWAP_TIMEOUT_SECONDS))
+    if ENABLE_SUSHISWAP:
+        dexes.append(('SushiSwap', refresh_sushiswap, SUSHISWAP_REFRESH_SECONDS, SUSHISWAP_TIMEOUT_SECONDS))
+    if ENABLE_AERODROME:
+        dexes.append(('Aerodrome', refresh_aerodrome, AERODROME_REFRESH_SECONDS, AERODROME_TIMEOUT_SECONDS))
+    if ENABLE_BALANCER_V2:
+        dexes.append(('Balancer V2', refresh_balancer_v2, BALANCER_REFRESH_SECONDS, BALANCER_TIMEOUT_SECONDS))
+    return dexes
+
+async def _gather_dex_prices(transport):
+    """Run every enabled DEX fetcher concurrently and collect their price maps"""
+    dexes = get_enabled_dexes()
+    if not dexes:
+        print("❌ No DEXes enabled! Please enable at least one DEX in config.py")
+        return {}
+    
+    head = await _sync_pool_states(transport.rpc)
+    
+    # Parallel execution of enabled DEX price fetching
+    dex_results = await asyncio.gather(*[refresh(transport, head) for _, refresh, _, _ in dexes], return_exceptions=True)
+    
+    # Handle any exceptions from individual DEX calls
+    prices = {}
+    for (dex_name, _, _, _), result in zip(dexes, dex_results):
+        if not isinstance(result, Exception):
+            prices[dex_name] = result[0]
+        else:
+            print(f"❌ {dex_name} error: {result}")
+            prices[dex_name] = {}
+    
+    return prices
+
+async def run_dex_refresher(name, refresh, interval, timeout, transport, price_store):
+    """Refresh one DEX on its own cadence and publish each result into the shared price store"""
+    while True:
+        started_at = time.time()
+        try:
+            prices, block = await asyncio.wait_for(refresh(transport), timeout)
+            price_store.update(name, prices, block)
+            print(f"🔁 {name}: {len(prices)} pools refreshed in {time.time() - started_at:.1f}s" + (f" (block {block})" if block else ""))
+        except asyncio.TimeoutError:
+            print(f"⏰ {name} refresh timed out after {timeout}s")
+        except Exception as e:
+            print(f"❌ {name} refresh error: {e}")
+        await asyncio.sleep(max(0.0, interval - (time.time() - started_at)))
+
+def start_dex_refreshers(transport, price_store):
+    """Start one independent refresher task per enabled DEX"""
+    return [
+        asyncio.create_task(run_dex_refresher(name, refresh, interval, timeout, transport, price_store))
+        for name, refresh, interval, timeout in get_enabled_dexes()
+    ]
+
+def print_snapshot_counts(all_prices):
+    print(f"📊 Found {len(all_prices.get('Uniswap', {}))} Uniswap pools")
+    print(f"📊 Found {len(all_prices.get('Aerodrome', {}))} Aerodrome pools")
+    print(f"📊 Found {len(all_prices.get('Balancer V2', {}))} Balancer V2 pools")
+    print(f"📊 Found {len(all_prices.get('SushiSwap', {}))} SushiSwap pools")
+
+async def fetch_snapshot(transport=None):
+    """Fetch stage: one price snapshot across all enabled DEXes"""
+    all_prices = await get_all_prices_parallel(transport)
+    print_snapshot_counts(all_prices)
+    return {'prices': all_prices, 'fetched_at': time.time()}
+
+def analyze_snapshot(snapshot, executor, detector=None):
+    """Analysis stage: find executable opportunities in a snapshot"""
+    print("🔍 Analyzing arbitrage opportunities...")
+    # Price store snapshots carry a ready table view; one-shot fetches are converted here
+    view = snapshot.get('table')
+    if view is None:
+        view = PoolTable.from_prices(snapshot['prices']).view()
+    # USD prices for this block, shared by every profit figure below
+    blocks = [block for block in (snapshot.get('blocks') or {}).values() if block is not None]
+    PRICE_ORACLE.update(view, snapshot.get('block') or (max(blocks) if blocks else None))
+    if ENABLE_CYCLE_DETECTION:
+        report_cycles(view)
+    if detector is None:
+        return find_opportunities_in_table(view, executor)
+    
+    # Only pairs whose pools changed since the previous snapshot are re-evaluated
+    delta = detector.update(view)
+    print(f"🧮 Re-evaluated {detector.last_dirty} changed pairs: {len(delta.new)} new, {len(delta.updated)} updated, {len(delta.expired)} expired opportunities")
+    return detector.current()
+
+def _token_symbol(view, row, token):
+    """Symbol of a canonical token id as recorded on the pool entry at row"""
+    entry = view.entries[row]
+    first = view.token0[row] == token
+    if view.inverted[row]:
+        first = not first
+    return entry.get('symbol0' if first else 'symbol1') or view.token_labels[token][:8]
+
+def report_cycles(view, top=5):
+    """Report profitable 3+ hop routes across all DEXes (detection only, these are not executed)"""
+    started_at = time.time()
+    if not TOKEN_GRAPH.update(view):
+        return []  # No pool changed since the last search
+    token_ids = {label: i for i, label in enumerate(view.token_labels)}
+    sources = [token_ids[address.lower()] for address in CYCLE_BASE_TOKENS if address.lower() in token_ids]
+    cycles = TOKEN_GRAPH.find_cycles(sources, min_hops=3, min_profit_pct=CYCLE_MIN_PROFIT_PCT)
+    print(f"🔺 Cycle search over {TOKEN_GRAPH.last_searched}/{TOKEN_GRAPH.edge_count} edges: {len(cycles)} profitable routes in {time.time() - started_at:.3f}s")
+    for cycle in cycles[:top]:
+        route = _token_symbol(view, cycle.rows[0], cycle.tokens[0])
+        for row, token in zip(cycle.rows, cycle.tokens[1:]):
+            route += f" -[{DEX_NAMES[view.dex[row]]}]-> {_token_symbol(view, row, token)}"
+        print(f"   {cycle.hops}-hop +{cycle.profit_pct:.3f}%: {route}")
+    return cycles
+
+def act_on_opportunities(opportunities, executor, dashboard):
+    """Execution stage: report opportunities and execute the best one"""
+    # Update dashboard with opportunities
+    for opp in opportunities:
+        dashboard.add_opportunity(opp)
+    
+    if not opportunities:
+        print("❌ No executable arbitrage opportunities found")
+        return
+    
+    print(f"\n🔥 Found {len(opportunities)} executable arbitrage opportunities:")
+    print("-" * 80)
+    
+    # Sort by profit percentage
+    opportunities.sort(key=lambda x: x.get('profit_pct', 0), reverse=True)
+    
+    executed = False
+    for i, opp in enumerate(opportunities[:5]):  # Show top 5
+        analysis = opp['profit_analysis']
+        strategy = opp.get('strategy', 'regular')
+        print(f"{i+1}. {opp['pair']} ({strategy.upper()})")
+        print(f"   Buy on {opp['buy_dex']} @ {opp['buy_price']:.6f} | Sell on {opp['sell_dex']} @ {opp['sell_price']:.6f}")
+        print(f"   Profit: {opp['profit_pct']:.2f}%")
+        print(f"   Net Profit: ${analysis.get('net_profit_usd', 0):.2f}")
+        print(f"   Net Profit %: {analysis.get('net_profit_pct', 0):.2f}%")
+        
+        if EXECUTION_MODE and not executed:
+            print(f"\n🎯 Executing opportunity: {opp['pair']}")
+            print(f"   Strategy: {strategy.upper()}")
+            
+            if FLASH_LOAN_ENABLED:
+                print(f"💰 Using FLASH LOAN arbitrage for {opp['pair']}")
+                success = executor.execute_flash_loan_arbitrage(opp)
+            else:
+                print(f"💰 Using REGULAR arbitrage for {opp['pair']}")
+                success = executor.execute_arbitrage(opp)
+            
+            if success:
+                print("✅ Arbitrage executed successfully!")
+                dashboard.update_stats(opportunities_executed=1)
+                executed = True
+                break
+            else:
+                print("❌ Arbitrage execution failed")
+
+async def monitor_once_optimized(executor, dashboard, transport=None):
     """Optimized single monitoring cycle with dashboard integration"""
     start_time = time.time()
     
@@ -525,63 +1066,18 @@ async def monitor_once_optimized(executor, dashboard):
         sys.stdout.flush()
         
         # Parallel price fetching
-        all_prices = await get_all_prices_parallel()
-        
-        # Extract individual DEX prices
-        uniswap_prices = all_prices.get('Uniswap', {})
-        aerodrome_prices = all_prices.get('Aerodrome', {})
-        balancer_v2_prices = all_prices.get('Balancer V2', {})
-        sushiswap_prices = all_prices.get('SushiSwap', {})
+        snapshot = await fetch_snapshot(transport)
+        fetched_at = time.time()
         
-        print(f"📊 Found {len(uniswap_prices)} Uniswap pools")
-        print(f"📊 Found {len(aerodrome_prices)} Aerodrome pools")
-        print(f"📊 Found {len(balancer_v2_prices)} Balancer V2 pools")
-        print(f"📊 Found {len(sushiswap_prices)} SushiSwap pools")
+        opportunities = analyze_snapshot(snapshot, executor)
+        analyzed_at = time.time()
+        dashboard.add_filter_drops(take_filter_drops())
         
-        print("🔍 Analyzing arbitrage opportunities...")
-        opportunities = find_arbitrage_opportunities(uniswap_prices, aerodrome_prices, balancer_v2_prices, sushiswap_prices, executor=executor)
+        act_on_opportunities(opportunities, executor, dashboard)
         
-        # Update dashboard with opportunities
-        for opp in opportunities:
-            dashboard.add_opportunity(opp)
-        
-        if not opportunities:
-            print("❌ No executable arbitrage opportunities found")
-        else:
-            print(f"\n🔥 Found {len(opportunities)} executable arbitrage opportunities:")
-            print("-" * 80)
-            
-            # Sort by profit percentage
-            opportunities.sort(key=lambda x: x.get('profit_pct', 0), reverse=True)
-            
-            executed = False
-            for i, opp in enumerate(opportunities[:5]):  # Show top 5
-                analysis = opp['profit_analysis']
-                strategy = opp.get('strategy', 'regular')
-                print(f"{i+1}. {opp['pair']} ({strategy.upper()})")
-                print(f"   Buy on {opp['buy_dex']} @ {opp['buy_price']:.6f} | Sell on {opp['sell_dex']} @ {opp['sell_price']:.6f}")
-                print(f"   Profit: {opp['profit_pct']:.2f}%")
-                print(f"   Net Profit: ${analysis.get('net_profit_usd', 0):.2f}")
-                print(f"   Net Profit %: {analysis.get('net_profit_pct', 0):.2f}%")
-                
-                if EXECUTION_MODE and not executed:
-                    print(f"\n🎯 Executing opportunity: {opp['pair']}")
-                    print(f"   Strategy: {strategy.upper()}")
-                    
-                    if FLASH_LOAN_ENABLED:
-                        print(f"💰 Using FLASH LOAN arbitrage for {opp['pair']}")
-                        success = executor.execute_flash_loan_arbitrage(opp)
-                    else:
-                        print(f"💰 Using REGULAR arbitrage for {opp['pair']}")
-                        success = executor.execute_arbitrage(opp)
-                    
-                    if success:
-                        print("✅ Arbitrage executed successfully!")
-                        dashboard.update_stats(opportunities_executed=1)
-                        executed = True
-                        break
-                    else:
-                        print("❌ Arbitrage execution failed")
+        dashboard.add_stage_time('fetch', fetched_at - start_time)
+        dashboard.add_stage_time('analysis', analyzed_at - fetched_at)
+        dashboard.add_stage_time('execution', time.time() - analyzed_at)
         
         # Update execution time
         execution_time = time.time() - start_time
@@ -594,6 +1090,150 @@ async def monitor_once_optimized(executor, dashboard):
         print(f"❌ Error in monitoring cycle: {e}")
         dashboard.update_stats(errors=1)
 
+def put_latest(queue, item):
+    """Put item on a bounded queue, dropping the oldest entries when full; returns how many were dropped"""
+    dropped = 0
+    while queue.full():
+        queue.get_nowait()
+        dropped += 1
+    queue.put_nowait(item)
+    return dropped
+
+async def monitor_pipelined(executor, dashboard, transport, price_store=None):
+    """
+    Staged monitoring: fetch, analysis and execution run as separate tasks linked by bounded queues,
+    so snapshot N+1 is fetched while snapshot N is analysed and acted on. When a stage falls behind,
+    the oldest queued snapshot is dropped instead of building up a backlog of stale prices.
+    With a price_store, the fetch stage reads a snapshot of the store kept current by the
+    per-DEX refreshers instead of fetching every DEX itself.
+    """
+    analysis_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    execution_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    
+    async def triggers():
+        if BLOCK_TRIGGERED_MONITORING:
+            heads_rpc = transport.rpc
+            if BLOCK_HEADS_PROVIDER and BLOCK_HEADS_PROVIDER != WEB3_PROVIDER:
+                heads_rpc = AsyncRPCClient(BLOCK_HEADS_PROVIDER, session=transport.session)
+            watcher = NewHeadWatcher(heads_rpc, BLOCK_POLL_INTERVAL_SECONDS, error_retry_seconds=ERROR_RETRY_SECONDS)
+            async for head, skipped in watcher.heads():
+                if skipped:
+                    print(f"⏭️  Coalesced {skipped} blocks that arrived during the previous fetch")
+                yield head
+        else:
+            while True:
+                yield None
+                await asyncio.sleep(MONITORING_INTERVAL_SECONDS)
+    
+    async def fetch_stage():
+        snapshot_id = 0
+        last_version = None
+        async for head in triggers():
+            started_at = time.time()
+            try:
+                if price_store is not None:
+                    snapshot = price_store.snapshot(max_age=PRICE_MAX_AGE_SECONDS)
+                    if snapshot['version'] == last_version:
+                        continue  # Nothing was refreshed since the last snapshot
+                    last_version = snapshot['version']
+                    snapshot_id += 1
+                    print(f"\n🔄 Snapshot #{snapshot_id} (store version {last_version})" + (f" at block {head}" if head else ""))
+                    print_snapshot_counts(snapshot['prices'])
+                else:
+                    snapshot_id += 1
+                    print(f"\n🔄 Fetching snapshot #{snapshot_id}" + (f" for block {head}" if head else "") + f" at {datetime.now().strftime('%H:%M:%S')}")
+                    snapshot = await fetch_snapshot(transport)
+            except Exception as e:
+                print(f"❌ Error in fetch stage: {e}")
+                dashboard.update_stats(errors=1)
+                continue
+            snapshot.update({'id': snapshot_id, 'block': head, 'started_at': started_at})
+            dashboard.add_stage_time('fetch', time.time() - started_at)
+            dropped = put_latest(analysis_queue, snapshot)
+            if dropped:
+                print(f"🗑️  Dropped {dropped} stale snapshot(s) waiting for analysis")
+                dashboard.update_stats(snapshots_dropped=dropped)
+    
+    # Store snapshots are views of one continuously updated table, so detection can be incremental
+    detector = None
+    if price_store is not None:
+        detector = IncrementalDetector(lambda view, spreads: opportunities_from_spreads(view, spreads, executor),
+                                       max_block_skew=MAX_BLOCK_SKEW, cost_epoch=cost_epoch)
+    
+    async def analysis_stage():
+        while True:
+            snapshot = await analysis_queue.get()
+            started_at = time.time()
+            try:
+                # Runs on the event loop: the quote books and oracles it reads are updated by loop tasks
+                opportunities = analyze_snapshot(snapshot, executor, detector)
+            except Exception as e:
+                print(f"❌ Error in analysis stage: {e}")
+                dashboard.update_stats(errors=1)
+                if detector is not None:
+                    detector.reset()  # Next snapshot is evaluated in full
+                continue
+            dashboard.add_stage_time('analysis', time.time() - started_at)
+            dashboard.add_filter_drops(take_filter_drops())
+            dropped = put_latest(execution_queue, (snapshot, opportunities))
+            if dropped:
+                print(f"🗑️  Dropped {dropped} stale analysed snapshot(s) waiting for execution")
+                dashboard.update_stats(snapshots_dropped=dropped)
+    
+    async def execution_stage():
+        loop_count = 0
+        while True:
+            snapshot, opportunities = await execution_queue.get()
+            started_at = time.time()
+            try:
+                # Off the loop because sends block on receipts; the gas oracle and model it shares with loop tasks are locked
+                await asyncio.to_thread(act_on_opportunities, opportunities, executor, dashboard)
+            except Exception as e:
+                print(f"❌ Error in execution stage: {e}")
+                dashboard.update_stats(errors=1)
+            dashboard.add_stage_time('execution', time.time() - started_at)
+            
+            # End-to-end latency from trigger to decision for this snapshot
+            cycle_time = time.time() - snapshot['started_at']
+            dashboard.add_execution_time(cycle_time)
+            dashboard.update_stats(loop_count=1)
+            print(f"⏱️  Snapshot #{snapshot['id']} completed in {cycle_time:.1f}s")
+            
+            loop_count += 1
+            if MAX_LOOPS > 0 and loop_count >= MAX_LOOPS:
+                print(f"✅ Reached maximum loops ({MAX_LOOPS}), stopping...")
+                return
+    
+    tasks = [asyncio.create_task(fetch_stage()), asyncio.create_task(analysis_stage()), asyncio.create_task(execution_stage())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def monitor_on_new_blocks(executor, dashboard, transport):
+    """Run one monitoring cycle per new block; blocks that arrive mid-cycle are coalesced"""
+    heads_rpc = transport.rpc
+    if BLOCK_HEADS_PROVIDER and BLOCK_HEADS_PROVIDER != WEB3_PROVIDER:
+        heads_rpc = AsyncRPCClient(BLOCK_HEADS_PROVIDER, session=transport.session)
+    watcher = NewHeadWatcher(heads_rpc, BLOCK_POLL_INTERVAL_SECONDS, error_retry_seconds=ERROR_RETRY_SECONDS)
+    
+    loop_count = 0
+    async for head, skipped in watcher.heads():
+        if MAX_LOOPS > 0 and loop_count >= MAX_LOOPS:
+            print(f"✅ Reached maximum loops ({MAX_LOOPS}), stopping...")
+            break
+        
+        print(f"\n🧱 New block {head}")
+        if skipped:
+            print(f"⏭️  Coalesced {skipped} blocks that arrived during the previous cycle")
+        
+        await monitor_once_optimized(executor, dashboard, transport)
+        loop_count += 1
+
 async def monitor_continuously():
     """Continuous monitoring with dashboard"""
     executor = ArbitrageExecutor(PRIVATE_KEY)
@@ -605,7 +1245,10 @@ async def monitor_continuously():
     print(f"💰 Position Size: ${POSITION_SIZE_USD:,.0f}")
     print(f"📊 Profit Range: {MIN_PROFIT_PCT}%-{MAX_PROFIT_PCT}%")
     print(f"💧 Min Liquidity: ${MIN_LIQUIDITY_USD:,.0f}")
-    print(f"⏱️  Monitoring Interval: {MONITORING_INTERVAL_SECONDS}s")
+    if BLOCK_TRIGGERED_MONITORING:
+        print(f"⏱️  Monitoring Trigger: every new block (polling every {BLOCK_POLL_INTERVAL_SECONDS}s)")
+    else:
+        print(f"⏱️  Monitoring Interval: {MONITORING_INTERVAL_SECONDS}s")
     print(f"📊 Dashboard Update: {DASHBOARD_UPDATE_INTERVAL}s")
     print(f"🛡️  Safe Mode: {'ENABLED' if SAFE_MODE else 'DISABLED'}")
     print(f"🚀 Flash Loan Enabled: {FLASH_LOAN_ENABLED}")
@@ -628,25 +1271,44 @@ async def monitor_continuously():
     # Start dashboard thread
     dashboard.start_dashboard_thread()
     
+    # One pooled HTTP transport for the lifetime of the loop (closed in finally)
+    transport = await Transport(WEB3_PROVIDER).start()
+    
     try:
-        loop_count = 0
-        while True:
-            if MAX_LOOPS > 0 and loop_count >= MAX_LOOPS:
-                print(f"✅ Reached maximum loops ({MAX_LOOPS}), stopping...")
-                break
+        if PIPELINED_MONITORING and PER_DEX_REFRESH:
+            # Each DEX refreshes on its own cadence into the shared store; cycles read snapshots of it
+            price_store = PriceStore()
+            refresher_tasks = start_dex_refreshers(transport, price_store)
+            try:
+                await monitor_pipelined(executor, dashboard, transport, price_store)
+            finally:
+                for task in refresher_tasks:
+                    task.cancel()
+                await asyncio.gather(*refresher_tasks, return_exceptions=True)
+        elif PIPELINED_MONITORING:
+            await monitor_pipelined(executor, dashboard, transport)
+        elif BLOCK_TRIGGERED_MONITORING:
+            await monitor_on_new_blocks(executor, dashboard, transport)
+        else:
+            loop_count = 0
+            while True:
+                if MAX_LOOPS > 0 and loop_count >= MAX_LOOPS:
+                    print(f"✅ Reached maximum loops ({MAX_LOOPS}), stopping...")
+                    break
+                    
+                await monitor_once_optimized(executor, dashboard, transport)
+                loop_count += 1
                 
-            await monitor_once_optimized(executor, dashboard)
-            loop_count += 1
-            
-            # Wait for next cycle
-            print(f"⏳ Waiting {MONITORING_INTERVAL_SECONDS}s until next cycle...")
-            await asyncio.sleep(MONITORING_INTERVAL_SECONDS)
+                # Wait for next cycle
+                print(f"⏳ Waiting {MONITORING_INTERVAL_SECONDS}s until next cycle...")
+                await asyncio.sleep(MONITORING_INTERVAL_SECONDS)
             
     except KeyboardInterrupt:
         print("\n🛑 Monitoring stopped by user")
     except Exception as e:
         print(f"❌ Fatal error in monitoring: {e}")
     finally:
+        await transport.close()
         dashboard.stop()
         print("\n📊 Final Dashboard:")
         dashboard.print_dashboard()
@@ -671,348 +1333,262 @@ async def monitor():
         print(f"❌ Error in monitor: {e}")
 
 # Add missing functions that were in the original file
-async def get_uniswap_prices():
+UNISWAP_POOL_FIELDS = """
+        token0 { id symbol decimals }
+        token1 { id symbol decimals }
+        token0Price
+        token1Price
+        totalValueLockedUSD
+        volumeUSD
+        feeTier
+"""
+
+AERODROME_POOL_FIELDS = """
+        token0 { id symbol decimals }
+        token1 { id symbol decimals }
+        token0Price
+        token1Price
+        totalValueLockedUSD
+        volumeUSD
+"""
+
+def deepest_pools(prices, limit):
+    """The limit highest-TVL entries of a price map (pools are fetched in id order, so the cap is applied here)"""
+    if len(prices) <= limit:
+        return prices
+    return dict(sorted(prices.items(), key=lambda item: item[1]['tvl'], reverse=True)[:limit])
+
+async def get_uniswap_prices(session=None, min_block=None):
     """Get all Uniswap V3 pool prices with enhanced monitoring"""
     if not UNISWAP_V3_SUBGRAPH:
         print("UNISWAP_V3_SUBGRAPH not configured")
         return {}
     
-    query = {
-        "query": """
-        {
-          pools(first: 1000, orderBy: totalValueLockedUSD, orderDirection: desc) {
-            id
-            token0 { id symbol }
-            token1 { id symbol }
-            token0Price
-            token1Price
-            totalValueLockedUSD
-            volumeUSD
-            feeTier
-          }
-        }
-        """
-    }
+    prices = {}
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(UNISWAP_V3_SUBGRAPH, json=query) as resp:
-                result = await resp.json()
-                
-                print(f"Uniswap subgraph response status: {resp.status}")
-                if resp.status != 200:
-                    print(f"Uniswap subgraph error: {result}")
-                    return {}
-                
-                if result is None:
-                    print("Uniswap subgraph returned None")
-                    return {}
-                
-                pools = result.get("data", {}).get("pools", [])
-                print(f"Found {len(pools)} Uniswap pools")
-                
-                # Limit pools for performance
-                pools = pools[:UNISWAP_MAX_POOLS]
-                print(f"Processing first {len(pools)} pools (limited for performance)")
-                
-                prices = {}
-                processed_count = 0
-                for i, pool in enumerate(pools):
-                    if i % 1000 == 0:
-                        print(f"Processing Uniswap pool {i}/{len(pools)}...")
-                    
-                    try:
-                        tokens = pool["token0"], pool["token1"]
-                        price = float(pool.get('token0Price', 0))
-                        tvl = float(pool.get("totalValueLockedUSD", 0))
-                        volume = float(pool.get("volumeUSD", 0))
-                        fee_tier = int(pool.get("feeTier", 3000))
-                        
-                        if price > 0 and tvl > MIN_LIQUIDITY_USD and volume > 1000:
-                            pair_key = f"{tokens[0]['symbol']}/{tokens[1]['symbol']}"
-                            prices[pair_key] = {
-                                'price': price,
-                                'tvl': tvl,
-                                'volume': volume,
-                                'fee_tier': fee_tier,
-                                'pool_id': pool['id'],
-                                'token0': tokens[0]['id'],
-                                'token1': tokens[1]['id']
-                            }
-                            processed_count += 1
-                    except Exception as e:
-                        continue
-                
-                print(f"Processed {processed_count} Uniswap pools with valid prices")
-                return prices
+    def add_pools(pools):
+        """Parse one page of pools into the price map as it arrives"""
+        for pool in pools:
+            try:
+                tokens = pool["token0"], pool["token1"]
+                price = float(pool.get('token0Price', 0))
+                tvl = float(pool.get("totalValueLockedUSD", 0))
+                volume = float(pool.get("volumeUSD", 0))
+                fee_tier = int(pool.get("feeTier", 3000))
                 
+                if price > 0 and tvl > MIN_LIQUIDITY_USD and volume > 1000:
+                    # Keyed by pool so every fee tier of a pair is kept
+                    prices[pool['id'].lower()] = {
+                        'price': price,
+                        'tvl': tvl,
+                        'volume': volume,
+                        'fee_tier': fee_tier,
+                        'pool_id': pool['id'],
+                        'token0': tokens[0]['id'],
+                        'token1': tokens[1]['id'],
+                        'symbol0': tokens[0]['symbol'],
+                        'symbol1': tokens[1]['symbol'],
+                        'decimals0': int(tokens[0].get('decimals') or 18),
+                        'decimals1': int(tokens[1].get('decimals') or 18)
+                    }
+            except Exception as e:
+                continue
+    
+    try:
+        async with session_scope(session) as session:
+            # Page through every pool above the liquidity floor; the deepest ones are kept below
+            fetched, block = await fetch_paginated(
+                session, UNISWAP_V3_SUBGRAPH, 'pools', UNISWAP_POOL_FIELDS,
+                where=f'totalValueLockedUSD_gt: "{MIN_LIQUIDITY_USD}"',
+                on_page=add_pools, min_block=min_block
+            )
+        
+        # Every price is tagged with the block the subgraph served it from
+        for info in prices.values():
+            info['block'] = block
+        prices = deepest_pools(prices, UNISWAP_MAX_POOLS)
+        print(f"Found {fetched} Uniswap pools (keeping the {UNISWAP_MAX_POOLS} deepest)")
+        print(f"Processed {len(prices)} Uniswap pools with valid prices")
+        return prices
+        
     except Exception as e:
         print(f"Error fetching Uniswap prices: {e}")
-        return {}
+        raise
 
-async def get_aerodrome_prices():
+async def get_aerodrome_prices(session=None, min_block=None):
     """Get all Aerodrome pool prices with enhanced monitoring"""
     if not AERODROME_SUBGRAPH:
         print("AERODROME_SUBGRAPH not configured")
         return {}
     
-    query = {
-        "query": """
-        {
-          pools(first: 1000, orderBy: totalValueLockedUSD, orderDirection: desc) {
-            id
-            token0 { id symbol }
-            token1 { id symbol }
-            token0Price
-            token1Price
-            totalValueLockedUSD
-            volumeUSD
-          }
-        }
-        """
-    }
+    prices = {}
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(AERODROME_SUBGRAPH, json=query) as resp:
-                result = await resp.json()
-                
-                print(f"Aerodrome subgraph response status: {resp.status}")
-                if resp.status != 200:
-                    print(f"Aerodrome subgraph error: {result}")
-                    return {}
-                
-                if result is None:
-                    print("Aerodrome subgraph returned None")
-                    return {}
-                
-                pairs = result.get("data", {}).get("pools", [])
-                print(f"Found {len(pairs)} Aerodrome pools")
-                
-                # Limit pools for performance
-                pairs = pairs[:AERODROME_MAX_POOLS]
-                print(f"Processing first {len(pairs)} pools (limited for performance)")
-                
-                prices = {}
-                processed_count = 0
-                for i, pair in enumerate(pairs):
-                    if i % 100 == 0:
-                        print(f"Processing Aerodrome pool {i}/{len(pairs)}...")
-                    
-                    try:
-                        t0 = pair["token0"]
-                        t1 = pair["token1"]
-                        pair_key = f"{t0['symbol']}/{t1['symbol']}"
-                        
-                        price = 1.0
-                        if 'token0Price' in pair and pair['token0Price']:
-                            price = float(pair['token0Price'])
-                        elif 'token1Price' in pair and pair['token1Price']:
-                            price = float(pair['token1Price'])
-                        
-                        tvl = float(pair.get("totalValueLockedUSD", 0))
-                        volume = float(pair.get("volumeUSD", 0))
-                        
-                        if 0.0001 < price < 1000000 and tvl > MIN_LIQUIDITY_USD and volume > 1000:
-                            prices[pair_key] = {
-                                'price': price,
-                                'tvl': tvl,
-                                'volume': volume,
-                                'pool_id': pair['id'],
-                                'token0': t0['id'],
-                                'token1': t1['id'],
-                                'fee_tier': None
-                            }
-                            processed_count += 1
-                    except Exception as e:
-                        continue
+    def add_pools(pairs):
+        """Parse one page of pools into the price map as it arrives"""
+        for pair in pairs:
+            try:
+                t0 = pair["token0"]
+                t1 = pair["token1"]
+                price = 1.0
+                if 'token0Price' in pair and pair['token0Price']:
+                    price = float(pair['token0Price'])
+                elif 'token1Price' in pair and pair['token1Price']:
+                    price = float(pair['token1Price'])
                 
-                print(f"Processed {processed_count} Aerodrome pools")
-                return prices
+                tvl = float(pair.get("totalValueLockedUSD", 0))
+                volume = float(pair.get("volumeUSD", 0))
                 
+                if 0.0001 < price < 1000000 and tvl > MIN_LIQUIDITY_USD and volume > 1000:
+                    prices[pair['id'].lower()] = {
+                        'price': price,
+                        'tvl': tvl,
+                        'volume': volume,
+                        'pool_id': pair['id'],
+                        'token0': t0['id'],
+                        'token1': t1['id'],
+                        'symbol0': t0['symbol'],
+                        'symbol1': t1['symbol'],
+                        'decimals0': int(t0.get('decimals') or 18),
+                        'decimals1': int(t1.get('decimals') or 18),
+                        'fee_tier': None
+                    }
+            except Exception as e:
+                continue
+    
+    try:
+        async with session_scope(session) as session:
+            # Page through every pool above the liquidity floor; the deepest ones are kept below
+            fetched, block = await fetch_paginated(
+                session, AERODROME_SUBGRAPH, 'pools', AERODROME_POOL_FIELDS,
+                where=f'totalValueLockedUSD_gt: "{MIN_LIQUIDITY_USD}"',
+                on_page=add_pools, min_block=min_block
+            )
+        
+        # Every price is tagged with the block the subgraph served it from
+        for info in prices.values():
+            info['block'] = block
+        prices = deepest_pools(prices, AERODROME_MAX_POOLS)
+        print(f"Found {fetched} Aerodrome pools (keeping the {AERODROME_MAX_POOLS} deepest)")
+        print(f"Processed {len(prices)} Aerodrome pools")
+        return prices
+        
     except Exception as e:
         print(f"Error fetching Aerodrome prices: {e}")
-        return {}
+        raise
+
+BALANCER_POOL_FIELDS = """
+        address
+        poolType
+        poolTypeVersion
+        tokens {
+          id
+          address
+          symbol
+          decimals
+          balance
+          weight
+        }
+        totalLiquidity
+        totalShares
+        swapFee
+"""
 
-async def get_balancer_v2_prices():
+async def get_balancer_v2_prices(session=None, min_block=None):
     """Get all Balancer V2 pool prices with enhanced monitoring"""
     if not BALANCER_V2_SUBGRAPH:
         print("BALANCER_V2_SUBGRAPH not configured")
         return {}
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            # Step 1: Get all pool IDs from balancers
-            print("🔍 Step 1: Fetching Balancer V2 pool IDs...")
-            pool_ids_query = {
-                "query": """
-                {
-                  balancers {
-                    id
-                    poolCount
-                    pools {
-                      id
-                    }
-                  }
-                }
-                """
-            }
-            
-            async with session.post(BALANCER_V2_SUBGRAPH, json=pool_ids_query) as resp:
-                result = await resp.json()
-                
-                print(f"Balancer V2 subgraph response status: {resp.status}")
-                if resp.status != 200:
-                    print(f"Balancer V2 subgraph error: {result}")
-                    return {}
+    prices = {}
+    
+    def add_pools(pools):
+        """Parse one page of pools (tokens included) into the price map as it arrives"""
+        for pool_data in pools:
+            try:
+                # A composable stable pool lists its own BPT among the tokens; it is not a swap leg
+                tokens = [token for token in pool_data.get("tokens", [])
+                          if (token.get('address') or '').lower() != pool_data['address'].lower()]
+                if len(tokens) < 2:
+                    continue
                 
-                if result is None:
-                    print("Balancer V2 subgraph returned None")
-                    return {}
+                # Get the first two tokens for price calculation
+                token0 = tokens[0]
+                token1 = tokens[1]
                 
-                # Extract pool IDs from balancers
-                pool_ids = []
-                balancers = result.get("data", {}).get("balancers", [])
-                for balancer in balancers:
-                    pools = balancer.get("pools", [])
-                    for pool in pools:
-                        pool_ids.append(pool["id"])
+                # Subgraph balances are already in token units
+                balance0 = token0.get("balance")
+                balance1 = token1.get("balance")
+                weight0 = token0.get("weight")
+                weight1 = token1.get("weight")
                 
-                print(f"Found {len(pool_ids)} Balancer V2 pool IDs")
+                # Check for null values before converting to float
+                if balance0 is None or balance1 is None:
+                    continue
                 
-                if not pool_ids:
-                    print("No pool IDs found")
-                    return {}
+                # Convert to float after null checks
+                balance0 = float(balance0)
+                balance1 = float(balance1)
                 
-                # Step 2: Query each pool for details (limit to first 100 for performance)
-                print("🔍 Step 2: Fetching pool details...")
-                prices = {}
-                processed_count = 0
+                if balance0 == 0 or balance1 == 0:
+                    continue
                 
-                # Limit to first 100 pools for performance
-                pool_ids_to_query = pool_ids[:BALANCER_MAX_POOLS]
+                # Rough subgraph price (token0 per token1); replaced by the pool math once on-chain state is read
+                if weight0 is None or weight1 is None:
+                    price = balance0 / balance1
+                else:
+                    price = (balance0 / float(weight0)) / (balance1 / float(weight1)) if float(weight1) > 0 else 0
                 
-                for i, pool_id in enumerate(pool_ids_to_query):
-                    if i % 10 == 0:
-                        print(f"Processing Balancer V2 pool {i}/{len(pool_ids_to_query)}...")
-                    
-                    try:
-                        # Query individual pool details
-                        pool_query = {
-                            "query": f"""
-                            {{
-                              pool(id: "{pool_id}") {{
-                                id
-                                address
-                                poolType
-                                poolTypeVersion
-                                tokens {{
-                                  id
-                                  symbol
-                                  decimals
-                                  balance
-                                  weight
-                                }}
-                                swaps(first: 1, orderBy: timestamp, orderDirection: desc) {{
-                                  tokenAmountIn
-                                  tokenAmountOut
-                                  tokenIn
-                                  tokenOut
-                                }}
-                                totalLiquidity
-                                totalShares
-                              }}
-                            }}
-                            """
-                        }
-                        
-                        async with session.post(BALANCER_V2_SUBGRAPH, json=pool_query) as pool_resp:
-                            pool_result = await pool_resp.json()
-                            
-                            if pool_resp.status != 200:
-                                continue
-                            
-                            pool_data = pool_result.get("data", {}).get("pool")
-                            if not pool_data:
-                                continue
-                            
-                            tokens = pool_data.get("tokens", [])
-                            if len(tokens) < 2:
-                                continue
-                            
-                            # Get the first two tokens for price calculation
-                            token0 = tokens[0]
-                            token1 = tokens[1]
-                            
-                            # Calculate price based on token balances and weights
-                            balance0 = token0.get("balance")
-                            balance1 = token1.get("balance")
-                            weight0 = token0.get("weight")
-                            weight1 = token1.get("weight")
-                            
-                            # Check for null values before converting to float
-                            if balance0 is None or balance1 is None:
-                                continue
-                            
-                            # Convert to float after null checks
-                            balance0 = float(balance0)
-                            balance1 = float(balance1)
-                            
-                            if balance0 == 0 or balance1 == 0:
-                                continue
-                            
-                            # Calculate price based on pool type
-                            if weight0 is None or weight1 is None:
-                                # For pools without weights (Gyro, Stable, etc.), use balance-based pricing
-                                decimals0 = int(token0.get("decimals", 18))
-                                decimals1 = int(token1.get("decimals", 18))
-                                balance0_float = balance0 / (10 ** decimals0)
-                                balance1_float = balance1 / (10 ** decimals1)
-                                price = balance1_float / balance0_float if balance0_float > 0 else 0
-                            else:
-                                # For weighted pools, use weight-based pricing
-                                weight0 = float(weight0)
-                                weight1 = float(weight1)
-                                decimals0 = int(token0.get("decimals", 18))
-                                decimals1 = int(token1.get("decimals", 18))
-                                balance0_float = balance0 / (10 ** decimals0)
-                                balance1_float = balance1 / (10 ** decimals1)
-                                price = (balance1_float / weight1) / (balance0_float / weight0) if balance0_float > 0 and weight0 > 0 else 0
-                            
-                            # Get total liquidity
-                            total_liquidity = float(pool_data.get("totalLiquidity", 0))
-                            
-                            # Estimate TVL (rough calculation)
-                            tvl = total_liquidity * 2  # Rough estimate
-                            
-                            pair_key = f"{token0['symbol']}/{token1['symbol']}"
-                            
-                            # Filter for liquid pools
-                            if 0.0001 < price < 1000000 and tvl > MIN_LIQUIDITY_USD:
-                                prices[pair_key] = {
-                                    'price': price,
-                                    'tvl': tvl,
-                                    'volume': 0,
-                                    'pool_id': pool_data['id'],
-                                    'pool_address': pool_data['address'],
-                                    'token0': token0['id'],
-                                    'token1': token1['id'],
-                                    'fee_tier': None
-                                }
-                                processed_count += 1
-                                
-                    except Exception as e:
-                        print(f"Error processing pool {pool_id}: {e}")
-                        continue
+                # Get total liquidity
+                total_liquidity = float(pool_data.get("totalLiquidity", 0))
                 
-                print(f"Processed {processed_count} Balancer V2 pools")
-                return prices
+                # Estimate TVL (rough calculation)
+                tvl = total_liquidity * 2  # Rough estimate
                 
+                # Filter for liquid pools
+                if 0.0001 < price < 1000000 and tvl > MIN_LIQUIDITY_USD:
+                    prices[pool_data['id'].lower()] = {
+                        'price': price,
+                        'tvl': tvl,
+                        'volume': 0,
+                        'pool_id': pool_data['id'],
+                        'pool_address': pool_data['address'],
+                        'token0': token0.get('address') or token0['id'],
+                        'token1': token1.get('address') or token1['id'],
+                        'symbol0': token0['symbol'],
+                        'symbol1': token1['symbol'],
+                        'decimals0': int(token0.get('decimals') or 18),
+                        'decimals1': int(token1.get('decimals') or 18),
+                        'fee': float(pool_data.get('swapFee') or 0.003),
+                        'fee_tier': None
+                    }
+                    
+            except Exception as e:
+                print(f"Error processing pool {pool_data.get('id')}: {e}")
+                continue
+    
+    try:
+        async with session_scope(session) as session:
+            # One paged query returns pools with their tokens; the liquidity floor is applied server-side
+            print("🔍 Fetching Balancer V2 pools with tokens (paged)...")
+            fetched, block = await fetch_paginated(
+                session, BALANCER_V2_SUBGRAPH, 'pools', BALANCER_POOL_FIELDS,
+                where=f'totalLiquidity_gt: "{MIN_LIQUIDITY_USD / 2}"',
+                on_page=add_pools, min_block=min_block
+            )
+        
+        # Every price is tagged with the block the subgraph served it from
+        for info in prices.values():
+            info['block'] = block
+        prices = deepest_pools(prices, BALANCER_MAX_POOLS)
+        print(f"Found {fetched} Balancer V2 pools (keeping the {BALANCER_MAX_POOLS} deepest)")
+        print(f"Processed {len(prices)} Balancer V2 pools")
+        return prices
+        
     except Exception as e:
         print(f"Error fetching Balancer V2 prices: {e}")
-        return {}
+        raise
 
-async def get_sushiswap_prices():
+async def get_sushiswap_prices(rpc=None, block=None):
     """Get all SushiSwap pool prices with enhanced monitoring"""
     # SushiSwap factory address on Base (from official documentation)
     SUSHISWAP_FACTORY = "0x71524B4f93c58fcbF659783284E38825f0622859"
@@ -1020,76 +1596,108 @@ async def get_sushiswap_prices():
     # SushiSwap router address on Base (from official documentation)
     SUSHISWAP_ROUTER = "0x6BDED42c6DA8FBf0d2bA55B2fa120C5e0c8D7891"
     
-    # SushiSwap Factory ABI (minimal for pair enumeration)
-    FACTORY_ABI = [
-        {"constant":True,"inputs":[{"internalType":"uint256","name":"","type":"uint256"}],"name":"allPairs","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":False,"stateMutability":"view","type":"function"},
-        {"constant":True,"inputs":[],"name":"allPairsLength","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":False,"stateMutability":"view","type":"function"},
-        {"constant":True,"inputs":[{"internalType":"address","name":"","type":"address"},{"internalType":"address","name":"","type":"address"}],"name":"getPair","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":False,"stateMutability":"view","type":"function"}
-    ]
-    
-    # SushiSwap Pair ABI (minimal for price calculation)
-    PAIR_ABI = [
-        {"constant":True,"inputs":[],"name":"getReserves","outputs":[{"internalType":"uint112","name":"_reserve0","type":"uint112"},{"internalType":"uint112","name":"_reserve1","type":"uint112"},{"internalType":"uint32","name":"_blockTimestampLast","type":"uint32"}],"payable":False,"stateMutability":"view","type":"function"},
-        {"constant":True,"inputs":[],"name":"token0","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":False,"stateMutability":"view","type":"function"},
-        {"constant":True,"inputs":[],"name":"token1","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":False,"stateMutability":"view","type":"function"}
-    ]
+    # Reuse the caller's RPC client when given, otherwise open one for this scan
+    owns_rpc = rpc is None
+    if owns_rpc:
+        rpc = AsyncRPCClient(WEB3_PROVIDER)
     
     try:
         print("🔍 Fetching SushiSwap V2 prices from Base network...")
         
-        # Create factory contract
-        factory_contract = w3.eth.contract(address=Web3.to_checksum_address(SUSHISWAP_FACTORY), abi=FACTORY_ABI)
+        # Every read of the scan is pinned to one block
+        block_tag = block if block is not None else 'latest'
         
         # Get total number of pairs
-        pair_count = factory_contract.functions.allPairsLength().call()
+        pair_count = await rpc.call(all_pairs_length_call(SUSHISWAP_FACTORY), block_tag)
         print(f"   Found {pair_count} SushiSwap pairs on Base")
         
         if pair_count == 0:
             print("   No SushiSwap pairs found on Base")
             return {}
         
-        # Limit to first 100 pairs for performance
+        # Limit pairs for performance
         pairs_to_check = min(pair_count, SUSHISWAP_MAX_PAIRS)
-        print(f"   Checking first {pairs_to_check} pairs...")
+        print(f"   Checking first {pairs_to_check} pairs (multicall chunks of {MULTICALL_CHUNK_SIZE})...")
+        
+        # Batch 1: pair addresses created since the last scan (earlier ones come from the index)
+        scanned_length = PAIR_INDEX.get_scanned_length(SUSHISWAP_FACTORY)
+        if scanned_length < pairs_to_check:
+            new_addresses = await multicall(rpc, [all_pairs_call(SUSHISWAP_FACTORY, i) for i in range(scanned_length, pairs_to_check)],
+                                            block_identifier=block_tag)
+            new_pools = []
+            for offset, address in enumerate(new_addresses):
+                if address is None:
+                    break  # Keep the scanned range contiguous; retry from here next cycle
+                new_pools.append((scanned_length + offset, address, None, None))
+            if new_pools:
+                PAIR_INDEX.add_pools('SushiSwap', new_pools, factory=SUSHISWAP_FACTORY)
+                PAIR_INDEX.set_scanned_length(SUSHISWAP_FACTORY, scanned_length + len(new_pools))
+            print(f"   Indexed {len(new_pools)} new pairs ({scanned_length} already known)")
+        pair_addresses = PAIR_INDEX.get_factory_pairs(SUSHISWAP_FACTORY, limit=pairs_to_check)
+        
+        # Batch 2: token addresses for pairs not yet in the index
+        unresolved = [address for address in pair_addresses if PAIR_INDEX.get_pool(address)['token0'] is None]
+        if unresolved:
+            token_calls = []
+            for pair_address in unresolved:
+                token_calls.extend([token0_call(pair_address), token1_call(pair_address)])
+            token_results = await multicall(rpc, token_calls, block_identifier=block_tag)
+            resolved = []
+            for i, pair_address in enumerate(unresolved):
+                token0_address, token1_address = token_results[i * 2], token_results[i * 2 + 1]
+                if token0_address and token1_address:
+                    resolved.append((PAIR_INDEX.get_pool(pair_address)['pair_index'], pair_address, token0_address, token1_address))
+            PAIR_INDEX.add_pools('SushiSwap', resolved, factory=SUSHISWAP_FACTORY)
+        
+        # Batch 3: reserves (the only mutable data) for pairs not already kept current by Sync logs
+        # No log sync may run between reading the reserves and watching the pairs
+        async with POOL_STATE_LOCK:
+            unwatched = [address for address in pair_addresses if not POOL_STATES.is_watched(address)]
+            if unwatched:
+                reserve_block = pool_state_read_block(block)
+                reserve_results = await multicall(rpc, [get_reserves_call(address) for address in unwatched],
+                                                  block_identifier=reserve_block if reserve_block is not None else 'latest')
+                for address, reserves in zip(unwatched, reserve_results):
+                    if reserves is not None:
+                        POOL_STATES.watch(address, 'v2', block=reserve_block, reserve0=reserves[0], reserve1=reserves[1])
+        print(f"   Read reserves for {len(unwatched)} pairs, {len(pair_addresses) - len(unwatched)} kept current from Sync logs")
+        
+        pairs = []
+        for pair_address in pair_addresses:
+            pool = PAIR_INDEX.get_pool(pair_address)
+            state = POOL_STATES.get(pair_address)
+            if state is None or pool['token0'] is None:
+                continue
+            if not state.get('reserve0') or not state.get('reserve1'):
+                continue  # Skip pairs with no liquidity
+            pairs.append((pair_address, state['reserve0'], state['reserve1'], pool['token0'], pool['token1']))
+        
+        # Batch 4: symbol and decimals for tokens not yet in the index
+        tokens = sorted({pair[3] for pair in pairs} | {pair[4] for pair in pairs})
+        unknown_tokens = [token for token in tokens if PAIR_INDEX.get_token(token) is None]
+        if unknown_tokens:
+            token_calls = []
+            for token in unknown_tokens:
+                token_calls.extend([symbol_call(token), decimals_call(token)])
+            token_results = await multicall(rpc, token_calls, block_identifier=block_tag)
+            new_tokens = {}
+            for i, token in enumerate(unknown_tokens):
+                symbol, decimals = token_results[i * 2], token_results[i * 2 + 1]
+                if symbol is not None and decimals is not None:
+                    new_tokens[token] = (symbol, decimals)
+            PAIR_INDEX.add_tokens(new_tokens)
+        token_info = {token: PAIR_INDEX.get_token(token) for token in tokens if PAIR_INDEX.get_token(token)}
         
         prices = {}
         processed_count = 0
         
-        for i in range(pairs_to_check):
-            if i % 10 == 0:
-                print(f"   Processing pair {i}/{pairs_to_check}...")
-            
+        for pair_address, reserve0, reserve1, token0_address, token1_address in pairs:
             try:
-                # Get pair address
-                pair_address = factory_contract.functions.allPairs(i).call()
-                
-                # Create pair contract
-                pair_contract = w3.eth.contract(address=pair_address, abi=PAIR_ABI)
-                
-                # Get reserves
-                reserves = pair_contract.functions.getReserves().call()
-                reserve0, reserve1 = reserves[0], reserves[1]
-                
-                if reserve0 == 0 or reserve1 == 0:
-                    continue  # Skip pairs with no liquidity
-                
-                # Get token addresses
-                token0_address = pair_contract.functions.token0().call()
-                token1_address = pair_contract.functions.token1().call()
-                
-                # Get token symbols and decimals
-                try:
-                    token0_contract = w3.eth.contract(address=token0_address, abi=ERC20_ABI)
-                    token1_contract = w3.eth.contract(address=token1_address, abi=ERC20_ABI)
-                    
-                    token0_symbol = token0_contract.functions.symbol().call()
-                    token1_symbol = token1_contract.functions.symbol().call()
-                    token0_decimals = token0_contract.functions.decimals().call()
-                    token1_decimals = token1_contract.functions.decimals().call()
-                    
-                except Exception as e:
-                    # Skip pairs with inaccessible tokens
+                # Skip pairs with inaccessible tokens
+                if token0_address not in token_info or token1_address not in token_info:
                     continue
+                token0_symbol, token0_decimals = token_info[token0_address]
+                token1_symbol, token1_decimals = token_info[token1_address]
                 
                 # Calculate price (token0/token1) with proper decimal handling - consistent with Uniswap V3
                 reserve0_float = reserve0 / (10 ** token0_decimals)
@@ -1103,34 +1711,33 @@ async def get_sushiswap_prices():
                 
                 # Filter for realistic prices and liquid pairs
                 if 0.0001 < price < 1000000 and reserve0_float > 0.001 and reserve1_float > 0.001:
-                    pair_key = f"{token0_symbol}/{token1_symbol}"
-                    
-                    # Estimate TVL (rough calculation)
-                    tvl_estimate = 0
-                    if token0_symbol == 'WETH' or token1_symbol == 'WETH':
-                        weth_price_usd = 2500
-                        if token0_symbol == 'WETH':
-                            tvl_estimate = reserve0_float * weth_price_usd * 2
-                        else:
-                            tvl_estimate = reserve1_float * weth_price_usd * 2
-                    elif token0_symbol == 'USDC' or token1_symbol == 'USDC':
-                        usdc_price_usd = 1
-                        if token0_symbol == 'USDC':
-                            tvl_estimate = reserve0_float * usdc_price_usd * 2
-                        else:
-                            tvl_estimate = reserve1_float * usdc_price_usd * 2
+                    # TVL from USD prices by token address; a pool holds equal value on both sides,
+                    # so one priced side is doubled, and with neither priced the TVL is unknown (NaN)
+                    token0_usd, token1_usd = usd_price(token0_address), usd_price(token1_address)
+                    if token0_usd is not None and token1_usd is not None:
+                        tvl_estimate = reserve0_float * token0_usd + reserve1_float * token1_usd
+                    elif token0_usd is not None:
+                        tvl_estimate = reserve0_float * token0_usd * 2
+                    elif token1_usd is not None:
+                        tvl_estimate = reserve1_float * token1_usd * 2
                     else:
-                        # Rough estimate for other tokens
-                        tvl_estimate = (reserve0_float + reserve1_float) * 1000
+                        tvl_estimate = float('nan')
                     
-                    prices[pair_key] = {
+                    prices[pair_address.lower()] = {
                         'price': price,
                         'tvl': tvl_estimate,
                         'volume': 0,
                         'pool_id': pair_address,
                         'token0': token0_address,
                         'token1': token1_address,
-                        'fee_tier': None
+                        'symbol0': token0_symbol,
+                        'symbol1': token1_symbol,
+                        'decimals0': token0_decimals,
+                        'decimals1': token1_decimals,
+                        'reserve0': reserve0_float,
+                        'reserve1': reserve1_float,
+                        'fee_tier': None,
+                        'block': block
                     }
                     processed_count += 1
                     
@@ -1143,214 +1750,240 @@ async def get_sushiswap_prices():
         
     except Exception as e:
         print(f"Error fetching SushiSwap prices: {e}")
-        return {}
+        raise
+    finally:
+        if owns_rpc:
+            await rpc.close()
 
-def validate_token_match(pair, all_prices):
-    """Validate that the same tokens are being compared across DEXes"""
-    # Extract token addresses for this pair from all DEXes
-    token_addresses = {}
-    
-    for dex_name, dex_prices in all_prices.items():
-        if pair in dex_prices:
-            pool_info = dex_prices[pair]
-            token0 = pool_info.get('token0')
-            token1 = pool_info.get('token1')
-            if token0 and token1:
-                token_addresses[dex_name] = (token0.lower(), token1.lower())
-    
-    if len(token_addresses) < 2:
-        return False, "Not enough DEXes with token addresses"
-    
-    # Check if all DEXes have the same token addresses
-    first_dex = list(token_addresses.keys())[0]
-    first_tokens = token_addresses[first_dex]
-    
-    for dex_name, tokens in token_addresses.items():
-        if tokens != first_tokens:
-            print(f"[TOKEN_MISMATCH] {pair}: {dex_name} has different token addresses")
-            print(f"   {first_dex}: {first_tokens}")
-            print(f"   {dex_name}: {tokens}")
-            return False, f"Token addresses don't match between {first_dex} and {dex_name}"
-    
-    return True, "Token addresses match"
+def cost_epoch():
+    """Changes whenever the gas oracle or the ETH price moves, i.e. whenever profit figures go stale"""
+    return GAS_ORACLE.block, PRICE_ORACLE.eth_price_usd()
 
 def find_arbitrage_opportunities(uniswap_prices, aerodrome_prices, balancer_v2_prices, sushiswap_prices, executor=None):
     """Find arbitrage opportunities with enhanced analysis"""
-    opportunities = []
     all_prices = {
         'Uniswap': uniswap_prices,
         'Aerodrome': aerodrome_prices,
         'Balancer V2': balancer_v2_prices,
         'SushiSwap': sushiswap_prices
     }
-    all_pairs = set()
-    for dex_prices in all_prices.values():
-        all_pairs.update(dex_prices.keys())
-    
-    for pair in all_pairs:
-        prices = {dex: all_prices[dex][pair] for dex in all_prices if pair in all_prices[dex]}
-        if len(prices) < 2:
-            print(f"[SKIP] {pair}: not enough DEXes ({list(prices.keys())})")
-            continue
-        
-        # Validate that we're comparing the same tokens
-        is_valid, reason = validate_token_match(pair, all_prices)
-        if not is_valid:
-            print(f"[SKIP] {pair}: {reason}")
-            continue
-        
-        # Extract prices for this pair
-        pair_prices = {}
-        for dex_name, dex_prices in all_prices.items():
-            if pair in dex_prices:
-                price = dex_prices[pair]['price']
-                pair_prices[dex_name] = price
-        
-        if len(pair_prices) >= 2:
-            prices_list = list(pair_prices.values())
-            min_price = min(prices_list)
-            max_price = max(prices_list)
-            
-            # Calculate profit percentage correctly
-            profit_pct = ((max_price - min_price) / min_price) * 100 if min_price > 0 else 0
-            
-            # DEBUG: Log problematic pairs
-            if profit_pct > 100:  # Unrealistic profit
-                print(f"[DEBUG] {pair}: min={min_price:.8f}, max={max_price:.8f}, profit={profit_pct:.2f}%")
-                print(f"[DEBUG] {pair} prices by DEX: {pair_prices}")
-            
-            print(f"[PAIR] {pair}: min={min_price}, max={max_price}, profit={profit_pct:.2f}%")
-            
-            # Find which DEX has the minimum and maximum prices
-            min_dex = min(pair_prices.keys(), key=lambda k: pair_prices[k])
-            max_dex = max(pair_prices.keys(), key=lambda k: pair_prices[k])
-            
-            # For arbitrage: buy at lower price, sell at higher price
-            buy_dex = min_dex
-            sell_dex = max_dex
-            buy_price = min_price
-            sell_price = max_price
-            
-            # Skip if no price difference
-            if buy_price >= sell_price:
-                continue
-            
-            # Get token addresses and fee tiers if available
-            buy_info = all_prices[buy_dex][pair]
-            sell_info = all_prices[sell_dex][pair]
-            token0 = buy_info.get('token0')
-            token1 = buy_info.get('token1')
-            fee_tier_buy = buy_info.get('fee_tier')
-            fee_tier_sell = sell_info.get('fee_tier')
-            tvl = min(buy_info.get('tvl', 0), sell_info.get('tvl', 0))
-            
-            # Estimate profit
-            profit_analysis = estimate_profit(buy_price, sell_price)
-            
-            opportunity = {
-                'pair': pair,
-                'buy_dex': buy_dex,
-                'sell_dex': sell_dex,
-                'buy_price': buy_price,
-                'sell_price': sell_price,
-                'profit_pct': profit_pct,
-                'profit_analysis': profit_analysis,
-                'token0_address': token0,
-                'token1_address': token1,
-                'uniswap_fee_tier': fee_tier_buy if buy_dex == 'Uniswap' else fee_tier_sell if sell_dex == 'Uniswap' else None,
-                'aerodrome_fee_tier': fee_tier_buy if buy_dex == 'Aerodrome' else fee_tier_sell if sell_dex == 'Aerodrome' else None,
-                'uniswap_pool_address': buy_info.get('pool_id') if buy_dex == 'Uniswap' else sell_info.get('pool_id') if sell_dex == 'Uniswap' else None,
-                'aerodrome_pool_address': buy_info.get('pool_id') if buy_dex == 'Aerodrome' else sell_info.get('pool_id') if sell_dex == 'Aerodrome' else None,
-            }
-            
-            # Use executor.validate_opportunity for filtering if provided
-            if executor is not None:
-                is_valid, reason = executor.validate_opportunity(opportunity)
-                if is_valid:
-                    opportunities.append(opportunity)
-                else:
-                    print(f"[FILTERED] {pair} ({buy_dex}->{sell_dex}): {reason}")
-            else:
-                if profit_analysis['net_profit_usd'] > 0 and tvl > MIN_LIQUIDITY_USD:
-                    opportunities.append(opportunity)
-    
-    return opportunities
+    return find_opportunities_in_table(PoolTable.from_prices(all_prices).view(), executor)
 
-def estimate_profit(buy_price, sell_price, eth_amount=None, eth_price_usd=2500, gas_cost_usd=None):
-    """
-    Estimate realistic arbitrage profit accounting for all costs.
-    buy_price and sell_price are in terms of token1/token0 (e.g., USDC/WETH).
-    For arbitrage: buy at lower price, sell at higher price.
-    All profit/costs are in USD.
-    """
-    if eth_amount is None:
-        eth_amount = POSITION_SIZE_USD / eth_price_usd  # Convert USD to ETH amount
+def find_opportunities_in_table(view, executor=None):
+    """Find arbitrage opportunities in a columnar pool table view; spreads for all pairs are computed at once"""
+    return list(opportunities_from_spreads(view, detect_spreads(view, max_block_skew=MAX_BLOCK_SKEW), executor).values())
+
+def opportunities_from_spreads(view, spreads, executor=None):
+    """Turn detected spreads into validated opportunities, keyed by pair id"""
+    opportunities = {}
+    comparable = spreads.quotes >= 2
+    single_dex = int((~comparable).sum())
+    if single_dex:
+        print(f"[SKIP] {single_dex} pairs: not enough DEXes")
+    skewed = int(spreads.skewed.sum())
+    if skewed:
+        print(f"[SKIP] {skewed} quotes more than {MAX_BLOCK_SKEW} blocks behind the newest quote of their pair")
     
-    # For arbitrage, we want to:
-    # 1. Buy token1 at the lower price (buy_price)
-    # 2. Sell token1 at the higher price (sell_price)
-    # This means we're converting token0 -> token1 -> token0
+    for i in np.flatnonzero(comparable):
+        pair = view.pair_labels[spreads.pair[i]]
+        min_price, max_price, profit_pct = spreads.min_price[i], spreads.max_price[i], spreads.spread_pct[i]
+        # DEBUG: Log problematic pairs
+        if profit_pct > 100:  # Unrealistic profit
+            print(f"[DEBUG] {pair}: min={min_price:.8f}, max={max_price:.8f}, profit={profit_pct:.2f}%")
+        print(f"[PAIR] {pair}: min={min_price}, max={max_price}, profit={profit_pct:.2f}%")
     
-    # Start with token0 (e.g., WETH)
-    amount_token0_in = eth_amount  # e.g., 0.4 WETH
+    # Staged filter: cheap vectorised checks discard pairs before any route costing, exact quoting,
+    # opportunity dicts or validation; each stage's drops are counted for the dashboard
+    candidates = comparable & (spreads.max_price > spreads.min_price)
+    drops = {'single_dex': single_dex, 'no_spread': int((comparable & ~candidates).sum()),
+             'block_skew': int((spreads.skewed > 0).sum())}
     
-    # Buy token1 at buy_price (lower price)
-    amount_token1_out = amount_token0_in * buy_price  # e.g., 0.4 * 0.000337 = 0.000135 USDC
+    if executor is not None:
+        passed = candidates & executor.spread_prefilter(spreads.spread_pct)
+        drops['spread'] = int((candidates & ~passed).sum())
+        candidates = passed
     
-    # Sell token1 at sell_price (higher price)
-    amount_token0_out = amount_token1_out / sell_price  # e.g., 0.000135 / 0.000339 = 0.398 WETH
+    # Liquidity: the shallower pool must meet the minimum TVL where TVL is known
+    buy_tvl, sell_tvl = view.tvl[spreads.buy_row], view.tvl[spreads.sell_row]
+    pool_tvl = np.fmin(buy_tvl, sell_tvl)
+    passed = candidates & ~(pool_tvl < MIN_LIQUIDITY_USD)
+    drops['liquidity'] = int((candidates & ~passed).sum())
+    candidates = passed
     
-    # Calculate gross profit in token0 terms
-    gross_profit_token0 = amount_token0_out - amount_token0_in
-    gross_profit_usd = gross_profit_token0 * eth_price_usd
+    # Profit bound: the spread after both pool fees, on a trade no larger than the shallower pool,
+    # must beat the cheapest possible gas and MEV protection
+    bound = net_profit_upper_bound(spreads.spread_pct, view.fee[spreads.buy_row], view.fee[spreads.sell_row],
+                                   np.where(np.isfinite(pool_tvl), pool_tvl, np.inf),
+                                   cost_floor_usd(GAS_MODEL.gas_floor(FLASH_LOAN_ENABLED)))
+    passed = candidates & (bound > 0)
+    drops['bound'] = int((candidates & ~passed).sum())
+    candidates = passed
     
-    # Calculate costs dynamically based on position size
-    if gas_cost_usd is None:
-        # Base gas price for Base network (very low)
-        gas_price_eth = BASE_GAS_PRICE_GWEI / 1e9
-        
-        # Dynamic gas limits based on position size
-        # Smaller positions = lower gas limits, larger positions = higher gas limits
-        position_size_eth = POSITION_SIZE_USD / eth_price_usd
-        
-        # Scale gas limits based on position size (logarithmic scaling)
-        if position_size_eth < 0.01:  # Very small positions
-            gas_limit_swap = 100000
-            gas_limit_approve = 20000
-        elif position_size_eth < 0.1:  # Small positions
-            gas_limit_swap = 150000
-            gas_limit_approve = 30000
-        elif position_size_eth < 1.0:  # Medium positions
-            gas_limit_swap = 200000
-            gas_limit_approve = 40000
-        else:  # Large positions
-            gas_limit_swap = 250000
-            gas_limit_approve = 50000
-        
-        # Calculate total gas cost (2 swaps + 2 approvals)
-        total_gas_eth = (gas_limit_swap * 2 + gas_limit_approve * 2) * gas_price_eth
-        gas_cost_usd = total_gas_eth * eth_price_usd
+    prefiltered = {stage: drops[stage] for stage in ('spread', 'liquidity', 'bound') if drops.get(stage)}
+    if prefiltered:
+        print(f"[FILTERED] {sum(prefiltered.values())} pairs before profit analysis: " +
+              ", ".join(f"{stage} {count}" for stage, count in prefiltered.items()))
+    
+    selected = np.flatnonzero(candidates)
+    buy_rows, sell_rows = spreads.buy_row[selected], spreads.sell_row[selected]
+    
+    # Estimate profit for all remaining candidates at once; cost terms are shared by the cycle,
+    # except gas, which is priced per route from live fees and learned gas usage once the gas oracle has fees
+    gas_cost_usd = None
+    if GAS_ORACLE.ready:
+        buy_dexes = [DEX_NAMES[dex] for dex in view.dex[buy_rows]]
+        sell_dexes = [DEX_NAMES[dex] for dex in view.dex[sell_rows]]
+        labels = view.token_labels
+        templates = [route_key(buy_dex, sell_dex, labels[token0], labels[token1], FLASH_LOAN_ENABLED)
+                     for buy_dex, sell_dex, token0, token1 in zip(buy_dexes, sell_dexes, view.token0[buy_rows], view.token1[buy_rows])]
+        gas_cost_usd = GAS_ORACLE.route_costs_usd(buy_dexes, sell_dexes, eth_price_usd(), flash_loan=FLASH_LOAN_ENABLED,
+                                                  templates=templates, gas_model=GAS_MODEL)
+    costs = cost_terms(gas_cost_usd=gas_cost_usd)
+    profits = estimate_profit_batch(spreads.min_price[selected], spreads.max_price[selected], costs=costs)
     
-    # Scale other costs based on position size
-    transaction_fees_usd = POSITION_SIZE_USD * TRANSACTION_FEE_PCT * 2
-    slippage_cost_usd = POSITION_SIZE_USD * SLIPPAGE_PCT * 2
-    mev_protection_cost_usd = MEV_PROTECTION_COST_USD  # Fixed cost
+    # Where both pools have reserves, size the trade exactly: token0 -> token1 on the buy pool,
+    # back to token0 on the sell pool, at the input that maximises the output minus input
+    amount_in, amount_out, _ = optimal_two_pool_trade(
+        view.reserve0[buy_rows], view.reserve1[buy_rows], 1 - view.fee[buy_rows],
+        view.reserve1[sell_rows], view.reserve0[sell_rows], 1 - view.fee[sell_rows]
+    )
+    token_usd = PRICE_ORACLE.token_usd(view, view.token0[buy_rows])
+    sizeable = (np.isfinite(view.reserve0[buy_rows]) & np.isfinite(view.reserve1[buy_rows]) &
+                np.isfinite(view.reserve0[sell_rows]) & np.isfinite(view.reserve1[sell_rows]) & np.isfinite(token_usd))
+    # Where a leg has an exact quoter (Uniswap tick state, Aerodrome and Balancer curves), search sizes
+    # around the constant-product optimum with exact quotes and keep the best one. Stable curves can be
+    # profitable where constant product is not, so those searches start from a small share of the reserve
+    for n in np.flatnonzero(sizeable):
+        start = amount_in[n] if amount_in[n] > 0 else view.reserve0[buy_rows[n]] * 1e-3
+        sized = exact_trade_size(view, buy_rows[n], sell_rows[n], start)
+        if sized is not None:
+            amount_in[n], amount_out[n] = sized if sized[1] > sized[0] else (0.0, 0.0)
+    sized_profits = sized_profit_batch(amount_in, amount_out, token_usd, costs=costs)
+    net_profit_usd = np.where(sizeable, sized_profits['net_profit_usd'], profits['net_profit_usd'])
+    
+    drops['unprofitable'] = drops['validation'] = 0
+    for n, i in enumerate(selected):
+        if executor is None and not net_profit_usd[n] > 0:
+            drops['unprofitable'] += 1
+            continue
+        buy_row, sell_row = buy_rows[n], sell_rows[n]
+        analysis = profit_analysis_at(sized_profits if sizeable[n] else profits, n)
+        opportunity = build_opportunity(view, view.pair_labels[spreads.pair[i]], buy_row, sell_row,
+                                        float(spreads.spread_pct[i]), analysis)
+        if sizeable[n]:
+            opportunity['trade_size'] = float(amount_in[n])  # token0 in
+            opportunity['expected_output'] = float(amount_out[n])  # token0 back
+            opportunity['trade_size_usd'] = analysis['trade_size_usd']
+        
+        # Use executor.validate_opportunity for filtering if provided
+        if executor is not None:
+            is_valid, reason = executor.validate_opportunity(opportunity)
+            if is_valid:
+                opportunities[int(spreads.pair[i])] = opportunity
+            else:
+                drops['validation'] += 1
+                print(f"[FILTERED] {opportunity['pair']} ({opportunity['buy_dex']}->{opportunity['sell_dex']}): {reason}")
+        else:
+            opportunities[int(spreads.pair[i])] = opportunity
     
-    total_costs_usd = gas_cost_usd + transaction_fees_usd + slippage_cost_usd + mev_protection_cost_usd
+    for stage, count in drops.items():
+        FILTER_DROPS[stage] += count
+    return opportunities
+
+def take_filter_drops():
+    """Candidates dropped per filter stage since the last call (for the dashboard)"""
+    drops = dict(FILTER_DROPS)
+    FILTER_DROPS.clear()
+    return drops
+
+def exact_leg_outputs(view, row, amounts_in, canonical_in):
+    """
+    Outputs of one leg for several input sizes: canonical token0 in when canonical_in, else
+    canonical token1 in. Quoted from the V3 quote book for loaded Uniswap pools and from the
+    pool's own math for Aerodrome and Balancer pools; None when the pool has no exact quoter.
+    """
+    entry = view.entries[row]
+    token0_in = canonical_in != bool(view.inverted[row])  # Pool token0 is canonical token1 when inverted
+    if view.dex[row] == DEX_IDS['Aerodrome'] and entry.get('pool_id') in AERODROME_QUOTES:
+        return np.array(AERODROME_QUOTES.quote_many(entry['pool_id'], amounts_in, token0_in))
+    if view.dex[row] == DEX_IDS['Balancer V2'] and entry.get('pool_id') in BALANCER_QUOTES:
+        token_in, token_out = (entry['token0'], entry['token1']) if token0_in else (entry['token1'], entry['token0'])
+        decimals_in, decimals_out = (entry['decimals0'], entry['decimals1']) if token0_in else (entry['decimals1'], entry['decimals0'])
+        outputs = BALANCER_QUOTES.quote_many(entry['pool_id'], amounts_in, token_in, token_out, decimals_in, decimals_out)
+        return None if outputs is None else np.array(outputs)
+    if view.dex[row] != DEX_IDS['Uniswap'] or entry.get('pool_id') not in V3_QUOTES:
+        return None
+    decimals_in, decimals_out = entry['decimals0'], entry['decimals1']
+    if not token0_in:
+        decimals_in, decimals_out = decimals_out, decimals_in
+    outputs = [V3_QUOTES.quote(entry['pool_id'], amount, token0_in, decimals_in, decimals_out) for amount in amounts_in]
+    return np.array([output if output is not None else 0.0 for output in outputs])
+
+def exact_two_pool_output(view, buy_row, sell_row, amounts_in):
+    """token0 back from token0 -> token1 on buy_row and token1 -> token0 on sell_row, or None if neither pool is quoted exactly"""
+    amounts_in = np.asarray(amounts_in, dtype=np.float64)
+    middle = exact_leg_outputs(view, buy_row, amounts_in, True)
+    exact = middle is not None
+    if middle is None:
+        middle = constant_product_out(amounts_in, view.reserve0[buy_row], view.reserve1[buy_row], 1 - view.fee[buy_row])
+    amounts_out = exact_leg_outputs(view, sell_row, middle, False)
+    if amounts_out is None:
+        if not exact:
+            return None
+        amounts_out = constant_product_out(middle, view.reserve1[sell_row], view.reserve0[sell_row], 1 - view.fee[sell_row])
+    return amounts_out
+
+def exact_trade_size(view, buy_row, sell_row, start):
+    """
+    (input, output) maximising output minus input by exact quotes, from the size grid around start,
+    moved up or down while its best point is at an edge; None if neither pool is quoted exactly
+    """
+    center = start
+    for _ in range(EXACT_SIZE_MAX_SHIFTS + 1):
+        sizes = center * EXACT_SIZE_GRID
+        outputs = exact_two_pool_output(view, buy_row, sell_row, sizes)
+        if outputs is None:
+            return None
+        best = int(np.argmax(outputs - sizes))
+        if 0 < best < len(sizes) - 1 or outputs[best] <= sizes[best]:
+            break  # Interior optimum, or losing even at the smallest size (smaller ones lose too)
+        center *= EXACT_SIZE_GRID[-1] / EXACT_SIZE_GRID[0] if best else EXACT_SIZE_GRID[0] / EXACT_SIZE_GRID[-1]
+    return float(sizes[best]), float(outputs[best])
+
+def build_opportunity(view, pair, buy_row, sell_row, profit_pct, profit_analysis):
+    """Opportunity dict for buying on the buy_row pool and selling on the sell_row pool"""
+    buy_dex, sell_dex = DEX_NAMES[view.dex[buy_row]], DEX_NAMES[view.dex[sell_row]]
+    buy_price, sell_price = float(view.price[buy_row]), float(view.price[sell_row])
     
-    net_profit_usd = gross_profit_usd - total_costs_usd
-    net_profit_pct = (net_profit_usd / POSITION_SIZE_USD) * 100 if POSITION_SIZE_USD else 0
+    # Get token addresses (in the table's canonical order) and fee tiers if available
+    buy_info = view.entries[buy_row]
+    sell_info = view.entries[sell_row]
+    token0, token1 = buy_info.get('token0'), buy_info.get('token1')
+    decimals0, decimals1 = buy_info.get('decimals0'), buy_info.get('decimals1')
+    if view.inverted[buy_row]:
+        token0, token1 = token1, token0
+        decimals0, decimals1 = decimals1, decimals0
+    fee_tier_buy = buy_info.get('fee_tier')
+    fee_tier_sell = sell_info.get('fee_tier')
     
     return {
-        'gross_profit_usd': gross_profit_usd,
-        'gas_cost_usd': gas_cost_usd,
-        'transaction_fees_usd': transaction_fees_usd,
-        'slippage_cost_usd': slippage_cost_usd,
-        'mev_protection_cost_usd': mev_protection_cost_usd,
-        'total_costs_usd': total_costs_usd,
-        'net_profit_usd': net_profit_usd,
-        'net_profit_pct': net_profit_pct,
-        'is_profitable': net_profit_usd > MIN_PROFIT_THRESHOLD_USD
+        'pair': pair,
+        'buy_dex': buy_dex,
+        'sell_dex': sell_dex,
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'profit_pct': profit_pct,
+        'profit_analysis': profit_analysis,
+        'token0_address': token0,
+        'token1_address': token1,
+        'token0_decimals': decimals0,
+        'token1_decimals': decimals1,
+        'buy_fee_tier': fee_tier_buy,
+        'sell_fee_tier': fee_tier_sell,
+        'uniswap_fee_tier': fee_tier_buy if buy_dex == 'Uniswap' else fee_tier_sell if sell_dex == 'Uniswap' else None,
+        'aerodrome_fee_tier': fee_tier_buy if buy_dex == 'Aerodrome' else fee_tier_sell if sell_dex == 'Aerodrome' else None,
+        'uniswap_pool_address': buy_info.get('pool_id') if buy_dex == 'Uniswap' else sell_info.get('pool_id') if sell_dex == 'Uniswap' else None,
+        'aerodrome_pool_address': buy_info.get('pool_id') if buy_dex == 'Aerodrome' else sell_info.get('pool_id') if sell_dex == 'Aerodrome' else None,
     }
 
 if __name__ == "__main__":
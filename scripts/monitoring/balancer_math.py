@@ -0,0 +1,252 @@
+"""
+Balancer V2 swap math (WeightedMath and StableMath outGivenIn with the pools' fee and scaling
+steps), fed from pool state read in bulk through the Vault and the pool contracts.
+"""
+from decimal import Decimal, localcontext
+
+from web3 import Web3
+
+from config import BALANCER_VAULT_ADDRESS
+from scripts.monitoring.multicall import Call, multicall, encode_call, decoder
+
+BALANCER_VAULT = Web3.to_checksum_address(BALANCER_VAULT_ADDRESS)
+
+ONE = 10 ** 18
+MAX_IN_RATIO = 3 * 10 ** 17  # Weighted pools reject inputs above 30% of the balance
+MAX_POW_RELATIVE_ERROR = 10000  # LogExpMath error bound used by FixedPoint.powUp/powDown
+AMP_PRECISION = 1000
+
+
+# FixedPoint
+def mul_down(a, b):
+    return a * b // ONE
+
+
+def mul_up(a, b):
+    return -(-a * b // ONE)
+
+
+def div_down(a, b):
+    return a * ONE // b
+
+
+def div_up(a, b):
+    return 0 if a == 0 else (a * ONE - 1) // b + 1
+
+
+def complement(x):
+    return ONE - x if x < ONE else 0
+
+
+def pow_up(x, y):
+    """FixedPoint.powUp; the LogExpMath power is evaluated in high-precision decimal"""
+    if y == ONE:
+        return x
+    if y == 2 * ONE:
+        return mul_up(x, x)
+    if y == 4 * ONE:
+        square = mul_up(x, x)
+        return mul_up(square, square)
+    with localcontext() as context:
+        context.prec = 60
+        raw = int((Decimal(x) / ONE) ** (Decimal(y) / ONE) * ONE)
+    return raw + mul_up(raw, MAX_POW_RELATIVE_ERROR) + 1
+
+
+# WeightedMath
+def weighted_out_given_in(balance_in, weight_in, balance_out, weight_out, amount_in):
+    if amount_in > mul_down(balance_in, MAX_IN_RATIO):
+        raise ValueError("MAX_IN_RATIO")
+    base = div_up(balance_in, balance_in + amount_in)
+    exponent = div_down(weight_in, weight_out)
+    return mul_down(balance_out, complement(pow_up(base, exponent)))
+
+
+# StableMath
+def stable_invariant(amp, balances):
+    total = sum(balances)
+    if total == 0:
+        return 0
+    count = len(balances)
+    invariant = total
+    amp_times_total = amp * count
+    for _ in range(255):
+        d_p = invariant
+        for balance in balances:
+            d_p = d_p * invariant // (balance * count)
+        previous = invariant
+        invariant = ((amp_times_total * total // AMP_PRECISION + d_p * count) * invariant //
+                     ((amp_times_total - AMP_PRECISION) * invariant // AMP_PRECISION + (count + 1) * d_p))
+        if abs(invariant - previous) <= 1:
+            return invariant
+    raise ValueError("STABLE_INVARIANT_DIDNT_CONVERGE")
+
+
+def stable_balance_given_invariant(amp, balances, invariant, index):
+    count = len(balances)
+    amp_times_total = amp * count
+    total = balances[0]
+    p_d = balances[0] * count
+    for balance in balances[1:]:
+        p_d = p_d * balance * count // invariant
+        total += balance
+    total -= balances[index]
+    inv2 = invariant * invariant
+    c = -(-inv2 // (amp_times_total * p_d)) * AMP_PRECISION * balances[index]
+    b = total + invariant // amp_times_total * AMP_PRECISION
+    balance = -(-(inv2 + c) // (invariant + b))
+    for _ in range(255):
+        previous = balance
+        balance = -(-(balance * balance + c) // (balance * 2 + b - invariant))
+        if abs(balance - previous) <= 1:
+            return balance
+    raise ValueError("STABLE_GET_BALANCE_DIDNT_CONVERGE")
+
+
+def stable_out_given_in(amp, balances, index_in, index_out, amount_in, invariant=None):
+    if invariant is None:
+        invariant = stable_invariant(amp, balances)
+    balances = list(balances)
+    balances[index_in] += amount_in
+    final_balance_out = stable_balance_given_invariant(amp, balances, invariant, index_out)
+    return balances[index_out] - final_balance_out - 1
+
+
+class BalancerPool:
+    """
+    One pool's swap state as the Vault sees it: raw balances, scaling factors (decimals and rate
+    providers), swap fee and either normalized weights or the amplification parameter.
+    Composable stable pools' own BPT is left out of the token list.
+    """
+
+    def __init__(self, pool_id, address, tokens, balances, scaling_factors, swap_fee, weights=None, amp=None):
+        self.pool_id = pool_id.lower()
+        self.address = address.lower()
+        self.tokens = [token.lower() for token in tokens]
+        self.balances = list(balances)
+        self.scaling_factors = list(scaling_factors)
+        self.swap_fee = swap_fee
+        self.weights = weights
+        self.amp = amp  # value * AMP_PRECISION
+
+    @property
+    def stable(self):
+        return self.weights is None
+
+    def index(self, token):
+        return self.tokens.index(token.lower())
+
+    def get_amount_out(self, amount_in, index_in, index_out):
+        """Raw output for a raw exact input, as Vault.swap (GIVEN_IN) would compute it"""
+        if amount_in <= 0:
+            return 0
+        amount_in -= mul_up(amount_in, self.swap_fee)
+        upscaled = [mul_down(balance, factor) for balance, factor in zip(self.balances, self.scaling_factors)]
+        amount_in = mul_down(amount_in, self.scaling_factors[index_in])
+        if self.stable:
+            amount_out = stable_out_given_in(self.amp, upscaled, index_in, index_out, amount_in)
+        else:
+            amount_out = weighted_out_given_in(upscaled[index_in], self.weights[index_in],
+                                               upscaled[index_out], self.weights[index_out], amount_in)
+        return max(amount_out, 0) * ONE // self.scaling_factors[index_out]
+
+    def get_amounts_out(self, amounts_in, index_in, index_out, decimals_in, decimals_out):
+        """Quotes for many input sizes (token units in and out), e.g. for a sizing search"""
+        outputs = []
+        for amount in amounts_in:
+            try:
+                outputs.append(self.get_amount_out(int(amount * 10 ** decimals_in), index_in, index_out) / 10 ** decimals_out)
+            except (ValueError, ZeroDivisionError):
+                outputs.append(0.0)
+        return outputs
+
+    def spot_price(self, index_in, index_out, decimals_in, decimals_out):
+        """Marginal price before fees as token-units of index_in per token-unit of index_out, or None"""
+        upscaled = [mul_down(balance, factor) for balance, factor in zip(self.balances, self.scaling_factors)]
+        if not upscaled[index_in] or not upscaled[index_out]:
+            return None
+        # Upscaled amounts are 18-decimal values times the token rate; undo the rate on both sides
+        rate_in = self.scaling_factors[index_in] / 10 ** (36 - decimals_in)
+        rate_out = self.scaling_factors[index_out] / 10 ** (36 - decimals_out)
+        if not self.stable:
+            price = (upscaled[index_in] / self.weights[index_in]) / (upscaled[index_out] / self.weights[index_out])
+        else:
+            # Output for a tiny input of index_out, so only the curve's slope remains
+            amount = max(upscaled[index_out] // 10 ** 6, 1)
+            try:
+                price = stable_out_given_in(self.amp, upscaled, index_out, index_in, amount) / amount
+            except (ValueError, ZeroDivisionError):
+                return None
+        return price * rate_out / rate_in
+
+
+def get_pool_tokens_call(pool_id):
+    return Call(BALANCER_VAULT, encode_call('getPoolTokens(bytes32)', ['bytes32'], [bytes.fromhex(pool_id[2:])]),
+                decoder('address[]', 'uint256[]', 'uint256'))
+
+
+def swap_fee_call(pool):
+    return Call(pool, encode_call('getSwapFeePercentage()'), decoder('uint256'))
+
+
+def scaling_factors_call(pool):
+    return Call(pool, encode_call('getScalingFactors()'), decoder('uint256[]'))
+
+
+def normalized_weights_call(pool):
+    return Call(pool, encode_call('getNormalizedWeights()'), decoder('uint256[]'))
+
+
+def amplification_call(pool):
+    return Call(pool, encode_call('getAmplificationParameter()'), decoder('uint256', 'bool', 'uint256'))
+
+
+class BalancerQuoteBook:
+    """Balancer pools quoted locally; the whole state is re-read in one multicall batch per refresh"""
+
+    CALLS_PER_POOL = 5
+
+    def __init__(self):
+        self.pools = {}  # lowercase pool id -> BalancerPool
+
+    def __contains__(self, pool_id):
+        return bool(pool_id) and pool_id.lower() in self.pools
+
+    def get(self, pool_id):
+        return self.pools.get(pool_id.lower()) if pool_id else None
+
+    async def load(self, rpc, pools, block='latest'):
+        """Read balances, scaling factors, fee and weights/amp for (pool_id, address) pairs, replacing the previous state; returns how many loaded"""
+        calls = []
+        for pool_id, address in pools:
+            calls += [get_pool_tokens_call(pool_id), swap_fee_call(address), scaling_factors_call(address),
+                      normalized_weights_call(address), amplification_call(address)]
+        block_identifier = hex(block) if isinstance(block, int) else block
+        results = await multicall(rpc, calls, block_identifier=block_identifier)
+        loaded = {}
+        for n, (pool_id, address) in enumerate(pools):
+            pool_tokens, swap_fee, scaling_factors, weights, amplification = \
+                results[n * self.CALLS_PER_POOL:(n + 1) * self.CALLS_PER_POOL]
+            if pool_tokens is None or swap_fee is None or scaling_factors is None or (weights is None and amplification is None):
+                continue
+            tokens, balances = list(pool_tokens[0]), list(pool_tokens[1])
+            scaling_factors = list(scaling_factors)
+            if len(scaling_factors) != len(tokens):
+                continue
+            # Composable stable pools list their own BPT among the tokens; it is not swapped against
+            keep = [i for i, token in enumerate(tokens) if token.lower() != address.lower()]
+            pick = lambda values: [values[i] for i in keep]
+            loaded[pool_id.lower()] = BalancerPool(
+                pool_id, address, pick(tokens), pick(balances), pick(scaling_factors), swap_fee,
+                weights=list(weights) if weights is not None else None,
+                amp=amplification[0] if weights is None else None
+            )
+        self.pools = loaded
+        return len(loaded)
+
+    def quote_many(self, pool_id, amounts_in, token_in, token_out, decimals_in, decimals_out):
+        """Token-unit outputs for token-unit input sizes, or None if the pool or a token is unknown"""
+        pool = self.get(pool_id)
+        if pool is None or token_in.lower() not in pool.tokens or token_out.lower() not in pool.tokens:
+            return None
+        return pool.get_amounts_out(amounts_in, pool.index(token_in), pool.index(token_out), decimals_in, decimals_out)
@@ -0,0 +1,30 @@
+import asyncio
+
+
+class NewHeadWatcher:
+    """
+    Polls eth_blockNumber and yields each new head as (block_number, skipped_blocks).
+    The generator is only resumed once the consumer has finished with the previous head, so
+    blocks produced while a cycle is still running are coalesced into the latest one.
+    """
+
+    def __init__(self, rpc, poll_interval, error_retry_seconds=None):
+        self.rpc = rpc
+        self.poll_interval = poll_interval
+        self.error_retry_seconds = error_retry_seconds if error_retry_seconds is not None else poll_interval
+        self.last_block = None
+
+    async def heads(self):
+        while True:
+            try:
+                head = await self.rpc.block_number()
+            except Exception as e:
+                print(f"⚠️  Could not read head block, retrying in {self.error_retry_seconds}s: {e}")
+                await asyncio.sleep(self.error_retry_seconds)
+                continue
+            if self.last_block is None or head > self.last_block:
+                skipped = head - self.last_block - 1 if self.last_block is not None else 0
+                self.last_block = head
+                yield head, skipped
+            else:
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,239 @@
+import itertools
+
+import numpy as np
+
+# Source DEX ids used in the dex column
+DEX_NAMES = ('Uniswap', 'Aerodrome', 'Balancer V2', 'SushiSwap')
+DEX_IDS = {name: i for i, name in enumerate(DEX_NAMES)}
+
+# Swap fee (fraction) assumed when a pool entry carries no fee of its own
+DEFAULT_FEES = {'Uniswap': 0.003, 'Aerodrome': 0.003, 'Balancer V2': 0.003, 'SushiSwap': 0.003}
+
+# Distinguishes tables, so state keyed by row or pair id is never applied to another table
+_TABLE_IDS = itertools.count(1)
+
+# Column name -> dtype; float columns use NaN and int columns -1 for "unknown"
+COLUMNS = {
+    'price': np.float64,
+    'tvl': np.float64,
+    'volume': np.float64,
+    'fee': np.float64,
+    'reserve0': np.float64,
+    'reserve1': np.float64,
+    'updated_at': np.float64,
+    'block': np.int64,
+    'version': np.int64,  # change sequence number of the row's last price, TVL, fee or reserve change
+    'dex': np.int8,
+    'pair': np.int32,
+    'token0': np.int32,
+    'token1': np.int32,
+    'inverted': np.bool_,
+    'active': np.bool_,
+}
+
+
+def fee_fraction(dex, entry):
+    """Swap fee of a pool entry as a fraction (Uniswap fee tiers are in hundredths of a bip)"""
+    if entry.get('fee') is not None:
+        return float(entry['fee'])
+    if dex == 'Uniswap' and entry.get('fee_tier') is not None:
+        return entry['fee_tier'] / 1e6
+    return DEFAULT_FEES.get(dex, 0.003)
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+
+def _changed(old, new):
+    """Inequality that treats two NaNs (unknown values) as equal"""
+    return old != new and not (np.isnan(old) and np.isnan(new))
+
+
+def canonical_pair(entry):
+    """(token_a, token_b, inverted): lowercase addresses sorted, and whether the entry's token0 is token_b"""
+    token0, token1 = entry.get('token0'), entry.get('token1')
+    if not token0 or not token1:
+        return None, None, False
+    token0, token1 = token0.lower(), token1.lower()
+    if token0 > token1:
+        return token1, token0, True
+    return token0, token1, False
+
+
+def pair_label(entry, inverted):
+    """SYMA/SYMB label in canonical token order"""
+    symbol0 = entry.get('symbol0') or entry['token0'][:8]
+    symbol1 = entry.get('symbol1') or entry['token1'][:8]
+    return f"{symbol1}/{symbol0}" if inverted else f"{symbol0}/{symbol1}"
+
+
+class Interner:
+    """Maps labels (token addresses, token pairs) to dense integer ids and back"""
+
+    def __init__(self):
+        self.ids = {}
+        self.labels = []
+
+    def intern(self, label):
+        label_id = self.ids.get(label)
+        if label_id is None:
+            label_id = len(self.labels)
+            self.ids[label] = label_id
+            self.labels.append(label)
+        return label_id
+
+    def get(self, label):
+        return self.ids.get(label, -1)
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class TableView:
+    """Read-only copy of the active rows of a PoolTable, safe to analyse off the event loop"""
+
+    def __init__(self, table_id, columns, entries, pair_labels, token_labels):
+        # Prices are normalised to token_a per token_b with token_a < token_b by address;
+        # inverted marks rows whose source entry is quoted the other way round
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.table_id = table_id
+        self.entries = entries  # row -> source entry dict (only touched for reported candidates)
+        self.pair_labels = pair_labels
+        self.token_labels = token_labels
+
+    def __len__(self):
+        return len(self.price)
+
+
+class PoolTable:
+    """
+    Columnar pool store: one row per (DEX, pool) with float64/int arrays for price, TVL, volume,
+    fee and source DEX, plus interned token and pair ids. Pairs are identified by their sorted
+    token addresses, so every pool of a pair (any DEX, any fee tier) shares one pair id. Rows are
+    updated in place when a DEX republishes, and the arrays grow by doubling, so memory stays
+    proportional to the pool count. Rows of pools no longer published are reclaimed by compact()
+    once they outnumber the active ones.
+    """
+
+    def __init__(self, capacity=1024):
+        self.table_id = next(_TABLE_IDS)
+        self.capacity = capacity
+        self.size = 0
+        self.change_seq = 0
+        self.columns = {name: self._empty(dtype, capacity) for name, dtype in COLUMNS.items()}
+        self.tokens = Interner()
+        self.pairs = Interner()  # (token_a, token_b) -> pair id
+        self.pair_labels = []  # pair id -> "SYMA/SYMB"
+        self.rows = {}  # (dex id, pool key) -> row
+        self.entries = []  # row -> latest source entry
+
+    @staticmethod
+    def _empty(dtype, capacity):
+        if dtype == np.float64:
+            return np.full(capacity, np.nan)
+        if dtype == np.bool_:
+            return np.zeros(capacity, dtype=dtype)
+        return np.full(capacity, -1, dtype=dtype)
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        for name, dtype in COLUMNS.items():
+            grown = self._empty(dtype, capacity)
+            grown[:self.size] = self.columns[name][:self.size]
+            self.columns[name] = grown
+        self.capacity = capacity
+
+    def upsert(self, dex, pool_id, entry):
+        """Write one pool entry into its row (appending a row for a new pool); returns the row"""
+        dex_id = DEX_IDS[dex]
+        row = self.rows.get((dex_id, pool_id))
+        if row is None:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[(dex_id, pool_id)] = row
+            self.entries.append(entry)
+        else:
+            self.entries[row] = entry
+        token_a, token_b, inverted = canonical_pair(entry)
+        price = _float(entry.get('price'))
+        reserve0, reserve1 = _float(entry.get('reserve0')), _float(entry.get('reserve1'))
+        if inverted:
+            price = 1 / price if price else np.nan
+            reserve0, reserve1 = reserve1, reserve0
+        c = self.columns
+        tvl = _float(entry.get('tvl'))
+        fee = fee_fraction(dex, entry)
+        pair_id = self.pairs.intern((token_a, token_b)) if token_a is not None else -1
+        # Rows only get a new version when something detection or sizing reads has changed
+        if (not c['active'][row] or _changed(c['price'][row], price) or _changed(c['tvl'][row], tvl)
+                or _changed(c['fee'][row], fee) or _changed(c['reserve0'][row], reserve0)
+                or _changed(c['reserve1'][row], reserve1) or c['pair'][row] != pair_id):
+            self.change_seq += 1
+            c['version'][row] = self.change_seq
+        c['price'][row] = price
+        c['tvl'][row] = tvl
+        c['volume'][row] = _float(entry.get('volume'))
+        c['fee'][row] = fee
+        c['reserve0'][row] = reserve0
+        c['reserve1'][row] = reserve1
+        c['updated_at'][row] = _float(entry.get('updated_at'))
+        c['block'][row] = entry['block'] if entry.get('block') is not None else -1
+        c['dex'][row] = dex_id
+        c['inverted'][row] = inverted
+        if token_a is None:
+            c['pair'][row] = c['token0'][row] = c['token1'][row] = -1
+        else:
+            if pair_id == len(self.pair_labels):
+                self.pair_labels.append(pair_label(entry, inverted))
+            c['pair'][row] = pair_id
+            c['token0'][row] = self.tokens.intern(token_a)
+            c['token1'][row] = self.tokens.intern(token_b)
+        c['active'][row] = True
+        return row
+
+    def replace_dex(self, dex, prices):
+        """Replace all rows of one DEX with a freshly published {pool_id: entry} map"""
+        published = np.array([self.upsert(dex, pool_id, entry) for pool_id, entry in prices.items()], dtype=np.int64)
+        # Pools the DEX no longer reports drop out of the table's views
+        stale = self.columns['dex'][:self.size] == DEX_IDS[dex]
+        stale[published] = False
+        self.columns['active'][:self.size][stale] = False
+        active = int(self.columns['active'][:self.size].sum())
+        if self.size - active > max(1024, active):
+            self.compact()
+
+    def compact(self):
+        """
+        Rebuild the table from its active rows, dropping inactive rows and the tokens and pairs only
+        they used. The table gets a new table_id, so incremental detectors start over on it.
+        """
+        dex_names = {dex_id: dex for dex, dex_id in DEX_IDS.items()}
+        active = self.columns['active']
+        fresh = PoolTable(capacity=max(1024, int(active[:self.size].sum())))
+        for (dex_id, pool_id), row in sorted(self.rows.items(), key=lambda item: item[1]):
+            if active[row]:
+                fresh.upsert(dex_names[dex_id], pool_id, self.entries[row])
+        self.__dict__.update(fresh.__dict__)
+
+    def view(self, dexes=None):
+        """Copy of the active rows, optionally limited to some DEXes (arrays are copied, entries shared)"""
+        active = self.columns['active'][:self.size]
+        if dexes is not None:
+            active = active & np.isin(self.columns['dex'][:self.size], [DEX_IDS[dex] for dex in dexes if dex in DEX_IDS])
+        rows = np.flatnonzero(active)
+        columns = {name: values[rows] for name, values in self.columns.items() if name != 'active'}
+        columns['row'] = rows
+        return TableView(self.table_id, columns, [self.entries[row] for row in rows], list(self.pair_labels), list(self.tokens.labels))
+
+    @classmethod
+    def from_prices(cls, all_prices):
+        """Build a table from a {dex: {pool_id: entry}} snapshot"""
+        table = cls(capacity=max(1024, sum(len(prices) for prices in all_prices.values())))
+        for dex, prices in all_prices.items():
+            if dex in DEX_IDS:
+                table.replace_dex(dex, prices)
+        return table
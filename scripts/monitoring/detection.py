@@ -0,0 +1,198 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Per-pair reductions over a TableView; every field is an array with one element per pair group
+Spreads = namedtuple('Spreads', [
+    'pair',        # pair id
+    'quotes',      # number of DEXes quoting the pair
+    'buy_row',     # view row with the lowest price (first DEX on ties)
+    'sell_row',    # view row with the highest price (first DEX on ties)
+    'min_price',
+    'max_price',
+    'spread_pct',  # (max - min) / min * 100, 0 when min is not positive
+    'tvl',         # min(TVL of buy row, TVL of sell row)
+    'skewed',      # quotes left out for being too many blocks behind the pair's newest quote
+])
+
+
+def _empty_spreads():
+    empty_int = np.empty(0, dtype=np.int64)
+    empty_float = np.empty(0)
+    return Spreads(empty_int, empty_int, empty_int, empty_int, empty_float, empty_float, empty_float, empty_float, empty_int)
+
+
+def best_pool_rows(view, rows=None):
+    """Deepest (highest TVL) pool per (pair, DEX) among rows that have a pair and a finite price"""
+    if rows is None:
+        rows = np.arange(len(view))
+    rows = rows[(view.pair[rows] >= 0) & np.isfinite(view.price[rows])]
+    if not len(rows):
+        return rows
+    ordered = rows[np.lexsort((-np.nan_to_num(view.tvl[rows]), view.dex[rows], view.pair[rows]))]
+    pair, dex = view.pair[ordered], view.dex[ordered]
+    first = np.r_[True, (pair[1:] != pair[:-1]) | (dex[1:] != dex[:-1])]
+    return ordered[first]
+
+
+def synchronous_rows(view, rows, max_block_skew):
+    """
+    Split rows into those within max_block_skew blocks of the newest quote of their pair and those
+    further behind, so no two compared quotes are more than max_block_skew blocks apart. Rows with
+    an unknown block (-1) or no pair are kept.
+    """
+    pair, block = view.pair[rows], view.block[rows]
+    known = (pair >= 0) & (block >= 0)
+    newest = np.full(max(int(pair.max()) + 1, 1) if len(pair) else 1, -1, dtype=np.int64)
+    np.maximum.at(newest, pair[known], block[known])
+    behind = known & (block < newest[np.where(known, pair, 0)] - max_block_skew)
+    return rows[~behind], rows[behind]
+
+
+def detect_spreads(view, rows=None, max_block_skew=None):
+    """
+    Cross-DEX spread for every pair at once. Each DEX is represented by its deepest pool for the
+    pair; those rows are sorted by (pair, price, dex) and reduced per pair group, giving min/max
+    price, the pools holding them, spread and TVL floor without a Python loop over pairs. With
+    max_block_skew, quotes more than that many blocks behind their pair's newest are not compared.
+    """
+    if rows is None:
+        rows = np.arange(len(view))
+    skewed_rows = rows[:0]
+    if max_block_skew is not None:
+        rows, skewed_rows = synchronous_rows(view, rows, max_block_skew)
+    rows = best_pool_rows(view, rows)
+    if not len(rows):
+        return _empty_spreads()
+    pair, price, dex = view.pair[rows], view.price[rows], view.dex[rows]
+
+    # Both orders group by pair; inside a group the first row is the min (resp. max) price,
+    # ties going to the lower DEX id
+    by_min = rows[np.lexsort((dex, price, pair))]
+    by_max = rows[np.lexsort((dex, -price, pair))]
+
+    sorted_pairs = view.pair[by_min]
+    starts = np.flatnonzero(np.r_[True, sorted_pairs[1:] != sorted_pairs[:-1]])
+    quotes = np.diff(np.r_[starts, len(by_min)])
+
+    buy_row, sell_row = by_min[starts], by_max[starts]
+    min_price, max_price = view.price[buy_row], view.price[sell_row]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread_pct = np.where(min_price > 0, (max_price - min_price) / min_price * 100, 0.0)
+    tvl = np.minimum(np.nan_to_num(view.tvl[buy_row]), np.nan_to_num(view.tvl[sell_row]))
+
+    pairs = sorted_pairs[starts]
+    skewed = np.zeros(len(pairs), dtype=np.int64)
+    if len(skewed_rows):
+        skewed_pairs, counts = np.unique(view.pair[skewed_rows], return_counts=True)
+        at = np.searchsorted(pairs, skewed_pairs)
+        found = (at < len(pairs)) & (pairs[np.minimum(at, len(pairs) - 1)] == skewed_pairs)
+        skewed[at[found]] = counts[found]
+
+    return Spreads(pairs, quotes, buy_row, sell_row, min_price, max_price, spread_pct, tvl, skewed)
+
+
+# Opportunity changes produced by one IncrementalDetector update
+Delta = namedtuple('Delta', ['new', 'updated', 'expired'])
+
+
+def _padded(values, size, fill):
+    if len(values) >= size:
+        return values
+    return np.concatenate([values, np.full(size - len(values), fill, dtype=values.dtype)])
+
+
+class IncrementalDetector:
+    """
+    Keeps per-pair detection state across views of one PoolTable and only re-evaluates pairs with
+    a pool whose price, TVL, fee or reserves changed, appeared or disappeared since the previous view.
+    evaluate(view, spreads) turns the spreads of those pairs into {pair_id: opportunity}.
+    Pairs that had quotes left out for block skew are re-evaluated on every update, since a
+    lagging source catching up changes its block without changing its price. Likewise, pairs with a
+    current opportunity are re-checked on every update: a source republishing the same price at
+    newer blocks bumps no row version, yet can push the other quotes of the pair past the skew limit. cost_epoch() returns
+    a key for the inputs evaluate uses besides the pools (gas and ETH prices); every pair is
+    re-evaluated when it changes.
+    """
+
+    def __init__(self, evaluate, max_block_skew=None, cost_epoch=None):
+        self.evaluate = evaluate
+        self.max_block_skew = max_block_skew
+        self.cost_epoch = cost_epoch
+        self.reset()
+
+    def reset(self):
+        self.table_id = None
+        self.row_versions = np.empty(0, dtype=np.int64)  # table row -> version seen (-1: not in view)
+        self.row_pairs = np.empty(0, dtype=np.int32)  # table row -> pair id seen
+        self.pair_state = {}  # pair id -> last spread of the pair (best bid/ask DEX, prices, spread)
+        self.opportunities = {}  # pair id -> current opportunity
+        self.last_delta = Delta([], [], [])
+        self.last_dirty = 0
+        self.skewed_pairs = np.empty(0, dtype=np.int32)  # pairs evaluated with quotes left out for skew
+        self.epoch = None  # cost_epoch() at the last update
+
+    def dirty_pairs(self, view):
+        """Pair ids with a pool that changed since the previous view (and remember this view's versions)"""
+        size = max(len(self.row_versions), int(view.row.max()) + 1 if len(view) else 0)
+        versions = np.full(size, -1, dtype=np.int64)
+        versions[view.row] = view.version
+        pairs = np.full(size, -1, dtype=np.int32)
+        pairs[view.row] = view.pair
+        changed = versions != _padded(self.row_versions, size, -1)
+        dirty = np.union1d(pairs[changed], _padded(self.row_pairs, size, -1)[changed])
+        self.row_versions, self.row_pairs = versions, pairs
+        return dirty[dirty >= 0]
+
+    def update(self, view):
+        """Re-evaluate the pairs changed since the last view; returns the Delta of opportunities"""
+        if view.table_id != self.table_id:
+            self.reset()
+            self.table_id = view.table_id
+        dirty = np.union1d(self.dirty_pairs(view), self.skewed_pairs)
+        if self.max_block_skew is not None and self.opportunities:
+            dirty = np.union1d(dirty, np.fromiter(self.opportunities, dtype=np.int64))
+        epoch = self.cost_epoch() if self.cost_epoch is not None else None
+        if epoch != self.epoch:
+            # Costs moved: every pair's profit is stale, including pairs that had none
+            self.epoch = epoch
+            dirty = np.union1d(dirty, view.pair[view.pair >= 0])
+        self.last_dirty = len(dirty)
+        if not len(dirty):
+            self.last_delta = Delta([], [], [])
+            return self.last_delta
+
+        spreads = detect_spreads(view, np.flatnonzero(np.isin(view.pair, dirty)), self.max_block_skew)
+        self.skewed_pairs = spreads.pair[spreads.skewed > 0]
+        for i, pair_id in enumerate(spreads.pair.tolist()):
+            self.pair_state[pair_id] = {
+                'quotes': int(spreads.quotes[i]),
+                'buy_dex': int(view.dex[spreads.buy_row[i]]),
+                'sell_dex': int(view.dex[spreads.sell_row[i]]),
+                'min_price': float(spreads.min_price[i]),
+                'max_price': float(spreads.max_price[i]),
+                'spread_pct': float(spreads.spread_pct[i]),
+            }
+        found = self.evaluate(view, spreads)
+
+        new, updated, expired = [], [], []
+        quoted = set(spreads.pair.tolist())
+        for pair_id in dirty.tolist():
+            if pair_id not in quoted:
+                self.pair_state.pop(pair_id, None)
+            previous, current = self.opportunities.get(pair_id), found.get(pair_id)
+            if current is None:
+                if previous is not None:
+                    expired.append(self.opportunities.pop(pair_id))
+                continue
+            self.opportunities[pair_id] = current
+            if previous is None:
+                new.append(current)
+            elif any(previous[key] != current[key] for key in ('buy_dex', 'sell_dex', 'buy_price', 'sell_price', 'profit_analysis')):
+                updated.append(current)
+        self.last_delta = Delta(new, updated, expired)
+        return self.last_delta
+
+    def current(self):
+        """Full current opportunity set"""
+        return list(self.opportunities.values())
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from config import GAS_MODEL_PATH, GAS_MODEL_ALPHA
+from scripts.monitoring.gas_oracle import SWAP_GAS, route_template
+
+# A route shape: the two DEXes, hop count, flash loan or not, and the token pair (sorted addresses,
+# or None for the pair-agnostic entry shared by every pair on the same DEXes)
+RouteTemplate = namedtuple('RouteTemplate', ['buy_dex', 'sell_dex', 'hops', 'flash_loan', 'token_pair'])
+
+
+def route_key(buy_dex, sell_dex, token0=None, token1=None, flash_loan=False, hops=2):
+    """Template for a route; the token pair is order-independent"""
+    token_pair = '-'.join(sorted((token0.lower(), token1.lower()))) if token0 and token1 else None
+    return RouteTemplate(buy_dex, sell_dex, hops, bool(flash_loan), token_pair)
+
+
+def _encode(template):
+    return '|'.join([template.buy_dex or '', template.sell_dex or '', str(template.hops),
+                     'flash' if template.flash_loan else 'regular', template.token_pair or '*'])
+
+
+def _decode(key):
+    buy_dex, sell_dex, hops, kind, token_pair = key.split('|')
+    return RouteTemplate(buy_dex or None, sell_dex or None, int(hops), kind == 'flash',
+                         None if token_pair == '*' else token_pair)
+
+
+class GasModel:
+    """
+    Gas used per route template. A template is seeded from eth_estimateGas the first time a route
+    is built and then tracks the receipts of executed trades (the first receipt replaces the estimate,
+    later ones move it by an exponentially weighted average). Every update also feeds the template's
+    pair-agnostic entry, so new token pairs on known DEXes start from measured gas. Lookups are dict
+    hits with the static route_template numbers as the last fallback. Persisted as JSON after each update.
+    Entries are guarded by a lock: the executor thread updates them while analysis reads them.
+    """
+
+    def __init__(self, path=GAS_MODEL_PATH, alpha=GAS_MODEL_ALPHA):
+        self.path = path
+        self.alpha = alpha
+        self.entries = {}  # RouteTemplate -> {'gas', 'samples', 'source', 'updated'}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = {_decode(key): entry for key, entry in json.load(f).items()}
+        except (OSError, ValueError):
+            self.entries = {}  # Unreadable file: start over from estimates
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({_encode(template): entry for template, entry in self.entries.items()}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def gas_units(self, template):
+        """Learned gas for a template, else its pair-agnostic entry, else the static estimate"""
+        with self.lock:
+            entry = self.entries.get(template)
+            if entry is None and template.token_pair is not None:
+                entry = self.entries.get(template._replace(token_pair=None))
+        if entry is not None:
+            return int(entry['gas'])
+        return route_template(template.buy_dex, template.sell_dex, template.flash_loan)[0]
+
+    def gas_floor(self, flash_loan=False):
+        """Least gas any route of the given kind is known or assumed to use"""
+        cheapest_dex = min(SWAP_GAS, key=SWAP_GAS.get)
+        with self.lock:
+            learned = [entry['gas'] for template, entry in self.entries.items() if template.flash_loan == bool(flash_loan)]
+        return int(min([route_template(cheapest_dex, cheapest_dex, flash_loan)[0]] + learned))
+
+    def seed(self, template, estimated_gas):
+        """Record an eth_estimateGas result for templates that have no data yet; True if it was used"""
+        with self.lock:
+            if template in self.entries:
+                return False
+            self._set(template, estimated_gas, 0, 'estimate')
+            generic = template._replace(token_pair=None)
+            if generic not in self.entries:
+                self._set(generic, estimated_gas, 0, 'estimate')
+            self.save()
+        return True
+
+    def record_receipt(self, template, gas_used):
+        """Fold an executed trade's gasUsed into its template and the pair-agnostic entry"""
+        with self.lock:
+            for key in {template, template._replace(token_pair=None)}:
+                entry = self.entries.get(key)
+                if entry is None or entry['source'] == 'estimate':
+                    self._set(key, gas_used, 1, 'receipt')
+                else:
+                    self._set(key, entry['gas'] + self.alpha * (gas_used - entry['gas']), entry['samples'] + 1, 'receipt')
+            self.save()
+            return self.entries[template]['gas']
+
+    def _set(self, template, gas, samples, source):
+        self.entries[template] = {'gas': float(gas), 'samples': samples, 'source': source, 'updated': int(time.time())}
+
+
+# One model per process, shared by the profit model and the executor
+GAS_MODEL = GasModel()
@@ -0,0 +1,136 @@
+import threading
+from collections import deque, namedtuple
+
+import numpy as np
+from web3 import Web3
+
+from config import GAS_PRICE_ORACLE_ADDRESS, FEE_HISTORY_BLOCKS, PRIORITY_FEE_PERCENTILE
+from scripts.monitoring.multicall import Call, multicall, encode_call, decoder
+
+GAS_PRICE_ORACLE = Web3.to_checksum_address(GAS_PRICE_ORACLE_ADDRESS)
+
+# Rough gas per swap leg by DEX and per token approval; the gas model replaces them with measured values per route
+SWAP_GAS = {'Uniswap': 130000, 'Aerodrome': 120000, 'Balancer V2': 140000, 'SushiSwap': 110000}
+DEFAULT_SWAP_GAS = 130000
+APPROVE_GAS = 46000
+FLASH_LOAN_GAS = 180000  # Aave flashLoanSimple round trip on top of the swaps
+TX_BASE_GAS = 21000
+SWAP_CALLDATA_BYTES = 260  # Router calldata per swap leg
+TX_ENVELOPE_BYTES = 50  # Nonce, fee fields, gas limit, recipient and value (the signature is added below)
+
+# Fjord L1 fee model (FastLZ-compressed size regression), as in GasPriceOracle.getL1FeeUpperBound
+L1_COST_INTERCEPT = -42_585_600
+L1_COST_FASTLZ_COEF = 836_500
+MIN_TX_SIZE_SCALED = 100 * 10 ** 6
+
+# L2 execution fee, L1 data fee and their sum in wei, and the sum in ETH and USD
+GasCost = namedtuple('GasCost', ['gas_units', 'l2_fee_wei', 'l1_fee_wei', 'total_wei', 'total_eth', 'total_usd'])
+
+
+def _l1_params_calls():
+    return [Call(GAS_PRICE_ORACLE, encode_call(name + '()'), decoder('uint256'))
+            for name in ('l1BaseFee', 'blobBaseFee', 'baseFeeScalar', 'blobBaseFeeScalar')]
+
+
+def route_template(buy_dex, sell_dex, flash_loan=False):
+    """(gas units, unsigned tx size in bytes) for a two-leg route"""
+    gas_units = TX_BASE_GAS + SWAP_GAS.get(buy_dex, DEFAULT_SWAP_GAS) + SWAP_GAS.get(sell_dex, DEFAULT_SWAP_GAS)
+    gas_units += FLASH_LOAN_GAS if flash_loan else 2 * APPROVE_GAS
+    return gas_units, TX_ENVELOPE_BYTES + 2 * SWAP_CALLDATA_BYTES
+
+
+class GasOracle:
+    """
+    EIP-1559 fee history and the Base L1 fee parameters, refreshed at most once per block. Fee
+    history is kept as a rolling window so each refresh only asks for the blocks it has not seen.
+    Route costs are the L2 execution fee at the next base fee plus a recent priority-fee
+    percentile, plus the L1 data fee for the route's transaction size. The fee history is guarded by
+    a lock because the executor thread reads it while the refresher on the event loop appends to it.
+    """
+
+    def __init__(self, history_blocks=FEE_HISTORY_BLOCKS, percentile=PRIORITY_FEE_PERCENTILE):
+        self.history_blocks = history_blocks
+        self.percentile = percentile
+        self.block = None
+        self.history = deque(maxlen=history_blocks)  # (block, base fee, priority fee at percentile)
+        self.next_base_fee = None
+        self.l1_params = None  # (l1BaseFee, blobBaseFee, baseFeeScalar, blobBaseFeeScalar)
+        self.lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.next_base_fee is not None and self.l1_params is not None
+
+    async def refresh(self, rpc, block):
+        """Pull fee history for blocks not seen yet and the L1 fee parameters as of block"""
+        if block == self.block:
+            return False
+        count = self.history_blocks if self.block is None else max(1, min(self.history_blocks, block - self.block))
+        history = await rpc.request('eth_feeHistory', [hex(count), hex(block), [self.percentile]])
+        oldest = int(history['oldestBlock'], 16)
+        base_fees = [int(fee, 16) for fee in history['baseFeePerGas']]
+        rewards = history.get('reward') or [['0x0']] * count
+        with self.lock:
+            for i, reward in enumerate(rewards):
+                self.history.append((oldest + i, base_fees[i], int(reward[0], 16) if reward else 0))
+            self.next_base_fee = base_fees[-1]  # The last entry is the base fee of the next block
+
+        l1_params = await multicall(rpc, _l1_params_calls(), block_identifier=block)
+        if all(value is not None for value in l1_params):
+            self.l1_params = tuple(l1_params)
+        self.block = block
+        return True
+
+    def priority_fee(self):
+        """Median over the window of each block's priority fee at the configured percentile"""
+        with self.lock:
+            fees = [entry[2] for entry in self.history]
+        return int(np.median(fees)) if fees else 0
+
+    def gas_price(self):
+        """L2 price per gas to bid (wei): next base fee plus the recent priority fee"""
+        return (self.next_base_fee or 0) + self.priority_fee()
+
+    def fee_params(self):
+        """EIP-1559 fields for a transaction sent now; the max fee allows two full base-fee increases"""
+        priority_fee = self.priority_fee()
+        return {'maxPriorityFeePerGas': priority_fee,
+                'maxFeePerGas': (self.next_base_fee or 0) * 2 + priority_fee}
+
+    def l1_fee(self, tx_size):
+        """Upper-bound L1 data fee (wei) for an unsigned transaction of tx_size bytes"""
+        if self.l1_params is None:
+            return 0
+        l1_base_fee, blob_base_fee, base_fee_scalar, blob_base_fee_scalar = self.l1_params
+        tx_size += 68  # Signature and RLP overhead of the signed transaction
+        fastlz_size = tx_size + tx_size // 255 + 16
+        estimated_size = max(MIN_TX_SIZE_SCALED, L1_COST_INTERCEPT + L1_COST_FASTLZ_COEF * fastlz_size)
+        fee_scaled = base_fee_scalar * l1_base_fee * 16 + blob_base_fee_scalar * blob_base_fee
+        return estimated_size * fee_scaled // 10 ** 12
+
+    def route_cost(self, gas_units, tx_size, eth_price_usd):
+        """Cost of one route transaction"""
+        l2_fee = gas_units * self.gas_price()
+        l1_fee = self.l1_fee(tx_size)
+        total = l2_fee + l1_fee
+        return GasCost(gas_units, l2_fee, l1_fee, total, total / 1e18, total / 1e18 * eth_price_usd)
+
+    def route_costs_usd(self, buy_dexes, sell_dexes, eth_price_usd, flash_loan=False, templates=None, gas_model=None):
+        """
+        USD cost per candidate route, computed once per distinct route. With a gas model, gas units
+        come from its learned entry for each candidate's template instead of the static estimate.
+        """
+        costs = {}
+        result = np.empty(len(buy_dexes))
+        templates = templates if templates is not None else [None] * len(buy_dexes)
+        for i, route in enumerate(zip(buy_dexes, sell_dexes, templates)):
+            if route not in costs:
+                gas_units, tx_size = route_template(route[0], route[1], flash_loan=flash_loan)
+                if gas_model is not None and route[2] is not None:
+                    gas_units = gas_model.gas_units(route[2])
+                costs[route] = self.route_cost(gas_units, tx_size, eth_price_usd).total_usd
+            result[i] = costs[route]
+        return result
+
+# One oracle per process, refreshed by the bot on every new head
+GAS_ORACLE = GasOracle()
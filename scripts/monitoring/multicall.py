@@ -0,0 +1,163 @@
+import asyncio
+from collections import namedtuple
+
+from eth_abi import encode, decode
+from web3 import Web3
+
+from config import MULTICALL3_ADDRESS, MULTICALL_CHUNK_SIZE
+from scripts.monitoring.rpc_client import RPCError
+
+MULTICALL3 = Web3.to_checksum_address(MULTICALL3_ADDRESS)
+
+# A single read: target contract, ABI-encoded calldata and a decoder for the return bytes
+Call = namedtuple('Call', ['target', 'data', 'decode'])
+
+
+def selector(signature):
+    """4-byte function selector for a signature like 'allPairs(uint256)'"""
+    return Web3.keccak(text=signature)[:4]
+
+
+AGGREGATE3_SELECTOR = selector("aggregate3((address,bool,bytes)[])")
+
+# Node error messages for an aggregate eth_call that a smaller chunk can avoid
+SPLITTABLE_ERRORS = ('revert', 'out of gas', 'gas required exceeds', 'gas limit', 'too large', 'response size')
+
+
+def encode_call(signature, arg_types=(), args=()):
+    """ABI-encode calldata for a function signature and its arguments"""
+    return selector(signature) + encode(list(arg_types), list(args))
+
+
+def decoder(*output_types):
+    """Build a decoder for the given output types (single outputs are unwrapped)"""
+    def _decode(data):
+        values = decode(list(output_types), data)
+        return values[0] if len(values) == 1 else values
+    return _decode
+
+
+def decode_symbol(data):
+    """Decode an ERC20 symbol that may be returned as string or bytes32 (e.g. MKR)"""
+    try:
+        return decode(['string'], data)[0]
+    except Exception:
+        return data[:32].rstrip(b'\x00').decode('utf-8', errors='ignore')
+
+
+# Common calls used by the DEX scanners
+def all_pairs_length_call(factory):
+    return Call(factory, encode_call('allPairsLength()'), decoder('uint256'))
+
+
+def all_pairs_call(factory, index):
+    return Call(factory, encode_call('allPairs(uint256)', ['uint256'], [index]), decoder('address'))
+
+
+def get_reserves_call(pair):
+    return Call(pair, encode_call('getReserves()'), decoder('uint112', 'uint112', 'uint32'))
+
+
+def token0_call(pair):
+    return Call(pair, encode_call('token0()'), decoder('address'))
+
+
+def token1_call(pair):
+    return Call(pair, encode_call('token1()'), decoder('address'))
+
+
+def symbol_call(token):
+    return Call(token, encode_call('symbol()'), decode_symbol)
+
+
+def decimals_call(token):
+    return Call(token, encode_call('decimals()'), decoder('uint8'))
+
+
+def slot0_call(pool):
+    return Call(pool, encode_call('slot0()'), decoder('uint160', 'int24', 'uint16', 'uint16', 'uint16', 'uint8', 'bool'))
+
+
+def liquidity_call(pool):
+    return Call(pool, encode_call('liquidity()'), decoder('uint128'))
+
+
+def fee_call(pool):
+    return Call(pool, encode_call('fee()'), decoder('uint24'))
+
+
+def tick_spacing_call(pool):
+    return Call(pool, encode_call('tickSpacing()'), decoder('int24'))
+
+
+def encode_aggregate3(calls):
+    """Encode an aggregate3 call where every sub-call is allowed to fail"""
+    return AGGREGATE3_SELECTOR + encode(
+        ['(address,bool,bytes)[]'],
+        [[(Web3.to_checksum_address(call.target), True, call.data) for call in calls]]
+    )
+
+
+def decode_aggregate3(calls, raw):
+    """Decode aggregate3 return data; failed or undecodable sub-calls become None"""
+    results = decode(['(bool,bytes)[]'], raw)[0]
+    decoded = []
+    for call, (success, data) in zip(calls, results):
+        if not success or not data:
+            decoded.append(None)
+            continue
+        try:
+            decoded.append(call.decode(data))
+        except Exception:
+            decoded.append(None)
+    return decoded
+
+
+def _is_splittable(error):
+    """True if an aggregate eth_call failed on its own content (revert, gas, size), not on the transport"""
+    if error.status == 413:
+        return True  # Payload too large
+    if error.error is None:
+        return False
+    message = error.error.get('message', '') if isinstance(error.error, dict) else str(error.error)
+    return any(hint in message.lower() for hint in SPLITTABLE_ERRORS)
+
+
+async def _aggregate_chunk(rpc, calls, block_identifier):
+    """
+    Run one chunk, splitting it in half if the whole eth_call reverts, runs out of gas, is too
+    large or returns undecodable data. Transport failures (timeouts, HTTP errors, rate limits)
+    are raised, since splitting would only multiply the failing requests.
+    """
+    try:
+        raw = await rpc.eth_call(MULTICALL3, encode_aggregate3(calls), block_identifier)
+    except RPCError as e:
+        if not _is_splittable(e):
+            raise
+        return await _split_chunk(rpc, calls, block_identifier)
+    try:
+        return decode_aggregate3(calls, raw)
+    except Exception:
+        return await _split_chunk(rpc, calls, block_identifier)
+
+
+async def _split_chunk(rpc, calls, block_identifier):
+    if len(calls) == 1:
+        return [None]
+    middle = len(calls) // 2
+    first, second = await asyncio.gather(
+        _aggregate_chunk(rpc, calls[:middle], block_identifier),
+        _aggregate_chunk(rpc, calls[middle:], block_identifier)
+    )
+    return first + second
+
+
+async def multicall(rpc, calls, chunk_size=MULTICALL_CHUNK_SIZE, block_identifier='latest'):
+    """
+    Execute many read-only calls through Multicall3 aggregate3 using an AsyncRPCClient.
+    Chunks are sent concurrently (bounded by the client). Returns one result per call,
+    in order, with None for calls that failed.
+    """
+    chunks = [calls[start:start + chunk_size] for start in range(0, len(calls), chunk_size)]
+    chunk_results = await asyncio.gather(*[_aggregate_chunk(rpc, chunk, block_identifier) for chunk in chunks])
+    return [result for chunk in chunk_results for result in chunk]
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+
+from web3 import Web3
+
+from config import CHAIN_ID, PAIR_INDEX_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    decimals INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, address)
+);
+CREATE TABLE IF NOT EXISTS pools (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    dex TEXT NOT NULL,
+    factory TEXT,
+    pair_index INTEGER,
+    token0 TEXT,
+    token1 TEXT,
+    PRIMARY KEY (chain_id, address)
+);
+CREATE INDEX IF NOT EXISTS pools_by_factory ON pools (chain_id, factory, pair_index);
+CREATE TABLE IF NOT EXISTS scan_state (
+    chain_id INTEGER NOT NULL,
+    factory TEXT NOT NULL,
+    pairs_length INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, factory)
+);
+"""
+
+
+class PairIndex:
+    """
+    Persistent index of immutable pool and token metadata (pool -> tokens, token -> symbol/decimals).
+    Everything is mirrored in memory so lookups never touch the database; writes go straight to SQLite.
+    """
+
+    def __init__(self, path=PAIR_INDEX_PATH, chain_id=CHAIN_ID):
+        self.path = path
+        self.chain_id = chain_id
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.tokens = {}  # address -> (symbol, decimals)
+        self.pools = {}  # address -> {'dex', 'factory', 'pair_index', 'token0', 'token1'}
+        self.scan_state = {}  # factory -> pairs_length already enumerated
+        self._load()
+
+    def _load(self):
+        with self.lock:
+            for address, symbol, decimals in self.conn.execute(
+                    "SELECT address, symbol, decimals FROM tokens WHERE chain_id = ?", (self.chain_id,)):
+                self.tokens[address] = (symbol, decimals)
+            for address, dex, factory, pair_index, token0, token1 in self.conn.execute(
+                    "SELECT address, dex, factory, pair_index, token0, token1 FROM pools WHERE chain_id = ?",
+                    (self.chain_id,)):
+                self.pools[address] = {'dex': dex, 'factory': factory, 'pair_index': pair_index,
+                                       'token0': token0, 'token1': token1}
+            for factory, pairs_length in self.conn.execute(
+                    "SELECT factory, pairs_length FROM scan_state WHERE chain_id = ?", (self.chain_id,)):
+                self.scan_state[factory] = pairs_length
+
+    def get_token(self, address):
+        """Return (symbol, decimals) for a token, or None if it has not been indexed yet"""
+        return self.tokens.get(Web3.to_checksum_address(address))
+
+    def add_tokens(self, token_info):
+        """Record {address: (symbol, decimals)} for newly seen tokens"""
+        rows = []
+        for address, (symbol, decimals) in token_info.items():
+            address = Web3.to_checksum_address(address)
+            self.tokens[address] = (symbol, decimals)
+            rows.append((self.chain_id, address, symbol, decimals))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tokens (chain_id, address, symbol, decimals) VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def get_pool(self, address):
+        """Return the indexed pool record, or None"""
+        return self.pools.get(Web3.to_checksum_address(address))
+
+    def add_pools(self, dex, pools, factory=None):
+        """Record pools as (pair_index, address, token0, token1); token addresses may be None if unknown"""
+        rows = []
+        for pair_index, address, token0, token1 in pools:
+            address = Web3.to_checksum_address(address)
+            token0 = Web3.to_checksum_address(token0) if token0 else None
+            token1 = Web3.to_checksum_address(token1) if token1 else None
+            self.pools[address] = {'dex': dex, 'factory': factory, 'pair_index': pair_index,
+                                   'token0': token0, 'token1': token1}
+            rows.append((self.chain_id, address, dex, factory, pair_index, token0, token1))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pools (chain_id, address, dex, factory, pair_index, token0, token1) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def get_factory_pairs(self, factory, limit=None):
+        """Pair addresses enumerated from a factory, ordered by allPairs index"""
+        pairs = [(record['pair_index'], address) for address, record in self.pools.items()
+                 if record['factory'] == factory and record['pair_index'] is not None]
+        pairs.sort()
+        if limit is not None:
+            pairs = [pair for pair in pairs if pair[0] < limit]
+        return [address for _, address in pairs]
+
+    def get_scanned_length(self, factory):
+        """Number of allPairs indices already enumerated for a factory"""
+        return self.scan_state.get(factory, 0)
+
+    def set_scanned_length(self, factory, pairs_length):
+        self.scan_state[factory] = pairs_length
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scan_state (chain_id, factory, pairs_length) VALUES (?, ?, ?)",
+                (self.chain_id, factory, pairs_length))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
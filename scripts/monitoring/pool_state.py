@@ -0,0 +1,189 @@
+from web3 import Web3
+
+from config import LOG_BLOCK_RANGE, MAX_LOG_CATCHUP_BLOCKS
+
+
+def event_topic(signature):
+    """0x-prefixed keccak topic for an event signature"""
+    return '0x' + bytes(Web3.keccak(text=signature)).hex()
+
+
+# Event topics
+SYNC_V2_TOPIC = event_topic("Sync(uint112,uint112)")  # UniswapV2 / SushiSwap pairs
+SYNC_AERODROME_TOPIC = event_topic("Sync(uint256,uint256)")  # Aerodrome pools
+SWAP_V3_TOPIC = event_topic("Swap(address,address,int256,int256,uint160,uint128,int24)")  # Uniswap V3 pools
+
+def _words(data):
+    """Split hex log data into 32-byte integer words"""
+    data = data[2:] if data.startswith('0x') else data
+    return [int(data[i:i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def _signed(word, bits=256):
+    return word - (1 << bits) if word >= 1 << (bits - 1) else word
+
+
+def _topic_hex(topic):
+    if isinstance(topic, (bytes, bytearray)):
+        return '0x' + topic.hex()
+    return topic if topic.startswith('0x') else '0x' + topic
+
+
+class PoolStateStore:
+    """
+    Mutable pool state (reserves or sqrtPrice/liquidity) kept up to date from Sync/Swap logs.
+    Pools are loaded once by a full read and afterwards only the pools touched by logs since
+    last_block are updated, so the per-cycle cost scales with swaps rather than pool count.
+    """
+
+    def __init__(self):
+        self.pools = {}  # lowercase pool address -> state dict
+        self.last_block = None
+        self.extra_topics = []  # Further event topics fetched in the same getLogs sweep
+        self.log_listeners = []  # Callables handed every fetched log (e.g. the V3 quote book)
+
+    def reset(self):
+        self.pools.clear()
+        self.last_block = None
+
+    def is_watched(self, address):
+        return address.lower() in self.pools
+
+    def get(self, address):
+        return self.pools.get(address.lower())
+
+    def watch(self, address, kind, block=None, **state):
+        """Start tracking a pool; state holds reserve0/reserve1 (v2, aerodrome) or sqrt_price_x96/liquidity/tick (v3)"""
+        entry = self.pools.setdefault(address.lower(), {'kind': kind, 'block': None})
+        entry.update(state)
+        if block is not None:
+            entry['block'] = block
+        return entry
+
+    def mark_synced(self, block):
+        """Record that watched state is current as of block (after a full read pinned to it)"""
+        if self.last_block is None or block > self.last_block:
+            self.last_block = block
+
+    def price(self, address, decimals0, decimals1):
+        """Current price as token0 per token1 (same convention as the subgraph token0Price), or None"""
+        entry = self.get(address)
+        if not entry:
+            return None
+        if entry['kind'] == 'v3':
+            sqrt_price_x96 = entry.get('sqrt_price_x96')
+            if not sqrt_price_x96:
+                return None
+            return (2 ** 192 / sqrt_price_x96 ** 2) * 10 ** (decimals1 - decimals0)
+        reserve0, reserve1 = entry.get('reserve0'), entry.get('reserve1')
+        if not reserve0 or not reserve1:
+            return None
+        return (reserve0 / 10 ** decimals0) / (reserve1 / 10 ** decimals1)
+
+    def reserves(self, address, decimals0, decimals1):
+        """
+        (reserve0, reserve1) in token units, or None. For v3 pools these are the virtual reserves
+        L / sqrtP and L * sqrtP, which behave like constant-product reserves within the current tick.
+        """
+        entry = self.get(address)
+        if not entry:
+            return None
+        if entry['kind'] == 'v3':
+            sqrt_price_x96, liquidity = entry.get('sqrt_price_x96'), entry.get('liquidity')
+            if not sqrt_price_x96 or not liquidity:
+                return None
+            reserve0, reserve1 = liquidity * 2 ** 96 / sqrt_price_x96, liquidity * sqrt_price_x96 / 2 ** 96
+        else:
+            reserve0, reserve1 = entry.get('reserve0'), entry.get('reserve1')
+            if not reserve0 or not reserve1:
+                return None
+        return reserve0 / 10 ** decimals0, reserve1 / 10 ** decimals1
+
+    def apply_log(self, log):
+        """Apply one log to the pool it belongs to; returns the pool address if it was watched"""
+        if log.get('removed'):
+            return None
+        address = log['address'].lower()
+        entry = self.pools.get(address)
+        if entry is None or not log.get('topics'):
+            return None
+        topic = _topic_hex(log['topics'][0])
+        words = _words(log['data'])
+        block = int(log['blockNumber'], 16) if isinstance(log['blockNumber'], str) else log['blockNumber']
+        if entry['block'] is not None and block < entry['block']:
+            return None  # Already past this log (read pinned to a later block by another refresher)
+        if topic in (SYNC_V2_TOPIC, SYNC_AERODROME_TOPIC) and entry['kind'] in ('v2', 'aerodrome') and len(words) >= 2:
+            entry['reserve0'], entry['reserve1'] = words[0], words[1]
+        elif topic == SWAP_V3_TOPIC and entry['kind'] == 'v3' and len(words) >= 5:
+            entry['sqrt_price_x96'] = words[2]
+            entry['liquidity'] = words[3]
+            entry['tick'] = _signed(words[4])
+        else:
+            return None
+        entry['block'] = block
+        return address
+
+    async def _fetch_logs(self, rpc, from_block, to_block):
+        """eth_getLogs over a block range, halving the range if the node rejects it as too large"""
+        try:
+            return await rpc.get_logs({
+                'fromBlock': hex(from_block),
+                'toBlock': hex(to_block),
+                'topics': [[SYNC_V2_TOPIC, SYNC_AERODROME_TOPIC, SWAP_V3_TOPIC] + self.extra_topics]
+            })
+        except Exception:
+            if from_block == to_block:
+                raise
+            middle = (from_block + to_block) // 2
+            return (await self._fetch_logs(rpc, from_block, middle) +
+                    await self._fetch_logs(rpc, middle + 1, to_block))
+
+    async def sync(self, rpc, to_block):
+        """
+        Apply all Sync/Swap logs in (last_block, to_block] and return the set of touched pool addresses.
+        Returns None (after clearing the store) when it has to be rebuilt by a full read because it
+        was never synced or has fallen too far behind.
+        """
+        if self.last_block is None or to_block - self.last_block > MAX_LOG_CATCHUP_BLOCKS:
+            self.reset()
+            return None
+        touched = set()
+        from_block = self.last_block + 1
+        while from_block <= to_block:
+            range_end = min(from_block + LOG_BLOCK_RANGE - 1, to_block)
+            for log in await self._fetch_logs(rpc, from_block, range_end):
+                for listener in self.log_listeners:
+                    listener(log)
+                address = self.apply_log(log)
+                if address:
+                    touched.add(address)
+            from_block = range_end + 1
+        self.last_block = max(self.last_block, to_block)
+        return touched
+
+    def refresh_prices(self, dex_prices, kind, block=None):
+        """
+        Register subgraph-sourced pools for log tracking and overwrite their price (and set their
+        reserves and block) from the log-derived state when a newer on-chain state is known. Entries
+        need pool_id and decimals.
+        """
+        updated = 0
+        for info in dex_prices.values():
+            pool_id = info.get('pool_id')
+            decimals0, decimals1 = info.get('decimals0'), info.get('decimals1')
+            if not pool_id or decimals0 is None or decimals1 is None:
+                continue
+            if not self.is_watched(pool_id):
+                self.watch(pool_id, kind, block=block)
+                continue
+            if kind == 'aerodrome' and info.get('stable'):
+                continue  # Reserve ratio is not the price on the stable curve
+            price = self.price(pool_id, decimals0, decimals1)
+            if price and self.get(pool_id)['block'] is not None:
+                info['price'] = price
+                info['block'] = block if block is not None else self.last_block
+                reserves = self.reserves(pool_id, decimals0, decimals1)
+                if reserves:
+                    info['reserve0'], info['reserve1'] = reserves
+                updated += 1
+        return updated
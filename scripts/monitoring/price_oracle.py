@@ -0,0 +1,119 @@
+import numpy as np
+from eth_abi import decode
+from web3 import Web3
+
+from config import WETH_ADDRESS, USDC_ADDRESS, ETH_USD_FALLBACK_POOL, DEFAULT_ETH_PRICE_USD, MIN_LIQUIDITY_USD
+from scripts.monitoring.multicall import selector
+
+WETH = WETH_ADDRESS.lower()
+USDC = USDC_ADDRESS.lower()
+SLOT0_SELECTOR = selector('slot0()')
+
+
+def eth_price_from_slot0(data):
+    """USDC per WETH from a WETH/USDC V3 pool's slot0 return data (token0 = WETH, 18 decimals; token1 = USDC, 6)"""
+    sqrt_price_x96 = decode(['uint160'], bytes(data)[:32])[0]
+    return (sqrt_price_x96 / 2 ** 96) ** 2 * 10 ** (18 - 6)
+
+
+def fetch_eth_price_usd(w3):
+    """ETH/USD from the fallback WETH/USDC pool for standalone scripts with a synchronous Web3; default if unreadable"""
+    try:
+        data = w3.eth.call({'to': Web3.to_checksum_address(ETH_USD_FALLBACK_POOL), 'data': '0x' + SLOT0_SELECTOR.hex()})
+        return eth_price_from_slot0(data)
+    except Exception:
+        return DEFAULT_ETH_PRICE_USD
+
+
+class PriceOracle:
+    """
+    USD prices for every token in a table view. USDC is the anchor; WETH is priced by the deepest
+    WETH/USDC pool and other tokens by walking out over the pool graph, one hop per round, each
+    token taking its price from the deepest pool that links it to an already priced token.
+    Results are cached per (table, block) so every consumer in a cycle sees the same numbers.
+    """
+
+    def __init__(self, max_hops=4, min_tvl=MIN_LIQUIDITY_USD):
+        self.max_hops = max_hops
+        self.min_tvl = min_tvl
+        self.key = None  # (table id, block) of the cached prices
+        self.usd = np.empty(0)  # token id -> USD price (NaN if unreachable)
+        self.labels = {}  # lowercase token address -> token id
+        self.eth_usd = None  # From the pool graph, else the fallback pool
+        self.fallback_eth_usd = None
+        self.anchored = False  # Whether the last view had a WETH/USDC route
+
+    def update(self, view, block=None):
+        """Recompute prices from a view unless they are cached for this table and block"""
+        key = (view.table_id, block)
+        if block is not None and key == self.key:
+            return self.usd
+        self.key = key
+        self.labels = {label.lower(): i for i, label in enumerate(view.token_labels)}
+        usd = np.full(len(view.token_labels), np.nan)
+        if USDC in self.labels:
+            usd[self.labels[USDC]] = 1.0
+
+        # Deepest pools first, so the first candidate for a token is the deepest one
+        usable = np.flatnonzero(np.isfinite(view.price) & (view.price > 0) & (np.nan_to_num(view.tvl) >= self.min_tvl))
+        rows = usable[np.argsort(-view.tvl[usable], kind='stable')]
+        token_a, token_b, price = view.token0[rows].astype(np.int64), view.token1[rows].astype(np.int64), view.price[rows]
+        for _ in range(self.max_hops):
+            known_a, known_b = np.isfinite(usd[token_a]), np.isfinite(usd[token_b])
+            from_a, from_b = np.flatnonzero(known_a & ~known_b), np.flatnonzero(known_b & ~known_a)
+            if not len(from_a) and not len(from_b):
+                break
+            # price is token_a per token_b: usd(b) = price * usd(a)
+            depth_rank = np.concatenate([from_a, from_b])
+            targets = np.concatenate([token_b[from_a], token_a[from_b]])
+            values = np.concatenate([price[from_a] * usd[token_a[from_a]], usd[token_b[from_b]] / price[from_b]])
+            order = np.argsort(depth_rank, kind='stable')
+            priced, first = np.unique(targets[order], return_index=True)
+            usd[priced] = values[order][first]
+        self.usd = usd
+
+        weth = self.labels.get(WETH)
+        self.anchored = weth is not None and np.isfinite(usd[weth])
+        self.eth_usd = float(usd[weth]) if self.anchored else self.fallback_eth_usd
+        return usd
+
+    async def refresh_fallback(self, rpc, block='latest'):
+        """Read ETH/USD from the fallback pool (used while no WETH/USDC route is in the views)"""
+        data = await rpc.eth_call(Web3.to_checksum_address(ETH_USD_FALLBACK_POOL), SLOT0_SELECTOR, block)
+        self.fallback_eth_usd = eth_price_from_slot0(data)
+        if not self.anchored:
+            self.eth_usd = self.fallback_eth_usd
+        return self.fallback_eth_usd
+
+    def token_usd(self, view, token_ids):
+        """USD prices for an array of the view's token ids (NaN where unknown)"""
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        if self.key is None or self.key[0] != view.table_id or len(self.usd) < len(view.token_labels):
+            self.update(view)
+        return self.usd[token_ids] if len(token_ids) else np.empty(0)
+
+    def usd_price(self, token):
+        """USD price of a token address, or None if it is not reachable from USDC"""
+        token = token.lower()
+        if token == WETH:
+            return self.eth_price_usd()
+        i = self.labels.get(token)
+        if i is None or not np.isfinite(self.usd[i]):
+            return 1.0 if token == USDC else None
+        return float(self.usd[i])
+
+    def eth_price_usd(self):
+        return self.eth_usd if self.eth_usd else DEFAULT_ETH_PRICE_USD
+
+
+# Shared by the bot, the profit model and the helper scripts
+PRICE_ORACLE = PriceOracle()
+
+
+def eth_price_usd():
+    """Current ETH/USD price: the one lookup every USD conversion goes through"""
+    return PRICE_ORACLE.eth_price_usd()
+
+
+def usd_price(token):
+    return PRICE_ORACLE.usd_price(token)
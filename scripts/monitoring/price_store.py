@@ -0,0 +1,56 @@
+import threading
+import time
+
+from scripts.monitoring.columnar import PoolTable
+
+
+class PriceStore:
+    """
+    Shared in-memory price store. Each DEX refresher publishes its latest price map independently;
+    every entry carries the time it was refreshed and the block it reflects. Published maps are
+    also written into a columnar PoolTable, and readers take a consistent snapshot (maps plus a
+    table view) without waiting on any fetcher.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dex_prices = {}  # dex -> {pool_id: entry}
+        self.updated_at = {}  # dex -> unix time of last publish
+        self.blocks = {}  # dex -> block number of last publish (None if unknown)
+        self.version = 0
+        self.table = PoolTable()
+
+    def update(self, dex, prices, block=None):
+        """Publish a fresh price map for one DEX"""
+        now = time.time()
+        for entry in prices.values():
+            entry['updated_at'] = now
+            if entry.get('block') is None:
+                entry['block'] = block
+        with self.lock:
+            self.dex_prices[dex] = prices
+            self.updated_at[dex] = now
+            self.blocks[dex] = block
+            self.table.replace_dex(dex, prices)
+            self.version += 1
+
+    def snapshot(self, max_age=None):
+        """
+        Consistent view of the store: {'prices': {dex: {pool_id: entry}}, 'table', 'version', 'updated_at', 'blocks'}.
+        DEXes whose last publish is older than max_age seconds are left out rather than compared stale.
+        """
+        now = time.time()
+        with self.lock:
+            prices = {}
+            for dex, dex_prices in self.dex_prices.items():
+                if max_age is not None and now - self.updated_at[dex] > max_age:
+                    continue
+                prices[dex] = dict(dex_prices)
+            return {
+                'prices': prices,
+                'table': self.table.view(dexes=prices.keys()),
+                'version': self.version,
+                'updated_at': dict(self.updated_at),
+                'blocks': dict(self.blocks),
+                'fetched_at': now
+            }
@@ -0,0 +1,162 @@
+from collections import namedtuple
+
+import numpy as np
+
+from config import (BASE_GAS_PRICE_GWEI, TRANSACTION_FEE_PCT, SLIPPAGE_PCT, MEV_PROTECTION_COST_USD,
+                    MIN_PROFIT_THRESHOLD_USD, POSITION_SIZE_USD)
+from scripts.monitoring.price_oracle import eth_price_usd as current_eth_price_usd
+from scripts.monitoring.gas_oracle import GAS_ORACLE, route_template
+
+# Cost terms that only depend on the position size, the gas price and the ETH price
+CostTerms = namedtuple('CostTerms', [
+    'gas_cost_usd', 'transaction_fees_usd', 'slippage_cost_usd', 'mev_protection_cost_usd', 'total_costs_usd'
+])
+
+
+def gas_limits(position_size_eth):
+    """(swap, approve) gas limits for a position size; larger positions get higher limits"""
+    if position_size_eth < 0.01:  # Very small positions
+        return 100000, 20000
+    if position_size_eth < 0.1:  # Small positions
+        return 150000, 30000
+    if position_size_eth < 1.0:  # Medium positions
+        return 200000, 40000
+    return 250000, 50000  # Large positions
+
+
+def cost_terms(eth_price_usd=None, gas_cost_usd=None):
+    """
+    Compute the per-trade cost terms once so a whole batch of candidates can share them.
+    gas_cost_usd may be an array of per-candidate route costs.
+    """
+    if eth_price_usd is None:
+        eth_price_usd = current_eth_price_usd()
+    if gas_cost_usd is None and GAS_ORACLE.ready:
+        # Live L2 fee and L1 data fee for a generic two-swap route
+        gas_cost_usd = GAS_ORACLE.route_cost(*route_template(None, None), eth_price_usd).total_usd
+    if gas_cost_usd is None:
+        # No fee history yet: static Base gas price (very low)
+        gas_price_eth = BASE_GAS_PRICE_GWEI / 1e9
+        gas_limit_swap, gas_limit_approve = gas_limits(POSITION_SIZE_USD / eth_price_usd)
+        # Calculate total gas cost (2 swaps + 2 approvals)
+        total_gas_eth = (gas_limit_swap * 2 + gas_limit_approve * 2) * gas_price_eth
+        gas_cost_usd = total_gas_eth * eth_price_usd
+
+    # Scale other costs based on position size
+    transaction_fees_usd = POSITION_SIZE_USD * TRANSACTION_FEE_PCT * 2
+    slippage_cost_usd = POSITION_SIZE_USD * SLIPPAGE_PCT * 2
+    mev_protection_cost_usd = MEV_PROTECTION_COST_USD  # Fixed cost
+
+    total_costs_usd = gas_cost_usd + transaction_fees_usd + slippage_cost_usd + mev_protection_cost_usd
+    return CostTerms(gas_cost_usd, transaction_fees_usd, slippage_cost_usd, mev_protection_cost_usd, total_costs_usd)
+
+
+def cost_floor_usd(gas_units=None, eth_price_usd=None):
+    """Least any trade can cost: gas for a route using gas_units (live fees) plus MEV protection"""
+    if eth_price_usd is None:
+        eth_price_usd = current_eth_price_usd()
+    if gas_units is not None and GAS_ORACLE.ready:
+        gas_cost_usd = GAS_ORACLE.route_cost(gas_units, route_template(None, None)[1], eth_price_usd).total_usd
+    else:
+        gas_cost_usd = cost_terms(eth_price_usd).gas_cost_usd
+    return gas_cost_usd + MEV_PROTECTION_COST_USD
+
+
+def net_profit_upper_bound(spread_pct, fee_buy, fee_sell, size_usd, cost_floor):
+    """
+    Vectorised bound on the best net profit of a two-pool trade: no trade gets a better rate than
+    the spread after both pool fees, and none is assumed larger than size_usd (inf where unknown).
+    Candidates at or below zero cannot pay for themselves at any size.
+    """
+    fee_buy, fee_sell = np.nan_to_num(fee_buy), np.nan_to_num(fee_sell)
+    edge = (1 + np.asarray(spread_pct, dtype=np.float64) / 100) * (1 - fee_buy) * (1 - fee_sell) - 1
+    with np.errstate(invalid='ignore'):
+        gross = np.where(edge > 0, edge * size_usd, 0.0)
+    return gross - cost_floor
+
+
+def estimate_profit_batch(buy_prices, sell_prices, eth_amounts=None, eth_price_usd=None, gas_cost_usd=None, costs=None):
+    """
+    Array version of estimate_profit: buy/sell prices (and optional per-candidate ETH amounts) in,
+    arrays of gross profit, net profit and net profit % out. Cost terms are shared by the batch;
+    pass costs=cost_terms(...) to reuse them across calls within a cycle. The ETH price defaults
+    to the live oracle price.
+    """
+    if eth_price_usd is None:
+        eth_price_usd = current_eth_price_usd()
+    buy_prices = np.asarray(buy_prices, dtype=np.float64)
+    sell_prices = np.asarray(sell_prices, dtype=np.float64)
+    if eth_amounts is None:
+        eth_amounts = np.full(buy_prices.shape, POSITION_SIZE_USD / eth_price_usd)  # Convert USD to ETH amount
+    else:
+        eth_amounts = np.asarray(eth_amounts, dtype=np.float64)
+    if costs is None:
+        costs = cost_terms(eth_price_usd, gas_cost_usd)
+
+    # token0 -> token1 at buy_price, then token1 -> token0 at sell_price
+    amount_token0_out = eth_amounts * buy_prices / sell_prices
+    gross_profit_usd = (amount_token0_out - eth_amounts) * eth_price_usd
+
+    net_profit_usd = gross_profit_usd - costs.total_costs_usd
+    net_profit_pct = (net_profit_usd / POSITION_SIZE_USD) * 100 if POSITION_SIZE_USD else np.zeros_like(net_profit_usd)
+
+    return {
+        'gross_profit_usd': gross_profit_usd,
+        'gas_cost_usd': costs.gas_cost_usd,
+        'transaction_fees_usd': costs.transaction_fees_usd,
+        'slippage_cost_usd': costs.slippage_cost_usd,
+        'mev_protection_cost_usd': costs.mev_protection_cost_usd,
+        'total_costs_usd': costs.total_costs_usd,
+        'net_profit_usd': net_profit_usd,
+        'net_profit_pct': net_profit_pct,
+        'is_profitable': net_profit_usd > MIN_PROFIT_THRESHOLD_USD
+    }
+
+
+def sized_profit_batch(amount_in, amount_out, token_usd, eth_price_usd=None, gas_cost_usd=None, costs=None):
+    """
+    Profit analysis for exactly sized trades (amounts in the start token, token_usd its USD price).
+    Pool fees and price impact are already in amount_out, so only gas and MEV protection are charged.
+    """
+    amount_in = np.asarray(amount_in, dtype=np.float64)
+    amount_out = np.asarray(amount_out, dtype=np.float64)
+    token_usd = np.asarray(token_usd, dtype=np.float64)
+    if costs is None:
+        costs = cost_terms(eth_price_usd, gas_cost_usd)
+
+    trade_size_usd = amount_in * token_usd
+    gross_profit_usd = (amount_out - amount_in) * token_usd
+    total_costs_usd = costs.gas_cost_usd + costs.mev_protection_cost_usd
+    net_profit_usd = gross_profit_usd - total_costs_usd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        net_profit_pct = np.where(trade_size_usd > 0, net_profit_usd / trade_size_usd * 100, 0.0)
+
+    return {
+        'gross_profit_usd': gross_profit_usd,
+        'gas_cost_usd': costs.gas_cost_usd,
+        'transaction_fees_usd': 0.0,
+        'slippage_cost_usd': 0.0,
+        'mev_protection_cost_usd': costs.mev_protection_cost_usd,
+        'total_costs_usd': total_costs_usd,
+        'net_profit_usd': net_profit_usd,
+        'net_profit_pct': net_profit_pct,
+        'is_profitable': net_profit_usd > MIN_PROFIT_THRESHOLD_USD,
+        'trade_size_usd': trade_size_usd
+    }
+
+
+def profit_analysis_at(batch, i):
+    """Scalar profit analysis dict (as returned by estimate_profit) for candidate i of a batch"""
+    return {key: (value[i].item() if isinstance(value, np.ndarray) else value) for key, value in batch.items()}
+
+
+def estimate_profit(buy_price, sell_price, eth_amount=None, eth_price_usd=None, gas_cost_usd=None):
+    """
+    Estimate realistic arbitrage profit accounting for all costs.
+    buy_price and sell_price are in terms of token1/token0 (e.g., USDC/WETH).
+    For arbitrage: buy at lower price, sell at higher price.
+    All profit/costs are in USD.
+    """
+    batch = estimate_profit_batch([buy_price], [sell_price], None if eth_amount is None else [eth_amount],
+                                  eth_price_usd, gas_cost_usd)
+    return profit_analysis_at(batch, 0)
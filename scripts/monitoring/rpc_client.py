@@ -0,0 +1,84 @@
+import asyncio
+import itertools
+
+import aiohttp
+
+from config import RPC_MAX_CONCURRENCY, RPC_TIMEOUT_SECONDS
+
+
+class RPCError(Exception):
+    """Raised when a JSON-RPC request fails or returns an error object"""
+
+    def __init__(self, message, status=None, error=None):
+        super().__init__(message)
+        self.status = status  # HTTP status when the request itself was rejected
+        self.error = error  # JSON-RPC error object when the node answered with one
+
+
+def to_block_tag(block_identifier):
+    """Convert an int block number to a hex tag; named tags ('latest', ...) pass through"""
+    if isinstance(block_identifier, int):
+        return hex(block_identifier)
+    return block_identifier
+
+
+class AsyncRPCClient:
+    """
+    Lean aiohttp JSON-RPC client for on-chain reads.
+    A semaphore bounds the number of in-flight requests so large batches don't overload the node.
+    """
+
+    def __init__(self, url, session=None, max_concurrency=RPC_MAX_CONCURRENCY, timeout=RPC_TIMEOUT_SECONDS):
+        self.url = url
+        self.session = session
+        self.owns_session = session is None
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.ids = itertools.count(1)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the HTTP session if this client created it"""
+        if self.owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+            self.owns_session = True
+        return self.session
+
+    async def request(self, method, params=None):
+        """Send one JSON-RPC request and return its result"""
+        payload = {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params or []}
+        async with self.semaphore:
+            async with self._get_session().post(self.url, json=payload, timeout=self.timeout) as resp:
+                if resp.status != 200:
+                    raise RPCError(f"{method} failed with HTTP {resp.status}: {await resp.text()}", status=resp.status)
+                result = await resp.json(content_type=None)
+        if result is None:
+            raise RPCError(f"{method} returned an empty response")
+        if result.get("error"):
+            raise RPCError(f"{method} error: {result['error']}", error=result['error'])
+        return result.get("result")
+
+    async def block_number(self):
+        return int(await self.request("eth_blockNumber"), 16)
+
+    async def eth_call(self, to, data, block_identifier='latest'):
+        """eth_call returning raw bytes"""
+        result = await self.request("eth_call", [{"to": to, "data": "0x" + data.hex()}, to_block_tag(block_identifier)])
+        return bytes.fromhex(result[2:] if result.startswith("0x") else result)
+
+    async def call(self, call, block_identifier='latest'):
+        """Run a single multicall.Call directly and decode its result"""
+        return call.decode(await self.eth_call(call.target, call.data, block_identifier))
+
+    async def get_logs(self, log_filter):
+        return await self.request("eth_getLogs", [log_filter])
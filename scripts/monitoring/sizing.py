@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def constant_product_out(amount_in, reserve_in, reserve_out, gamma):
+    """Output of a constant-product swap with fee multiplier gamma (1 - fee); works on arrays"""
+    amount_in_with_fee = gamma * amount_in
+    return amount_in_with_fee * reserve_out / (reserve_in + amount_in_with_fee)
+
+
+def optimal_two_pool_trade(x1, y1, gamma1, x2, y2, gamma2):
+    """
+    Profit-maximising input for token A -> B in pool 1 (reserves x1 A, y1 B) then B -> A in
+    pool 2 (reserves x2 B, y2 A), vectorised across candidates. The two swaps compose to
+    out = a*d / (b + c*d) with a = g1*g2*y1*y2, b = x1*x2 and c = g1*(x2 + g2*y1), so profit
+    out - d peaks at d* = (sqrt(a*b) - b) / c. Returns (amount_in, amount_out, profit) in token A;
+    all three are 0 where no input is profitable (d* <= 0) or reserves are missing.
+    """
+    x1, y1, x2, y2 = (np.asarray(v, dtype=np.float64) for v in (x1, y1, x2, y2))
+    gamma1, gamma2 = np.asarray(gamma1, dtype=np.float64), np.asarray(gamma2, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = gamma1 * gamma2 * y1 * y2
+        b = x1 * x2
+        c = gamma1 * (x2 + gamma2 * y1)
+        amount_in = (np.sqrt(a * b) - b) / c
+        usable = np.isfinite(amount_in) & (amount_in > 0)
+        amount_in = np.where(usable, amount_in, 0.0)
+        amount_out = np.where(usable, constant_product_out(constant_product_out(amount_in, x1, y1, gamma1), x2, y2, gamma2), 0.0)
+    return amount_in, amount_out, amount_out - amount_in
@@ -0,0 +1,117 @@
+import asyncio
+
+from config import SUBGRAPH_PAGE_SIZE, SUBGRAPH_CONCURRENCY
+
+# Entity ids are lowercase hex, so splitting on the first hex digit gives 16 disjoint id ranges
+ID_SHARDS = '0123456789abcdef'
+
+
+class SubgraphError(Exception):
+    """Raised when a subgraph request fails or returns GraphQL errors"""
+
+
+def _shard_bounds():
+    """(id_gt, id_lt) string bounds for each id-prefix shard; the last shard has no upper bound"""
+    bounds = []
+    for i, digit in enumerate(ID_SHARDS):
+        upper = f"0x{ID_SHARDS[i + 1]}" if i + 1 < len(ID_SHARDS) else None
+        bounds.append((f"0x{digit}", upper))
+    return bounds
+
+
+def build_page_query(entity, fields, cursor, upper=None, where=None, page_size=SUBGRAPH_PAGE_SIZE, min_block=None,
+                     at_block=None):
+    """
+    GraphQL query for one page of an entity ordered by id, starting after cursor. With min_block
+    the page must come from an indexed block at or after it, and _meta reports which block it was.
+    With at_block the page is the entity state as of exactly that block.
+    """
+    clauses = [f'id_gt: "{cursor}"']
+    if upper:
+        clauses.append(f'id_lt: "{upper}"')
+    if where:
+        clauses.append(where)
+    if at_block is not None:
+        block = f'block: {{ number: {at_block} }}, '
+    elif min_block is not None:
+        block = f'block: {{ number_gte: {min_block} }}, '
+    else:
+        block = ''
+    meta = '_meta { block { number } }' if block else ''
+    return f"""
+    {{
+      {entity}({block}first: {page_size}, orderBy: id, orderDirection: asc, where: {{ {', '.join(clauses)} }}) {{
+        id
+        {fields}
+      }}
+      {meta}
+    }}
+    """
+
+
+async def post_query(session, url, query):
+    """POST a GraphQL query and return its data object"""
+    async with session.post(url, json={"query": query}) as resp:
+        result = await resp.json(content_type=None)
+        if resp.status != 200:
+            raise SubgraphError(f"HTTP {resp.status}: {result}")
+    if result is None:
+        raise SubgraphError("empty response")
+    if result.get("errors"):
+        raise SubgraphError(result["errors"])
+    return result.get("data") or {}
+
+
+async def indexed_block(session, url):
+    """Latest block the subgraph has indexed"""
+    data = await post_query(session, url, '{ _meta { block { number } } }')
+    try:
+        return int(data['_meta']['block']['number'])
+    except (KeyError, TypeError, ValueError):
+        raise SubgraphError(f"no indexed block in _meta: {data}")
+
+
+async def fetch_paginated(session, url, entity, fields, where=None, page_size=SUBGRAPH_PAGE_SIZE,
+                          concurrency=SUBGRAPH_CONCURRENCY, on_page=None, min_block=None, at_block=None):
+    """
+    Fetch every entity matching where by walking id_gt cursors over the 16 id-prefix shards.
+    Shards are paged concurrently (at most `concurrency` requests in flight) and every page is
+    handed to on_page(items) as soon as it arrives. With min_block, pages are only served by a
+    subgraph indexed at least that far (a lagging subgraph returns errors instead of old data).
+    With at_block every page is read as of exactly that block.
+    Raises SubgraphError if any shard fails, since the result would silently miss its entities.
+    Returns (items_fetched, block), block being the oldest block any page was served from
+    (None without min_block or at_block).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    state = {'fetched': 0, 'block': None}
+    errors = []
+
+    async def walk_shard(lower, upper):
+        cursor = lower
+        while not errors:
+            query = build_page_query(entity, fields, cursor, upper, where, page_size, min_block, at_block)
+            try:
+                async with semaphore:
+                    if errors:
+                        return  # Another shard failed; the result is discarded anyway
+                    data = await post_query(session, url, query)
+            except Exception as e:
+                errors.append(e)
+                return
+            served = (data.get('_meta') or {}).get('block', {}).get('number')
+            if served is not None and (state['block'] is None or served < state['block']):
+                state['block'] = served
+            items = data.get(entity, [])
+            if items:
+                state['fetched'] += len(items)
+                if on_page is not None:
+                    on_page(items)
+                cursor = items[-1]['id']
+            if len(items) < page_size:
+                return
+
+    await asyncio.gather(*[walk_shard(lower, upper) for lower, upper in _shard_bounds()])
+    if errors:
+        raise SubgraphError(f"{len(errors)} {entity} page request(s) failed: {errors[0]}")
+    return state['fetched'], state['block']
@@ -0,0 +1,175 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One profitable closed route: token ids along the route (first == last), the table-view rows of
+# the pools used for each hop, and the product of the after-fee spot rates as a percentage gain
+Cycle = namedtuple('Cycle', ['tokens', 'rows', 'hops', 'profit_pct'])
+
+
+class TokenGraph:
+    """
+    Token graph over the pools of a table view. Tokens are nodes and every pool contributes two
+    directed edges weighted by -log(spot rate * (1 - fee)), so a route whose weights sum below
+    zero returns more than it started with. Edges are kept per table row and only the rows whose
+    price/TVL changed since the previous view are re-weighted. The cycle search is incremental too:
+    cycles through unchanged pools carry over, and only the tokens a changed pool's cycles can
+    reach are searched again.
+    """
+
+    def __init__(self, max_hops=4, min_tvl=0.0):
+        self.max_hops = max_hops
+        self.min_tvl = min_tvl
+        self.reset()
+
+    def reset(self):
+        """Forget all edges and cycles; the next update rebuilds them and the next search is a full one"""
+        self.table_id = None
+        self.versions = np.empty(0, dtype=np.int64)  # Per table row: version its edges were built from, -1 if none
+        # Edge 2r is token1 -> token0 of table row r and edge 2r + 1 is token0 -> token1; rows without edges weigh inf
+        self.src, self.dst = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        self.weight = np.empty(0)
+        self.positions = np.empty(0, dtype=np.int64)  # Per table row: its row in the current view
+        self.node_count = 0
+        self.changed = None  # Table rows re-weighted since the last search; None forces a full search
+        self.search_key = None  # (sources, min_hops, min_profit_pct) of the last search
+        self.cycles = []  # Edge ids of each cycle found by the last search
+        self.last_searched = 0  # Edges the last search relaxed
+
+    @property
+    def edge_count(self):
+        return int(np.isfinite(self.weight).sum())
+
+    def update(self, view):
+        """Re-weight the edges of pools that changed since the previous view; returns True if any did"""
+        if view.table_id != self.table_id:
+            self.reset()
+            self.table_id = view.table_id
+        size = max(len(self.versions), int(view.row.max()) + 1 if len(view) else 0)
+        usable = (view.pair >= 0) & np.isfinite(view.price) & (view.price > 0) & (np.nan_to_num(view.tvl) >= self.min_tvl)
+        versions = np.full(size, -1, dtype=np.int64)
+        versions[view.row[usable]] = view.version[usable]
+        previous = np.full(size, -1, dtype=np.int64)
+        previous[:len(self.versions)] = self.versions
+        changed = np.flatnonzero(versions != previous)
+        self.versions = versions
+        self.positions = np.full(size, -1, dtype=np.int64)
+        self.positions[view.row] = np.arange(len(view))
+        self.node_count = len(view.token_labels)
+        if not len(changed):
+            return False
+
+        grown = 2 * size - len(self.weight)
+        if grown > 0:
+            self.src = np.concatenate([self.src, np.zeros(grown, dtype=np.int64)])
+            self.dst = np.concatenate([self.dst, np.zeros(grown, dtype=np.int64)])
+            self.weight = np.concatenate([self.weight, np.full(grown, np.inf)])
+        self.weight[2 * changed] = self.weight[2 * changed + 1] = np.inf
+        rows = changed[versions[changed] >= 0]
+        at = self.positions[rows]
+        # price is token0 per token1: one token1 buys price token0, one token0 buys 1 / price token1
+        price, keep = view.price[at], 1.0 - view.fee[at]
+        token0, token1 = view.token0[at].astype(np.int64), view.token1[at].astype(np.int64)
+        self.src[2 * rows], self.dst[2 * rows], self.weight[2 * rows] = token1, token0, -np.log(price * keep)
+        self.src[2 * rows + 1], self.dst[2 * rows + 1], self.weight[2 * rows + 1] = token0, token1, -np.log(keep / price)
+        self.changed = None if self.changed is None else np.union1d(self.changed, changed)
+        return True
+
+    def find_cycles(self, sources, min_hops=3, min_profit_pct=0.0):
+        """
+        Profitable cycles through the source tokens. The first search (or one with new parameters)
+        covers the whole graph; later ones keep the previous cycles that use no changed pool and
+        search only the edges within max_hops // 2 tokens of a changed pool, which holds every
+        cycle of up to max_hops edges through that pool.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        key = (tuple(sources.tolist()), min_hops, min_profit_pct)
+        edges = np.flatnonzero(np.isfinite(self.weight))
+        kept = []
+        if self.changed is not None and key == self.search_key:
+            changed = np.zeros(len(self.versions), dtype=bool)
+            changed[self.changed] = True
+            kept = [cycle for cycle in self.cycles if not changed[np.asarray(cycle) // 2].any()]
+            edges = self._near(edges, self.changed)
+        self.search_key, self.changed = key, np.empty(0, dtype=np.int64)
+        self.last_searched = len(edges)
+        seen = {frozenset(cycle) for cycle in kept}
+        found = [cycle for cycle in self._search(edges, sources, min_hops, min_profit_pct) if frozenset(cycle) not in seen]
+        self.cycles = kept + found
+        cycles = [self._cycle(cycle) for cycle in self.cycles]
+        cycles.sort(key=lambda cycle: cycle.profit_pct, reverse=True)
+        return cycles
+
+    def _near(self, edges, rows):
+        """Edges whose tokens are both within max_hops // 2 edges of a live changed row's tokens"""
+        rows = rows[np.isfinite(self.weight[2 * rows])]
+        near = np.zeros(self.node_count, dtype=bool)
+        near[self.src[2 * rows]] = near[self.dst[2 * rows]] = True
+        src, dst = self.src[edges], self.dst[edges]
+        for _ in range(self.max_hops // 2):
+            near[dst[near[src]]] = True  # Every pool has an edge each way, so this also walks backwards
+        return edges[near[src] & near[dst]]
+
+    def _search(self, edges, sources, min_hops, min_profit_pct):
+        """
+        Hop-limited Bellman-Ford over the given edges from every source token at once: layer k
+        holds the cheapest k-edge walk to each token, relaxed for all edges with one vectorized
+        step. A negative walk back to its source with min_hops..max_hops edges and no repeated
+        token is a profitable cycle. Only the cheapest walk per (layer, token) is kept, so this
+        finds the best cycles rather than enumerating every one. Returns edge ids per cycle.
+        """
+        edge_count, node_count = len(edges), self.node_count
+        if not len(sources) or not edge_count:
+            return []
+        src, dst, weight = self.src[edges], self.dst[edges], self.weight[edges]
+        threshold = -np.log1p(min_profit_pct / 100)
+        source_index = np.arange(len(sources))
+        flat_dst = (source_index[:, None] * node_count + dst[None, :]).ravel()
+        edge_ids = np.tile(np.arange(edge_count), len(sources))
+
+        dist = np.full((len(sources), node_count), np.inf)
+        dist[source_index, sources] = 0.0
+        layers = []  # per hop: predecessor edge of the cheapest walk to each (source, token)
+        cycles, seen = [], set()
+        for hop in range(1, self.max_hops + 1):
+            candidate = (dist[:, src] + weight[None, :]).ravel()
+            relaxed = np.full(len(sources) * node_count, np.inf)
+            np.minimum.at(relaxed, flat_dst, candidate)
+            predecessor = np.full(len(sources) * node_count, -1, dtype=np.int64)
+            best = np.isfinite(candidate) & (candidate == relaxed[flat_dst])
+            predecessor[flat_dst[best]] = edge_ids[best]
+            dist = relaxed.reshape(len(sources), node_count)
+            layers.append(predecessor.reshape(len(sources), node_count))
+            if hop < min_hops:
+                continue
+            for s in np.flatnonzero(dist[source_index, sources] < threshold):
+                cycle = self._walk_back(layers, src, dst, s, sources[s], hop)
+                if cycle is None:
+                    continue
+                key = frozenset(cycle)
+                if key in seen:
+                    continue  # Same cycle found from another of its tokens
+                seen.add(key)
+                cycles.append([int(edges[e]) for e in cycle])
+        return cycles
+
+    def _walk_back(self, layers, src, dst, s, source, hop):
+        """Edge ids of the cheapest hop-edge walk from source back to itself, or None if not a simple cycle"""
+        cycle, node = [], source
+        for layer in range(hop - 1, -1, -1):
+            edge = layers[layer][s, node]
+            if edge < 0:
+                return None
+            cycle.append(int(edge))
+            node = src[edge]
+        cycle.reverse()
+        visited = [int(dst[e]) for e in cycle]
+        if node != source or len(set(visited)) != len(visited):
+            return None
+        return cycle
+
+    def _cycle(self, cycle):
+        """Cycle record for edge ids, with rows of the current view"""
+        tokens = [int(self.src[cycle[0]])] + [int(self.dst[e]) for e in cycle]
+        profit_pct = float(np.expm1(-self.weight[cycle].sum()) * 100)
+        return Cycle(tokens, [int(self.positions[e // 2]) for e in cycle], len(cycle), profit_pct)
@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from config import (HTTP_MAX_CONNECTIONS, HTTP_MAX_CONNECTIONS_PER_HOST, HTTP_DNS_CACHE_SECONDS,
+                    HTTP_KEEPALIVE_SECONDS, HTTP_TIMEOUT_SECONDS)
+from scripts.monitoring.rpc_client import AsyncRPCClient
+
+# aiohttp only decodes brotli responses when the optional brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class Transport:
+    """
+    Long-lived HTTP transport shared by all subgraph and RPC traffic: one pooled session with
+    keep-alive connections, per-host limits, DNS caching and compressed responses.
+    """
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.session = None
+        self.rpc = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_DNS_CACHE_SECONDS,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS)
+        )
+        self.rpc = AsyncRPCClient(self.rpc_url, session=self.session)
+        return self
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            # Give the connector a moment to close TLS transports cleanly
+            await asyncio.sleep(0.25)
+        self.session = None
+        self.rpc = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+@asynccontextmanager
+async def session_scope(session=None):
+    """Yield the shared session when given, otherwise a temporary one (standalone fetcher calls)"""
+    if session is not None:
+        yield session
+    else:
+        async with aiohttp.ClientSession() as temporary_session:
+            yield temporary_session
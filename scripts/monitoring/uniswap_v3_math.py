@@ -0,0 +1,244 @@
+"""
+Integer port of the Uniswap V3 core swap math (TickMath, SqrtPriceMath, SwapMath and the pool
+swap loop) for quoting exact-input swaps locally. Results match the on-chain pool for the same
+slot0, liquidity and initialized ticks.
+"""
+import bisect
+import math
+
+Q96 = 1 << 96
+MAX_UINT256 = (1 << 256) - 1
+_LOG2_TICK_BASE = math.log2(1.0001)
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+
+_TICK_RATIO_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a), (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0), (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0), (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053), (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54), (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9), (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5), (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6), (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604), (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+def mul_div(a, b, denominator):
+    return a * b // denominator
+
+
+def mul_div_rounding_up(a, b, denominator):
+    return -(-a * b // denominator)
+
+
+def div_rounding_up(a, b):
+    return -(-a // b)
+
+
+# TickMath
+def get_sqrt_ratio_at_tick(tick):
+    """sqrt(1.0001^tick) * 2^96"""
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"tick {tick} out of range")
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 0x100000000000000000000000000000000
+    for bit, factor in _TICK_RATIO_FACTORS:
+        if abs_tick & bit:
+            ratio = (ratio * factor) >> 128
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """Greatest tick whose sqrt ratio is <= sqrt_price_x96"""
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        raise ValueError("sqrt price out of range")
+    # Float log gets within a tick or two; the exact ratios settle the rest
+    tick = int(math.floor(2 * (math.log2(sqrt_price_x96) - 96) / _LOG2_TICK_BASE))
+    tick = max(MIN_TICK, min(MAX_TICK - 1, tick))
+    while tick > MIN_TICK and get_sqrt_ratio_at_tick(tick) > sqrt_price_x96:
+        tick -= 1
+    while tick < MAX_TICK - 1 and get_sqrt_ratio_at_tick(tick + 1) <= sqrt_price_x96:
+        tick += 1
+    return tick
+
+
+# SqrtPriceMath
+def get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount, add):
+    if amount == 0:
+        return sqrt_price_x96
+    numerator1 = liquidity << 96
+    product = amount * sqrt_price_x96
+    if add:
+        if product <= MAX_UINT256:
+            denominator = numerator1 + product
+            if denominator <= MAX_UINT256:
+                return mul_div_rounding_up(numerator1, sqrt_price_x96, denominator)
+        return div_rounding_up(numerator1, numerator1 // sqrt_price_x96 + amount)
+    if product > MAX_UINT256 or numerator1 <= product:
+        raise ValueError("insufficient liquidity")
+    return mul_div_rounding_up(numerator1, sqrt_price_x96, numerator1 - product)
+
+
+def get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount, add):
+    if add:
+        return sqrt_price_x96 + (amount << 96) // liquidity
+    quotient = div_rounding_up(amount << 96, liquidity)
+    if sqrt_price_x96 <= quotient:
+        raise ValueError("insufficient liquidity")
+    return sqrt_price_x96 - quotient
+
+
+def get_next_sqrt_price_from_input(sqrt_price_x96, liquidity, amount_in, zero_for_one):
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount_in, True)
+    return get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount_in, True)
+
+
+def get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+    if round_up:
+        return div_rounding_up(mul_div_rounding_up(numerator1, numerator2, sqrt_b), sqrt_a)
+    return mul_div(numerator1, numerator2, sqrt_b) // sqrt_a
+
+
+def get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_b - sqrt_a, Q96)
+    return mul_div(liquidity, sqrt_b - sqrt_a, Q96)
+
+
+# SwapMath (exact input only)
+def compute_swap_step(sqrt_current, sqrt_target, liquidity, amount_remaining, fee_pips):
+    """One swap step towards sqrt_target; returns (sqrt_next, amount_in, amount_out, fee_amount)"""
+    zero_for_one = sqrt_current >= sqrt_target
+    amount_remaining_less_fee = mul_div(amount_remaining, 1_000_000 - fee_pips, 1_000_000)
+    if zero_for_one:
+        amount_in = get_amount0_delta(sqrt_target, sqrt_current, liquidity, True)
+    else:
+        amount_in = get_amount1_delta(sqrt_current, sqrt_target, liquidity, True)
+    if amount_remaining_less_fee >= amount_in:
+        sqrt_next = sqrt_target
+    else:
+        sqrt_next = get_next_sqrt_price_from_input(sqrt_current, liquidity, amount_remaining_less_fee, zero_for_one)
+    reached_target = sqrt_next == sqrt_target
+    if zero_for_one:
+        if not reached_target:
+            amount_in = get_amount0_delta(sqrt_next, sqrt_current, liquidity, True)
+        amount_out = get_amount1_delta(sqrt_next, sqrt_current, liquidity, False)
+    else:
+        if not reached_target:
+            amount_in = get_amount1_delta(sqrt_current, sqrt_next, liquidity, True)
+        amount_out = get_amount0_delta(sqrt_current, sqrt_next, liquidity, False)
+    if not reached_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee_pips, 1_000_000 - fee_pips)
+    return sqrt_next, amount_in, amount_out, fee_amount
+
+
+class V3Pool:
+    """
+    Local copy of one pool's swap state: slot0 price/tick, active liquidity and the initialized
+    ticks (liquidityNet/liquidityGross). Kept current by Swap/Mint/Burn events.
+    """
+
+    def __init__(self, address, fee, tick_spacing, sqrt_price_x96, tick, liquidity, ticks=None):
+        self.address = address.lower()
+        self.fee = fee
+        self.tick_spacing = tick_spacing
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.liquidity_net = {}  # tick -> liquidityNet
+        self.liquidity_gross = {}  # tick -> liquidityGross
+        self.initialized = []  # sorted compressed ticks (tick // tick_spacing) with liquidityGross > 0
+        for tick_index, (liquidity_net, liquidity_gross) in (ticks or {}).items():
+            self._set_tick(tick_index, liquidity_net, liquidity_gross)
+        self.block = None
+
+    def _set_tick(self, tick_index, liquidity_net, liquidity_gross):
+        compressed = tick_index // self.tick_spacing
+        position = bisect.bisect_left(self.initialized, compressed)
+        present = position < len(self.initialized) and self.initialized[position] == compressed
+        if liquidity_gross > 0:
+            self.liquidity_net[tick_index] = liquidity_net
+            self.liquidity_gross[tick_index] = liquidity_gross
+            if not present:
+                self.initialized.insert(position, compressed)
+        else:
+            self.liquidity_net.pop(tick_index, None)
+            self.liquidity_gross.pop(tick_index, None)
+            if present:
+                del self.initialized[position]
+
+    def next_initialized_tick_within_one_word(self, tick, lte):
+        """Same result as TickBitmap.nextInitializedTickWithinOneWord, from the sorted tick list"""
+        compressed = tick // self.tick_spacing
+        if lte:
+            word_start = (compressed >> 8) << 8
+            position = bisect.bisect_right(self.initialized, compressed) - 1
+            if position >= 0 and self.initialized[position] >= word_start:
+                return self.initialized[position] * self.tick_spacing, True
+            return word_start * self.tick_spacing, False
+        compressed += 1
+        word_end = ((compressed >> 8) << 8) + 255
+        position = bisect.bisect_left(self.initialized, compressed)
+        if position < len(self.initialized) and self.initialized[position] <= word_end:
+            return self.initialized[position] * self.tick_spacing, True
+        return word_end * self.tick_spacing, False
+
+    def quote_exact_in(self, amount_in, zero_for_one):
+        """Output amount for an exact-input swap (token0 in when zero_for_one), without changing state"""
+        return self._swap(amount_in, zero_for_one)[0]
+
+    def _swap(self, amount_in, zero_for_one):
+        """Pool swap loop; returns (amount_out, sqrt_price_x96, tick, liquidity) after the swap"""
+        sqrt_price_limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+        remaining, amount_out = amount_in, 0
+        sqrt_price, tick, liquidity = self.sqrt_price_x96, self.tick, self.liquidity
+        while remaining != 0 and sqrt_price != sqrt_price_limit:
+            sqrt_start = sqrt_price
+            tick_next, initialized = self.next_initialized_tick_within_one_word(tick, zero_for_one)
+            tick_next = max(MIN_TICK, min(MAX_TICK, tick_next))
+            sqrt_next = get_sqrt_ratio_at_tick(tick_next)
+            if (sqrt_next < sqrt_price_limit) if zero_for_one else (sqrt_next > sqrt_price_limit):
+                sqrt_target = sqrt_price_limit
+            else:
+                sqrt_target = sqrt_next
+            sqrt_price, step_in, step_out, step_fee = compute_swap_step(sqrt_price, sqrt_target, liquidity, remaining, self.fee)
+            remaining -= step_in + step_fee
+            amount_out += step_out
+            if sqrt_price == sqrt_next:
+                if initialized:
+                    liquidity_net = self.liquidity_net.get(tick_next, 0)
+                    liquidity += -liquidity_net if zero_for_one else liquidity_net
+                tick = tick_next - 1 if zero_for_one else tick_next
+            elif sqrt_price != sqrt_start:
+                tick = get_tick_at_sqrt_ratio(sqrt_price)
+        return amount_out, sqrt_price, tick, liquidity
+
+    def apply_swap(self, sqrt_price_x96, liquidity, tick):
+        """Swap event: the pool's post-swap slot0 and active liquidity"""
+        self.sqrt_price_x96, self.liquidity, self.tick = sqrt_price_x96, liquidity, tick
+
+    def apply_position_change(self, tick_lower, tick_upper, amount):
+        """Mint (amount > 0) or Burn (amount < 0) of liquidity over [tick_lower, tick_upper)"""
+        for tick_index, sign in ((tick_lower, 1), (tick_upper, -1)):
+            self._set_tick(tick_index,
+                           self.liquidity_net.get(tick_index, 0) + sign * amount,
+                           self.liquidity_gross.get(tick_index, 0) + amount)
+        if tick_lower <= self.tick < tick_upper:
+            self.liquidity += amount
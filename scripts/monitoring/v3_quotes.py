@@ -0,0 +1,149 @@
+from scripts.monitoring.multicall import multicall, slot0_call, liquidity_call, fee_call, tick_spacing_call
+from scripts.monitoring.pool_state import event_topic, SWAP_V3_TOPIC, _words, _signed, _topic_hex
+from scripts.monitoring.subgraph import fetch_paginated, indexed_block, SubgraphError
+from scripts.monitoring.uniswap_v3_math import V3Pool
+
+MINT_V3_TOPIC = event_topic("Mint(address,address,int24,int24,uint128,uint256,uint256)")
+BURN_V3_TOPIC = event_topic("Burn(address,int24,int24,uint128,uint256,uint256)")
+
+TICK_FIELDS = """
+        pool { id }
+        tickIdx
+        liquidityNet
+        liquidityGross
+"""
+TICK_POOLS_PER_QUERY = 100  # Pools whose ticks share one paginated subgraph query
+
+
+class V3QuoteBook:
+    """
+    Full swap state (slot0, liquidity and initialized ticks) for a set of watched Uniswap V3
+    pools, loaded once and then kept current from Swap/Mint/Burn logs, so exact-in quotes that
+    cross ticks are computed locally instead of through the on-chain Quoter.
+    """
+
+    def __init__(self):
+        self.pools = {}  # lowercase pool address -> V3Pool
+
+    def __contains__(self, address):
+        return bool(address) and address.lower() in self.pools
+
+    def reset(self):
+        self.pools.clear()
+
+    async def load(self, rpc, session, subgraph_url, addresses, block):
+        """
+        Read slot0/liquidity/fee/tickSpacing at block and the initialized ticks as of the same block:
+        ticks come from the subgraph at the last block it has indexed (capped at block), and the
+        Mint/Burn logs between that block and block are replayed onto them.
+        """
+        addresses = [address.lower() for address in addresses if address.lower() not in self.pools]
+        if not addresses:
+            return 0
+        calls = []
+        for address in addresses:
+            calls += [slot0_call(address), liquidity_call(address), fee_call(address), tick_spacing_call(address)]
+        results = await multicall(rpc, calls, block_identifier=hex(block))
+        tick_block = min(block, await indexed_block(session, subgraph_url))
+        ticks_by_pool = await self._load_ticks(session, subgraph_url, addresses, tick_block)
+        if tick_block < block and ticks_by_pool:
+            logs = await rpc.get_logs({'address': addresses, 'topics': [[MINT_V3_TOPIC, BURN_V3_TOPIC]],
+                                       'fromBlock': hex(tick_block + 1), 'toBlock': hex(block)})
+            for log in logs:
+                change = _position_change(log)
+                if change is not None and change[0] in ticks_by_pool:
+                    _replay_position_change(ticks_by_pool[change[0]], *change[1:])
+        tick_maps = [ticks_by_pool.get(address) for address in addresses]
+
+        loaded = 0
+        for n, (address, ticks) in enumerate(zip(addresses, tick_maps)):
+            slot0, liquidity, fee, tick_spacing = results[4 * n:4 * n + 4]
+            if slot0 is None or liquidity is None or fee is None or not tick_spacing or ticks is None:
+                continue
+            pool = V3Pool(address, fee, tick_spacing, slot0[0], slot0[1], liquidity, ticks)
+            pool.block = block
+            self.pools[address] = pool
+            loaded += 1
+        return loaded
+
+    async def _load_ticks(self, session, subgraph_url, addresses, block):
+        """
+        {pool: {tick: (liquidityNet, liquidityGross)}} at block, fetched for many pools per paginated
+        query; pools in a query that failed are left out
+        """
+        ticks_by_pool = {}
+
+        def add_ticks(items):
+            for item in items:
+                ticks = ticks_by_pool.get(item['pool']['id'].lower())
+                if ticks is not None:
+                    ticks[int(item['tickIdx'])] = (int(item['liquidityNet']), int(item['liquidityGross']))
+
+        for start in range(0, len(addresses), TICK_POOLS_PER_QUERY):
+            chunk = addresses[start:start + TICK_POOLS_PER_QUERY]
+            for address in chunk:
+                ticks_by_pool[address] = {}
+            pools = ', '.join(f'"{address}"' for address in chunk)
+            try:
+                await fetch_paginated(session, subgraph_url, 'ticks', TICK_FIELDS,
+                                      where=f'pool_in: [{pools}], liquidityGross_gt: "0"', on_page=add_ticks,
+                                      at_block=block)
+            except SubgraphError:
+                for address in chunk:
+                    del ticks_by_pool[address]
+        return ticks_by_pool
+
+    def apply_log(self, log):
+        """Apply a Swap/Mint/Burn log to its pool if it is loaded and newer than the pool's state"""
+        if log.get('removed') or not log.get('topics'):
+            return False
+        pool = self.pools.get(log['address'].lower())
+        if pool is None:
+            return False
+        block = int(log['blockNumber'], 16) if isinstance(log['blockNumber'], str) else log['blockNumber']
+        if pool.block is not None and block <= pool.block:
+            return False  # Already included in the read pinned to pool.block
+        topics = [_topic_hex(topic) for topic in log['topics']]
+        words = _words(log['data'])
+        change = _position_change(log)
+        if topics[0] == SWAP_V3_TOPIC and len(words) >= 5:
+            pool.apply_swap(words[2], words[3], _signed(words[4]))
+        elif change is not None:
+            pool.apply_position_change(*change[1:])
+        else:
+            return False
+        return True
+
+    def quote(self, address, amount_in, token0_in, decimals_in, decimals_out):
+        """Exact output (token units) for amount_in token units into a loaded pool, or None"""
+        pool = self.pools.get(address.lower()) if address else None
+        if pool is None or not amount_in > 0:
+            return None
+        try:
+            return pool.quote_exact_in(int(amount_in * 10 ** decimals_in), token0_in) / 10 ** decimals_out
+        except (ValueError, ZeroDivisionError):
+            return None
+
+
+def _position_change(log):
+    """(pool address, tick_lower, tick_upper, liquidity delta) of a Mint/Burn log, else None"""
+    if log.get('removed') or not log.get('topics'):
+        return None
+    topics = [_topic_hex(topic) for topic in log['topics']]
+    words = _words(log['data'])
+    if topics[0] not in (MINT_V3_TOPIC, BURN_V3_TOPIC) or len(topics) < 4 or len(words) < 2:
+        return None
+    # Mint data: sender, amount, amount0, amount1; Burn data: amount, amount0, amount1
+    amount = words[1] if topics[0] == MINT_V3_TOPIC else -words[0]
+    return log['address'].lower(), _signed(int(topics[2], 16)), _signed(int(topics[3], 16)), amount
+
+
+def _replay_position_change(ticks, tick_lower, tick_upper, amount):
+    """Apply a Mint/Burn to a {tick: (liquidityNet, liquidityGross)} map (active liquidity is read on-chain)"""
+    for tick_index, sign in ((tick_lower, 1), (tick_upper, -1)):
+        liquidity_net, liquidity_gross = ticks.get(tick_index, (0, 0))
+        liquidity_net, liquidity_gross = liquidity_net + sign * amount, liquidity_gross + amount
+        if liquidity_gross:
+            ticks[tick_index] = (liquidity_net, liquidity_gross)
+        else:
+            ticks.pop(tick_index, None)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental spread detection over the shared price store
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.monitoring.detection import IncrementalDetector, detect_spreads
+from scripts.monitoring.price_store import PriceStore
+
+WETH = '0x4200000000000000000000000000000000000006'
+USDC = '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913'
+MAX_BLOCK_SKEW = 10
+
+
+def pool(pool_id, price):
+    return {'pool_id': pool_id, 'price': price, 'tvl': 1e6, 'token0': WETH, 'token1': USDC,
+            'symbol0': 'WETH', 'symbol1': 'USDC', 'fee': 0.003}
+
+
+def spread_opportunities(view, spreads):
+    """Every pair quoted on two DEXes with a spread becomes an opportunity"""
+    return {int(pair): {'buy_dex': int(view.dex[buy]), 'sell_dex': int(view.dex[sell]),
+                        'buy_price': float(view.price[buy]), 'sell_price': float(view.price[sell]),
+                        'profit_analysis': {}}
+            for pair, quotes, buy, sell, spread in zip(spreads.pair, spreads.quotes, spreads.buy_row,
+                                                       spreads.sell_row, spreads.spread_pct)
+            if quotes >= 2 and spread > 0}
+
+
+def test_opportunity_expires_when_one_source_falls_behind():
+    """A DEX republishing the same price at new blocks pushes the stuck DEX's quote past the skew limit"""
+    store = PriceStore()
+    detector = IncrementalDetector(spread_opportunities, max_block_skew=MAX_BLOCK_SKEW)
+    store.update('SushiSwap', {'a': pool('a', 0.00050)}, block=100)
+    store.update('Aerodrome', {'b': pool('b', 0.00051)}, block=100)
+    detector.update(store.snapshot()['table'])
+    assert len(detector.current()) == 1
+
+    for block in range(102, 132, 2):
+        store.update('SushiSwap', {'a': pool('a', 0.00050)}, block=block)
+        view = store.snapshot()['table']
+        detector.update(view)
+        full = spread_opportunities(view, detect_spreads(view, max_block_skew=MAX_BLOCK_SKEW))
+        assert len(detector.current()) == len(full), block
+    assert detector.current() == []
+
+
+def test_reserve_change_re_evaluates_pair():
+    """Sizing reads reserves, so a reserve move at an unchanged price marks the pair dirty"""
+    store = PriceStore()
+    detector = IncrementalDetector(spread_opportunities)
+    store.update('SushiSwap', {'a': dict(pool('a', 0.00050), reserve0=1000.0, reserve1=2_000_000.0)}, block=100)
+    store.update('Aerodrome', {'b': pool('b', 0.00051)}, block=100)
+    detector.update(store.snapshot()['table'])
+    store.update('SushiSwap', {'a': dict(pool('a', 0.00050), reserve0=500.0, reserve1=1_000_000.0)}, block=101)
+    detector.update(store.snapshot()['table'])
+    assert detector.last_dirty == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
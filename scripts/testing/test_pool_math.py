@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Known-answer tests for the local pool math (Uniswap V3, Aerodrome, Balancer)
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.monitoring.uniswap_v3_math import (
+    MIN_TICK, MAX_TICK, MIN_SQRT_RATIO, MAX_SQRT_RATIO, V3Pool, get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio,
+)
+from scripts.monitoring.aerodrome_math import AerodromePool
+from scripts.monitoring.balancer_math import BalancerPool, stable_invariant, ONE
+
+Q96 = 2 ** 96
+
+
+def test_sqrt_ratio_at_tick():
+    """TickMath.getSqrtRatioAtTick at the tick bounds and at tick 0"""
+    assert get_sqrt_ratio_at_tick(0) == Q96
+    assert get_sqrt_ratio_at_tick(MIN_TICK) == MIN_SQRT_RATIO == 4295128739
+    assert get_sqrt_ratio_at_tick(MAX_TICK) == MAX_SQRT_RATIO == 1461446703485210103287273052203988822378723970342
+
+
+def test_tick_round_trip():
+    """getTickAtSqrtRatio inverts getSqrtRatioAtTick, and rounds down between ticks"""
+    for tick in (MIN_TICK, -500000, -60, -1, 0, 1, 60, 201234, MAX_TICK - 1):
+        sqrt_price = get_sqrt_ratio_at_tick(tick)
+        assert get_tick_at_sqrt_ratio(sqrt_price) == tick
+        assert get_tick_at_sqrt_ratio(sqrt_price + 1) == tick
+
+
+def test_v3_swap_within_one_range():
+    """Exact-in swap that stays inside one liquidity range, against the closed-form amounts"""
+    liquidity, fee, amount_in = 10 ** 21, 3000, 10 ** 18
+    pool = V3Pool('0x' + '11' * 20, fee, 60, Q96, 0, liquidity,
+                  {-6000: (liquidity, liquidity), 6000: (-liquidity, liquidity)})
+    after_fee = amount_in * (10 ** 6 - fee) // 10 ** 6
+    # token0 in: sqrtP' = L * sqrtP / (L + amount * sqrtP / Q96), rounded up; out = L * (sqrtP - sqrtP') / Q96
+    sqrt_next = -(-liquidity * Q96 * Q96 // (liquidity * Q96 + after_fee * Q96))
+    expected = liquidity * (Q96 - sqrt_next) // Q96
+    assert abs(pool.quote_exact_in(amount_in, True) - expected) <= 1
+    # token1 in: sqrtP' = sqrtP + amount * Q96 / L, rounded down; out = L * (1/sqrtP - 1/sqrtP') * Q96
+    sqrt_next = Q96 + after_fee * Q96 // liquidity
+    expected = liquidity * Q96 * (sqrt_next - Q96) // sqrt_next // Q96
+    assert abs(pool.quote_exact_in(amount_in, False) - expected) <= 1
+
+
+def test_v3_swap_crossing_ticks():
+    """Splitting a range into adjacent positions of equal liquidity does not change a crossing swap"""
+    liquidity, amount_in = 10 ** 21, 5 * 10 ** 19
+    whole = V3Pool('0x' + '11' * 20, 500, 10, Q96, 0, liquidity,
+                   {-6000: (liquidity, liquidity), 6000: (-liquidity, liquidity)})
+    split = V3Pool('0x' + '22' * 20, 500, 10, Q96, 0, liquidity,
+                   {-6000: (liquidity, liquidity), -100: (0, 2 * liquidity), 6000: (-liquidity, liquidity)})
+    assert whole.quote_exact_in(amount_in, True) > 0
+    assert abs(whole.quote_exact_in(amount_in, True) - split.quote_exact_in(amount_in, True)) <= 2
+    # Past the last initialized tick there is no liquidity, so output is capped at the range's reserves
+    capped = whole.quote_exact_in(10 ** 30, True)
+    reserve1 = liquidity * (Q96 - get_sqrt_ratio_at_tick(-6000)) // Q96
+    assert reserve1 - 2 <= capped <= reserve1
+
+
+def test_aerodrome_volatile():
+    """Volatile pools: constant product on the input after the basis-point fee"""
+    pool = AerodromePool('0x' + '33' * 20, 10 ** 18, 10 ** 6, 1000 * 10 ** 18, 2_000_000 * 10 ** 6, False, 30)
+    amount_in = 10 ** 18
+    after_fee = amount_in - amount_in * 30 // 10000
+    assert pool.get_amount_out(amount_in, True) == after_fee * pool.reserve1 // (pool.reserve0 + after_fee)
+
+
+def test_aerodrome_stable():
+    """Stable pools: x^3y + y^3x does not decrease, and a balanced pool swaps close to 1:1"""
+    pool = AerodromePool('0x' + '44' * 20, 10 ** 6, 10 ** 18, 10 ** 12, 10 ** 24, True, 5)
+    amount_in = 1000 * 10 ** 6
+    amount_out = pool.get_amount_out(amount_in, True)
+    after_fee = amount_in - amount_in * 5 // 10000
+    assert pool._k(pool.reserve0 + after_fee, pool.reserve1 - amount_out) >= pool._k(pool.reserve0, pool.reserve1)
+    assert 0.999 * after_fee * 10 ** 12 < amount_out <= after_fee * 10 ** 12
+
+
+def test_balancer_weighted():
+    """Weighted pools: out = balance_out * (1 - (balance_in / (balance_in + in)) ^ (w_in / w_out))"""
+    weights = [8 * 10 ** 17, 2 * 10 ** 17]
+    pool = BalancerPool('0x' + '55' * 32, '0x' + '55' * 20, ['0x' + '66' * 20, '0x' + '77' * 20],
+                        [1000 * 10 ** 18, 500 * 10 ** 18], [ONE, ONE], 0, weights=weights)
+    amount_in = 10 * 10 ** 18
+    expected = 500 * (1 - (1000 / 1010) ** 4)
+    assert abs(pool.get_amount_out(amount_in, 0, 1) / 10 ** 18 - expected) < 1e-9 * expected
+
+
+def test_balancer_stable():
+    """Stable pools: the invariant does not decrease, and a balanced pool swaps close to 1:1"""
+    amp = 200 * 1000
+    balances = [10 ** 24, 10 ** 24]
+    pool = BalancerPool('0x' + '88' * 32, '0x' + '88' * 20, ['0x' + '66' * 20, '0x' + '77' * 20],
+                        balances, [ONE, ONE], 0, amp=amp)
+    amount_in = 1000 * 10 ** 18
+    amount_out = pool.get_amount_out(amount_in, 0, 1)
+    assert 0.999 * amount_in < amount_out < amount_in
+    assert stable_invariant(amp, [balances[0] + amount_in, balances[1] - amount_out]) >= stable_invariant(amp, balances)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
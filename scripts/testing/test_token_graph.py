@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental multi-hop cycle search
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.monitoring.columnar import PoolTable
+from scripts.monitoring.token_graph import TokenGraph
+
+WETH = '0x4200000000000000000000000000000000000006'
+USDC = '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913'
+DAI = '0x50c5725949a6f0c72e6c4a641f24049a917db0cb'
+BLOCK_TIME_SECONDS = 2.0  # Base
+
+
+def pool(pool_id, token0, token1, price):
+    return {'pool_id': pool_id, 'price': price, 'tvl': 1e6, 'token0': token0, 'token1': token1,
+            'symbol0': token0[2:6], 'symbol1': token1[2:6], 'fee': 0.003}
+
+
+def token(i):
+    return '0x%040x' % (i + 1)
+
+
+def cycle_set(cycles, view):
+    return {(frozenset(view.row[row] for row in cycle.rows), round(cycle.profit_pct, 9)) for cycle in cycles}
+
+
+def full_search(view, sources):
+    graph = TokenGraph(max_hops=4)
+    graph.update(view)
+    return graph.find_cycles(sources)
+
+
+def sources_of(view, tokens):
+    labels = {label: i for i, label in enumerate(view.token_labels)}
+    return [labels[address] for address in tokens]
+
+
+def test_price_change_opens_and_closes_a_cycle():
+    """A mispriced pool opens a triangle; only the changed pool's neighbourhood is searched again"""
+    prices = {'a': pool('a', WETH, USDC, 1 / 2000), 'b': pool('b', USDC, DAI, 1.0), 'c': pool('c', WETH, DAI, 1 / 2000)}
+    # Unrelated pools several hops away from the triangle
+    for i in range(20):
+        prices[f'x{i}'] = pool(f'x{i}', token(100 + i), token(200 + i), 1.0)
+    table = PoolTable.from_prices({'Uniswap': prices})
+    graph = TokenGraph(max_hops=4)
+    view = table.view()
+    graph.update(view)
+    sources = sources_of(view, [WETH])
+    assert graph.find_cycles(sources) == []
+    assert graph.last_searched == graph.edge_count
+
+    table.replace_dex('Uniswap', dict(prices, c=pool('c', WETH, DAI, 1 / 1950)))
+    view = table.view()
+    assert graph.update(view)
+    cycles = graph.find_cycles(sources)
+    assert len(cycles) == 1 and cycles[0].hops == 3 and cycles[0].profit_pct > 1.0
+    assert graph.last_searched == 6  # The triangle's edges only
+    assert cycle_set(cycles, view) == cycle_set(full_search(view, sources), view)
+
+    table.replace_dex('Uniswap', prices)
+    view = table.view()
+    assert graph.update(view)
+    assert graph.find_cycles(sources) == []
+
+
+def test_unchanged_cycles_carry_over():
+    """Cycles through pools that did not change are kept without searching them again"""
+    prices = {'a': pool('a', WETH, USDC, 1 / 2000), 'b': pool('b', USDC, DAI, 1.0), 'c': pool('c', WETH, DAI, 1 / 1950),
+              'd': pool('d', token(1), token(2), 1.0), 'e': pool('e', token(2), token(3), 1.0)}
+    table = PoolTable.from_prices({'Uniswap': prices})
+    graph = TokenGraph(max_hops=4)
+    view = table.view()
+    graph.update(view)
+    sources = sources_of(view, [WETH])
+    before = cycle_set(graph.find_cycles(sources), view)
+
+    table.replace_dex('Uniswap', dict(prices, e=pool('e', token(2), token(3), 1.1)))
+    view = table.view()
+    assert graph.update(view)
+    after = graph.find_cycles(sources)
+    assert graph.last_searched == 4  # Pools d and e
+    assert cycle_set(after, view) == before == cycle_set(full_search(view, sources), view)
+    assert not graph.update(table.view())
+
+
+def test_large_graph_within_block_time():
+    """Tens of thousands of edges: full and incremental searches finish well inside a block"""
+    rng = random.Random(0)
+    tokens = [token(i) for i in range(3000)] + [WETH, USDC]
+    log_price = {address: rng.uniform(-3, 3) for address in tokens}
+    prices = {}
+    for i in range(30000):
+        token0, token1 = rng.sample(tokens, 2)
+        prices[f'p{i}'] = pool(f'p{i}', token0, token1, math.exp(log_price[token1] - log_price[token0] + rng.gauss(0, 0.02)))
+    table = PoolTable.from_prices({'Uniswap': prices})
+    graph = TokenGraph(max_hops=4)
+    view = table.view()
+    sources = sources_of(view, [WETH, USDC])
+
+    started_at = time.time()
+    graph.update(view)
+    graph.find_cycles(sources)
+    assert graph.edge_count == 60000
+    assert time.time() - started_at < BLOCK_TIME_SECONDS
+
+    for i in rng.sample(range(30000), 50):
+        entry = prices[f'p{i}']
+        prices[f'p{i}'] = dict(entry, price=entry['price'] * rng.uniform(0.97, 1.03))
+    table.replace_dex('Uniswap', prices)
+    view = table.view()
+    started_at = time.time()
+    graph.update(view)
+    cycles = graph.find_cycles(sources)
+    assert time.time() - started_at < BLOCK_TIME_SECONDS
+    assert graph.last_searched <= graph.edge_count
+    # Every reported cycle's profit is the product of its pools' current after-fee rates
+    for cycle in cycles:
+        rate = 1.0
+        for row, (token_in, token_out) in zip(cycle.rows, zip(cycle.tokens, cycle.tokens[1:])):
+            keep = 1.0 - view.fee[row]
+            rate *= view.price[row] * keep if view.token1[row] == token_in else keep / view.price[row]
+        assert abs((rate - 1) * 100 - cycle.profit_pct) < 1e-6
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")